@@ -1,8 +1,33 @@
+import logging
+import math
 import os
-from flask import Flask, jsonify, request, abort
-import requests
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
+from decimal import Decimal, InvalidOperation
+from flask import Flask, Response, jsonify, request, abort
 from flask_cors import CORS  
 from flask_wtf.csrf import CSRFProtect
+from pymongo import MongoClient
+from werkzeug.http import http_date, quote_etag
+
+from asof_index import AsOfIndex, RateNotAvailable
+from circuit_breaker import CircuitBreaker, CircuitOpen
+from conversion import DecimalRates, UnknownCurrency
+from columnar_store import ColumnarHistoryStore
+from history_store import MongoHistoryStore
+from metrics import Metrics, count_hedge, count_lookup, track_upstream
+from providers import PROVIDERS, ExchangeRateApi, ProviderAggregator, parse_providers
+from quota import QuotaExceeded, QuotaManager
+from rates_cache import RatesCache, RatesUnavailable
+from refresher import HostLock, RatesRefresher
+from rollups import PERIODS, RollupStore
+from snapshot_store import SharedSnapshotStore
+from upstream import UpstreamClient
+
+logger = logging.getLogger(__name__)
 
 app = Flask(__name__) 
 # Secret key needed by CSRFProtect
@@ -10,15 +35,27 @@ app.config['SECRET_KEY'] = os.environ.get("SECRET_KEY", "change_me_in_production
 
 # Enable CSRF protection (compliant solution)
 csrf = CSRFProtect(app)
-#  Limitation du CORS uniquement à la route /rates et aux origines connues
+#  Limitation du CORS aux routes publiques et aux origines connues
+ALLOWED_ORIGINS = [
+    "https://react-frontend-unique123.eastus.azurecontainer.io",
+    "http://react-frontend-unique123.eastus.azurecontainer.io",
+    "http://localhost:5173",
+    "http://localhost:3000"
+]
 CORS(app, resources={
-    r"/rates": {
-        "origins": [
-            "https://react-frontend-unique123.eastus.azurecontainer.io",
-            "http://react-frontend-unique123.eastus.azurecontainer.io",
-            "http://localhost:5173",
-            "http://localhost:3000"
-        ],
+    # Le motif couvre tout le chemin : /rates/<base> (et l'historique) à part
+    r"/rates(/.*)?": {
+        "origins": ALLOWED_ORIGINS,
+        "methods": ["GET"],
+        "allow_headers": ["Content-Type"]
+    },
+    r"/convert/batch": {
+        "origins": ALLOWED_ORIGINS,
+        "methods": ["POST"],
+        "allow_headers": ["Content-Type", "X-CSRF-Token"]
+    },
+    r"/convert": {
+        "origins": ALLOWED_ORIGINS,
         "methods": ["GET"],
         "allow_headers": ["Content-Type"]
     }
@@ -34,28 +71,659 @@ def protect_csrf():
         if token != CSRF_TOKEN:
             abort(403, description="CSRF token missing or invalid")
 
+#  Client upstream : session keep-alive poolée, timeouts et retries budgétés.
+#  Hedging : requête doublée au-delà du percentile UPSTREAM_HEDGE_PERCENTILE
+#  des latences observées (0 pour désactiver), dans la limite de
+#  UPSTREAM_HEDGE_RATIO doublon par requête
+EXCHANGE_API_URL = os.environ.get("EXCHANGE_API_URL", "https://v6.exchangerate-api.com/v6")
+EXCHANGE_API_KEY = os.environ.get("EXCHANGE_API_KEY", "97f9dc6126138480ee6da5fb")
+#  Quota mensuel de la clé (UPSTREAM_MONTHLY_QUOTA appels, 0 : pas de
+#  limite) : compté pour tous les workers de l'hôte dans un fichier partagé,
+#  suspendu après un 429 jusqu'au Retry-After. Le rafraîchisseur étire son
+#  intervalle pour tenir le budget jusqu'à la fin du mois.
+#  Le compteur doit survivre aux redémarrages : UPSTREAM_QUOTA_FILE (par
+#  défaut dans RATES_STATE_DIR) sur un stockage persistant, pas sur le
+#  tmpfs de RATES_SHARED_DIR.
+UPSTREAM_MONTHLY_QUOTA = int(os.environ.get("UPSTREAM_MONTHLY_QUOTA", 0))
+RATES_STATE_DIR = os.environ.get("RATES_STATE_DIR", tempfile.gettempdir())
+upstream_quota = QuotaManager(
+    os.environ.get("UPSTREAM_QUOTA_FILE", os.path.join(RATES_STATE_DIR, "upstream-quota.bin")),
+    UPSTREAM_MONTHLY_QUOTA,
+    burst=int(os.environ.get("UPSTREAM_QUOTA_BURST", 10)),
+) if UPSTREAM_MONTHLY_QUOTA > 0 else None
+
+UPSTREAM_OPTIONS = dict(
+    connect_timeout=float(os.environ.get("UPSTREAM_CONNECT_TIMEOUT", 3.05)),
+    read_timeout=float(os.environ.get("UPSTREAM_READ_TIMEOUT", 10)),
+    retries=int(os.environ.get("UPSTREAM_RETRIES", 2)),
+    retry_budget=float(os.environ.get("UPSTREAM_RETRY_BUDGET", 15)),
+    hedge_percentile=float(os.environ.get("UPSTREAM_HEDGE_PERCENTILE", 95)) or None,
+    hedge_min_delay=float(os.environ.get("UPSTREAM_HEDGE_MIN_DELAY", 0.05)),
+    hedge_ratio=float(os.environ.get("UPSTREAM_HEDGE_RATIO", 0.1)),
+    on_hedge=count_hedge,
+)
+upstream = UpstreamClient(EXCHANGE_API_URL, EXCHANGE_API_KEY, quota=upstream_quota,
+                          **UPSTREAM_OPTIONS)
+
+
+#  Fournisseurs de taux (RATES_PROVIDERS="exchangerate-api:2,open-er-api,frankfurter",
+#  poids après ":") : interrogés en parallèle et fusionnés par médiane
+#  pondérée. On attend RATES_PROVIDERS_QUORUM réponses (toutes par défaut),
+#  au plus RATES_PROVIDERS_TIMEOUT secondes. URL d'un fournisseur :
+#  RATES_PROVIDER_<NOM>_URL (ex. RATES_PROVIDER_FRANKFURTER_URL).
+def make_provider(kind, weight):
+    if kind == ExchangeRateApi.kind:
+        return ExchangeRateApi(upstream, weight)
+    cls = PROVIDERS[kind]
+    url = os.environ.get(f"RATES_PROVIDER_{kind.upper().replace('-', '_')}_URL", cls.default_url)
+    return cls(UpstreamClient(url, None, **UPSTREAM_OPTIONS), weight)
+
+
+rate_providers = ProviderAggregator(
+    [make_provider(kind, weight)
+     for kind, weight in parse_providers(os.environ.get("RATES_PROVIDERS", ExchangeRateApi.kind))],
+    quorum=int(os.environ.get("RATES_PROVIDERS_QUORUM", 0)) or None,
+    timeout=float(os.environ.get("RATES_PROVIDERS_TIMEOUT", 10)),
+)
+
+#  Disjoncteur : pendant un incident upstream, échec immédiat (ou dernier
+#  snapshot connu) au lieu d'occuper un worker sur un appel voué à l'échec
+upstream_breaker = CircuitBreaker(
+    failure_threshold=int(os.environ.get("UPSTREAM_BREAKER_THRESHOLD", 5)),
+    reset_timeout=float(os.environ.get("UPSTREAM_BREAKER_RESET", 30)),
+)
+
+
+def fetch_rates(base):
+    with track_upstream():
+        return upstream_breaker.call(rate_providers.fetch, base)
+
+
+#  Historique : MongoDB (MONGO_URI) et/ou fichiers colonnes journaliers
+#  (RATES_HISTORY_DIR). Chaque snapshot récupéré upstream est persisté par
+#  un thread dédié, hors du chemin de requête.
+MONGO_URI = os.environ.get("MONGO_URI")
+RATES_HISTORY_DIR = os.environ.get("RATES_HISTORY_DIR")
+history_store = None
+columnar_store = None
+if MONGO_URI:
+    history_store = MongoHistoryStore(
+        # connect=False : pas de thread de monitoring avant un fork (preload)
+        MongoClient(MONGO_URI, serverSelectionTimeoutMS=2000, tz_aware=True,
+                    connect=False)[
+            os.environ.get("MONGO_DB", "currency_converter")])
+if RATES_HISTORY_DIR:
+    columnar_store = ColumnarHistoryStore(RATES_HISTORY_DIR)
+archive_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="rates-archive")
+
+
+def history_reader():
+    """Store servant les requêtes d'historique : colonnes memmap en priorité."""
+    return columnar_store if columnar_store is not None else history_store
+
+
+def _archive(snapshot):
+    for store in (history_store, columnar_store):
+        if store is None:
+            continue
+        try:
+            store.record(snapshot)
+        except Exception:
+            logger.exception("Failed to archive rates snapshot %s", snapshot.version)
+
+
+def archive_snapshot(snapshot):
+    archive_executor.submit(_archive, snapshot)
+
+
+#  Agrégats OHLC/moyenne par jour, semaine et mois, mis à jour à chaque
+#  snapshot. Paires suivies : USD -> toutes devises, plus ROLLUP_PAIRS
+#  (ex. "EUR/GBP,EUR/MAD").
+#  Au premier usage, chaque worker (y compris après un recyclage) les
+#  reconstruit depuis l'historique des ROLLUP_BACKFILL_DAYS derniers jours :
+#  MongoDB (tous les snapshots) de préférence, sinon les colonnes
+#  journalières. Tous les workers servent alors les mêmes agrégats.
+rollups = RollupStore(cross_pairs=[
+    tuple(pair.strip().upper().split("/", 1))
+    for pair in os.environ.get("ROLLUP_PAIRS", "").split(",") if "/" in pair
+])
+ROLLUP_BACKFILL_DAYS = int(os.environ.get("ROLLUP_BACKFILL_DAYS", 400))
+_rollups_backfill_lock = threading.Lock()
+_rollups_backfilled = False
+
+
+def rollups_ready():
+    global _rollups_backfilled
+    if not _rollups_backfilled:
+        with _rollups_backfill_lock:
+            source = history_store if history_store is not None else columnar_store
+            if not _rollups_backfilled and source is not None:
+                now = datetime.now(timezone.utc)
+                rollups.rebuild(source.snapshots(now - timedelta(days=ROLLUP_BACKFILL_DAYS), now))
+                # Snapshot servi, peut-être pas encore archivé
+                latest = rates_cache.latest("USD")
+                if latest is not None:
+                    rollups.record(latest)
+            _rollups_backfilled = True
+    return rollups
+
+
+#  Index as-of pour les conversions à un instant passé (?at=), alimenté par
+#  les snapshots publiés et, au premier usage, par l'historique en colonnes
+asof_index = AsOfIndex()
+_asof_backfill_lock = threading.Lock()
+_asof_backfilled = False
+
+
+def asof_rates():
+    global _asof_backfilled
+    if not _asof_backfilled:
+        with _asof_backfill_lock:
+            if not _asof_backfilled and columnar_store is not None:
+                epoch = datetime.fromtimestamp(0, timezone.utc)
+                now = datetime.now(timezone.utc)
+                for code in columnar_store.currencies("USD"):
+                    asof_index.extend(code, columnar_store.history(
+                        code, epoch, now, limit=float("inf")))
+            _asof_backfilled = True
+    return asof_index
+
+
+def prepare_snapshot(snapshot):
+    """Travail fait une fois par snapshot, avant qu'il ne soit servi."""
+    snapshot.rates_bodies  # sérialisation et compression
+    rollups.record(snapshot)
+    asof_index.record(snapshot)
+
+
+#  Cache des taux : évite un appel upstream par requête
+#  Au-delà du soft TTL on sert l'ancien snapshot (stale) pendant qu'un
+#  rafraîchissement tourne en arrière-plan ; au-delà du hard TTL on attend.
+#  RATES_CACHE_TTL reste accepté comme soft TTL.
+rates_cache = RatesCache(
+    fetch_rates,
+    soft_ttl=float(os.environ.get(
+        "RATES_SOFT_TTL", os.environ.get("RATES_CACHE_TTL", 600))),
+    hard_ttl=float(os.environ.get("RATES_HARD_TTL", 3600)),
+    serve_stale_on=(CircuitOpen, QuotaExceeded),
+    on_publish=prepare_snapshot,
+    on_refresh=archive_snapshot,
+    on_lookup=count_lookup,
+    deferral=lambda: quota_deferral(),  # défini avec le rafraîchisseur
+)
+
+#  Rafraîchisseur de fond (RATES_REFRESH_INTERVAL > 0) : un seul worker par
+#  hôte (verrou fichier) appelle l'upstream et publie le snapshot dans un
+#  segment mmap partagé, les autres le relisent quand sa version change.
+#  Les routes ne lisent alors plus que la mémoire.
+RATES_REFRESH_INTERVAL = float(os.environ.get("RATES_REFRESH_INTERVAL", 0))
+RATES_SHARED_DIR = os.environ.get("RATES_SHARED_DIR", tempfile.gettempdir())
+
+snapshot_store = SharedSnapshotStore(RATES_SHARED_DIR)
+
+
+def refresh_and_publish(base):
+    snapshot_store.publish(rates_cache.refresh(base))
+
+
+def load_published():
+    for base in rates_refresher.bases:
+        snapshot = snapshot_store.load(base)
+        if snapshot is not None:
+            rates_cache.publish(snapshot)
+
+
+rates_refresher = RatesRefresher(
+    refresh_and_publish,
+    follow=load_published,
+    interval=RATES_REFRESH_INTERVAL,
+    jitter=float(os.environ.get("RATES_REFRESH_JITTER", 0.1)),
+    max_backoff=float(os.environ.get("RATES_REFRESH_MAX_BACKOFF", 300)),
+    lock=HostLock(os.path.join(RATES_SHARED_DIR, "rates-refresher.lock")),
+    pace=upstream_quota.refresh_interval if upstream_quota is not None else None,
+)
+
+
+def quota_deferral():
+    """Retard que le quota impose au rafraîchisseur (0 sans quota)."""
+    if upstream_quota is None or RATES_REFRESH_INTERVAL <= 0:
+        return 0
+    paced = upstream_quota.refresh_interval(RATES_REFRESH_INTERVAL, len(rates_refresher.bases))
+    # Marge pour le jitter du rafraîchisseur
+    return paced * (1 + rates_refresher.jitter) - RATES_REFRESH_INTERVAL
+
+
+def start_refresher():
+    if RATES_REFRESH_INTERVAL > 0:
+        rates_refresher.start()
+
+
+#  Sous Gunicorn avec preload_app, le thread est démarré dans chaque worker
+#  (hook post_fork de gunicorn.conf.py) et non dans le master
+if os.environ.get("RATES_REFRESH_DEFERRED") != "1":
+    start_refresher()
+
+
+def current_rates(base):
+    """Snapshot à servir : mémoire seule si le rafraîchisseur tourne."""
+    if rates_refresher.running:
+        # Lecture du compteur de version partagé : rechargement seulement
+        # si le leader a publié un nouveau snapshot
+        published = snapshot_store.load(base)
+        if published is not None:
+            rates_cache.publish(published)
+        return rates_cache.cached(base)
+    return rates_cache.lookup(base)
+
+
+def served_snapshots():
+    """Snapshots en mémoire (rechargés du segment partagé si besoin)."""
+    if rates_refresher.running:
+        load_published()
+    return [snapshot for snapshot in map(rates_cache.latest, rates_refresher.bases)
+            if snapshot is not None]
+
+
+#  Métriques Prometheus (/metrics), agrégées entre workers Gunicorn
+metrics = Metrics(served_snapshots, quota=upstream_quota)
+metrics.init_app(app)
+
+
+#  Santé du process (HEALTHCHECK Docker) : ne contacte jamais l'upstream
+@app.route('/health', methods=['GET'])
+def health():
+    now = time.time()
+    rates = {
+        snapshot.base: {
+            "version": snapshot.version,
+            "age": round(snapshot.age(now), 3),
+            "servable": snapshot.age(now) < rates_cache.hard_ttl,
+        }
+        for snapshot in served_snapshots()
+    }
+    return jsonify({"status": "ok", "rates": rates}), 200
+
+
+def last_modified(snapshot):
+    modified = snapshot.updated_at or int(snapshot.fetched_at)
+    return datetime.fromtimestamp(modified, timezone.utc)
+
+
+def snapshot_etag(snapshot, stale, encoding="identity", variant=None):
+    """
+    ETag fort : version du snapshot, horodatage upstream, variante (base
+    dérivée par exemple), indicateur stale et encodage (chaque
+    représentation compressée a ses propres octets).
+    """
+    etag = f"{snapshot.base}-{snapshot.version}-{snapshot.updated_at}"
+    if variant is not None:
+        etag += f"-{variant}"
+    if stale:
+        etag += "-stale"
+    if encoding != "identity":
+        etag += f"-{encoding}"
+    return etag
+
+
+def cache_headers(etag, snapshot, stale):
+    """ETag, Last-Modified et Cache-Control pour la durée de fraîcheur restante."""
+    max_age = 0 if stale else int(rates_cache.fresh_for(snapshot))
+    return {
+        "ETag": quote_etag(etag),
+        "Last-Modified": http_date(last_modified(snapshot)),
+        "Cache-Control": f"public, max-age={max_age}",
+        "Vary": "Accept-Encoding",
+    }
+
+
+def not_modified(etag, snapshot):
+    """Requête conditionnelle satisfaite : 304 sans sérialiser le corps."""
+    if request.if_none_match:
+        return request.if_none_match.contains(etag)
+    since = request.if_modified_since
+    return since is not None and last_modified(snapshot) <= since
+
+
+def error_response(message, error, status):
+    return jsonify({
+        "status": "error",
+        "message": message,
+        "error": error
+    }), status
+
+
+def encoded_response(encoded, snapshot, stale, variant=None):
+    """Réponse 200 (corps pré-encodé négocié) ou 304 pour un snapshot."""
+    encoding, body = encoded.negotiate(request.accept_encodings)
+    etag = snapshot_etag(snapshot, stale, encoding, variant)
+    headers = cache_headers(etag, snapshot, stale)
+    if not_modified(etag, snapshot):
+        return Response(status=304, headers=headers)
+
+    if encoding != "identity":
+        headers["Content-Encoding"] = encoding
+    return Response(body, status=200, headers=headers, mimetype="application/json")
+
+
+def rates_error_response(e):
+    """Erreur des routes de taux : 503 si indisponible, 500 sinon."""
+    if isinstance(e, RatesUnavailable):
+        return error_response("Conversion rates not available yet", str(e), 503)
+    if isinstance(e, (CircuitOpen, QuotaExceeded)):
+        return error_response("Conversion rates temporarily unavailable", str(e), 503)
+    return error_response("Failed to fetch conversion rates", str(e), 500)
+
+
+SYMBOLS_MAX = 200
+
+
+def parse_symbols(value):
+    """`?symbols=eur,GBP,EUR` -> ("EUR", "GBP") ; None sans filtre."""
+    if value is None:
+        return None
+    symbols = tuple(sorted({code.strip().upper() for code in value.split(",") if code.strip()}))
+    if not symbols:
+        return None
+    if len(symbols) > SYMBOLS_MAX or not all(code.isalpha() and len(code) == 3 for code in symbols):
+        raise ValueError("Parameter 'symbols' must be a comma-separated list of currency codes")
+    return symbols
+
+
+def serve_rates(base=None):
+    """
+    Taux du snapshot USD, dans une autre base si `base` est fourni, filtrés
+    par `?symbols=` ; corps pré-encodés et mis en cache par snapshot.
+    """
+    try:
+        symbols = parse_symbols(request.args.get("symbols"))
+    except ValueError as e:
+        return error_response("Invalid rates request", str(e), 400)
+    try:
+        snapshot, stale = current_rates("USD")
+        body = snapshot.table_body(stale, base, symbols)
+    except UnknownCurrency as e:
+        if base is not None and base not in snapshot.cross_rates.index:
+            return error_response("Unknown base currency", str(e), 404)
+        return error_response("Invalid rates request", str(e), 400)
+    except Exception as e:
+        return rates_error_response(e)
+    variant = "-".join(filter(None, (base, ",".join(symbols or ()))))
+    return encoded_response(body, snapshot, stale, variant=variant or None)
+
+
 #  Route GET pour les taux de conversion
+#  ?symbols=EUR,GBP : sous-ensemble, mis en cache par ensemble normalisé
 @app.route('/rates', methods=['GET'])
 def getRates():
+    return serve_rates()
+
+
+#  Table des taux dans une autre devise de base, dérivée localement du
+#  snapshot USD (aucun appel upstream supplémentaire)
+@app.route('/rates/<base>', methods=['GET'])
+def getRatesForBase(base):
+    return serve_rates(base.upper())
+
+
+CONVERT_MODES = ("exact", "float")
+
+
+def parse_decimal(value):
+    """Montant exact ; les flottants JSON passent par leur représentation."""
+    if isinstance(value, bool) or not isinstance(value, (str, int, float)):
+        raise ValueError("Amounts must be numbers")
     try:
-        response = requests.get(
-            "https://v6.exchangerate-api.com/v6/97f9dc6126138480ee6da5fb/latest/USD"
-        )
-        response.raise_for_status()
-        data = response.json()
+        amount = Decimal(value if isinstance(value, str) else repr(value))
+    except InvalidOperation:
+        raise ValueError("Amounts must be numbers") from None
+    if not amount.is_finite():
+        raise ValueError("Amounts must be finite numbers")
+    return amount
 
-        # Format attendu par les tests
-        return jsonify({
-            "status": "success",
-            "conversion_rates": data.get("conversion_rates", {})
-        }), 200
 
+#  Route GET de conversion côté serveur.
+#  mode=exact (défaut) : Decimal, arrondi bancaire aux unités mineures de la
+#  devise cible, montants renvoyés en chaîne ; mode=float : matrice NumPy.
+@app.route('/convert', methods=['GET'])
+def convert():
+    from_currency = request.args.get("from", "").upper()
+    to_currency = request.args.get("to", "").upper()
+    mode = request.args.get("mode", "exact")
+    if not from_currency or not to_currency:
+        return error_response("Invalid conversion request",
+                              "Parameters 'from' and 'to' are required", 400)
+    if mode not in CONVERT_MODES:
+        return error_response("Invalid conversion request",
+                              "Parameter 'mode' must be 'exact' or 'float'", 400)
+    try:
+        if mode == "exact":
+            amount = parse_decimal(request.args.get("amount", "1"))
+        else:
+            amount = float(request.args.get("amount", 1))
+            if not math.isfinite(amount):
+                raise ValueError("Parameter 'amount' must be finite")
+        at = parse_instant(request.args["at"]) if "at" in request.args else None
+    except ValueError as e:
+        return error_response("Invalid conversion request", str(e), 400)
+
+    try:
+        if at is None:
+            snapshot, stale = current_rates("USD")
+            cross_rates = snapshot.cross_rates
+            decimal_rates = snapshot.decimal_rates if mode == "exact" else None
+        else:
+            # Taux valides à l'instant demandé (dernier snapshot <= at)
+            stale = False
+            index = asof_rates()
+            pair = {code: index.rate_at(code, at.timestamp())
+                    for code in (from_currency, to_currency)}
+            cross_rates = None
+            decimal_rates = DecimalRates(pair) if mode == "exact" else None
+        if mode == "exact":
+            rate = str(decimal_rates.rate(from_currency, to_currency))
+            result = str(decimal_rates.convert(amount, from_currency, to_currency))
+            amount = str(amount)
+        else:
+            rate = cross_rates.rate(from_currency, to_currency) if cross_rates is not None \
+                else pair[to_currency] / pair[from_currency]
+            result = amount * rate
+            if not math.isfinite(result):
+                raise ValueError("Conversion result out of range")
+    except UnknownCurrency as e:
+        return error_response("Invalid conversion request", str(e), 400)
+    except RateNotAvailable as e:
+        return error_response("Invalid conversion request", str(e), 404)
+    except ValueError as e:
+        return error_response("Invalid conversion request", str(e), 400)
     except Exception as e:
-        return jsonify({
-            "status": "error",
-            "message": "Failed to fetch conversion rates",
-            "error": str(e)
-        }), 500
+        return rates_error_response(e)
+
+    body = {
+        "status": "success",
+        "stale": stale,
+        "mode": mode,
+        "from": from_currency,
+        "to": to_currency,
+        "amount": amount,
+        "rate": rate,
+        "result": result
+    }
+    if at is not None:
+        body["at"] = at.isoformat()
+    return jsonify(body), 200
+
+
+def parse_instant(value):
+    """Instant UTC depuis un timestamp Unix ou une date ISO 8601."""
+    try:
+        return datetime.fromtimestamp(float(value), timezone.utc)
+    except (ValueError, OverflowError, OSError):
+        pass
+    try:
+        instant = datetime.fromisoformat(value)
+    except ValueError:
+        raise ValueError(f"Invalid date: {value}") from None
+    if instant.tzinfo is None:
+        instant = instant.replace(tzinfo=timezone.utc)
+    return instant
+
+
+HISTORY_MAX_POINTS = int(os.environ.get("HISTORY_MAX_POINTS", 10000))
+
+
+#  Route GET de l'historique d'une devise (par défaut : 30 derniers jours)
+@app.route('/rates/history', methods=['GET'])
+def rates_history():
+    store = history_reader()
+    if store is None:
+        return error_response("Rates history unavailable",
+                              "History store is not configured", 503)
+    currency = request.args.get("currency", "").upper()
+    if not currency:
+        return error_response("Invalid history request",
+                              "Parameter 'currency' is required", 400)
+    try:
+        end = parse_instant(request.args["to"]) if "to" in request.args \
+            else datetime.now(timezone.utc)
+        start = parse_instant(request.args["from"]) if "from" in request.args \
+            else end - timedelta(days=30)
+    except ValueError as e:
+        return error_response("Invalid history request", str(e), 400)
+    if start > end:
+        return error_response("Invalid history request",
+                              "Parameter 'from' must not be after 'to'", 400)
+
+    try:
+        points = store.history(currency, start, end, limit=HISTORY_MAX_POINTS)
+    except Exception as e:
+        return error_response("Failed to read rates history", str(e), 500)
+
+    return jsonify({
+        "status": "success",
+        "base": "USD",
+        "currency": currency,
+        "points": [{"timestamp": timestamp.isoformat(), "rate": rate}
+                   for timestamp, rate in points]
+    }), 200
+
+
+#  Route GET des agrégats d'une paire, lus dans les rollups (O(buckets))
+@app.route('/rates/aggregate', methods=['GET'])
+def rates_aggregate():
+    from_currency = request.args.get("from", "USD").upper()
+    to_currency = request.args.get("to", "").upper()
+    period = request.args.get("period", "day")
+    if not to_currency:
+        return error_response("Invalid aggregate request",
+                              "Parameter 'to' is required", 400)
+    if period not in PERIODS:
+        return error_response("Invalid aggregate request",
+                              f"Parameter 'period' must be one of {', '.join(PERIODS)}", 400)
+    if not rollups_ready().tracks(from_currency, to_currency):
+        return error_response("Invalid aggregate request",
+                              f"Pair {from_currency}/{to_currency} is not aggregated", 400)
+    try:
+        end = parse_instant(request.args["end"]) if "end" in request.args \
+            else datetime.now(timezone.utc)
+        start = parse_instant(request.args["start"]) if "start" in request.args \
+            else end - timedelta(days=30)
+    except ValueError as e:
+        return error_response("Invalid aggregate request", str(e), 400)
+
+    return jsonify({
+        "status": "success",
+        "from": from_currency,
+        "to": to_currency,
+        "period": period,
+        "buckets": [dict(start=bucket_time.isoformat(), **values)
+                    for bucket_time, values in rollups.aggregate(
+                        from_currency, to_currency, period, start, end)]
+    }), 200
+
+
+CONVERT_BATCH_MAX = int(os.environ.get("CONVERT_BATCH_MAX", 100000))
+
+
+def _upper_codes(codes):
+    if isinstance(codes, str):
+        return codes.upper()
+    if not isinstance(codes, list) or not all(isinstance(code, str) for code in codes):
+        raise ValueError("Currencies must be a code or a list of codes")
+    return [code.upper() for code in codes]
+
+
+def _parse_instants(value):
+    """Instant(s) en secondes Unix : nombre, date ISO 8601 ou liste des deux."""
+    if isinstance(value, list):
+        if all(isinstance(item, (int, float)) and not isinstance(item, bool) for item in value):
+            return value
+        return [_parse_instants(item) for item in value]
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        return value
+    if isinstance(value, str):
+        return parse_instant(value).timestamp()
+    raise ValueError("Parameter 'at' must be a timestamp, a date or a list of them")
+
+
+#  Route POST de conversion par lot, vectorisée sur la matrice du snapshot
+#  ("mode": "float", défaut) ou exacte en Decimal ("mode": "exact"). Avec
+#  "at" (instant ou liste d'instants), conversion aux taux de ces instants.
+#  Exemptée du CSRF de session de Flask-WTF : ce client API est protégé par
+#  le jeton X-CSRF-Token vérifié dans protect_csrf.
+@app.route('/convert/batch', methods=['POST'])
+@csrf.exempt
+def convert_batch():
+    payload = request.get_json(silent=True)
+    if not isinstance(payload, dict):
+        return error_response("Invalid conversion request",
+                              "Expected a JSON object with 'amounts', 'from' and 'to'", 400)
+    amounts = payload.get("amounts")
+    if not isinstance(amounts, list):
+        return error_response("Invalid conversion request",
+                              "Parameter 'amounts' must be a list", 400)
+    if len(amounts) > CONVERT_BATCH_MAX:
+        return error_response("Invalid conversion request",
+                              f"At most {CONVERT_BATCH_MAX} conversions per batch", 413)
+    mode = payload.get("mode", "float")
+    if mode not in CONVERT_MODES:
+        return error_response("Invalid conversion request",
+                              "Parameter 'mode' must be 'exact' or 'float'", 400)
+
+    try:
+        from_codes = _upper_codes(payload.get("from"))
+        to_codes = _upper_codes(payload.get("to"))
+        if "at" in payload:
+            # Conversions as-of (rattrapage de factures) : float vectorisé
+            if mode == "exact":
+                raise ValueError("Point-in-time batches only support mode 'float'")
+            stale = False
+            results = asof_rates().convert_many(
+                amounts, from_codes, to_codes, _parse_instants(payload["at"])).tolist()
+        elif mode == "exact":
+            snapshot, stale = current_rates("USD")
+            results = [str(result) for result in snapshot.decimal_rates.convert_many(
+                [parse_decimal(amount) for amount in amounts], from_codes, to_codes)]
+        else:
+            snapshot, stale = current_rates("USD")
+            results = snapshot.cross_rates.convert_many(
+                amounts, from_codes, to_codes).tolist()
+    except UnknownCurrency as e:
+        return error_response("Invalid conversion request", str(e), 400)
+    except RateNotAvailable as e:
+        return error_response("Invalid conversion request", str(e), 404)
+    except (TypeError, ValueError) as e:
+        return error_response("Invalid conversion request", str(e), 400)
+    except Exception as e:
+        return rates_error_response(e)
+
+    return jsonify({
+        "status": "success",
+        "stale": stale,
+        "mode": mode,
+        "count": len(results),
+        "results": results
+    }), 200
+
 
 if __name__ == '__main__':
     port = int(os.environ.get("PORT", 5000))
@@ -0,0 +1,108 @@
+"""
+Point d'entrée ASGI du backend : mêmes routes que `app:app`, appels
+upstream non bloquants.
+
+    uvicorn asgi:application --host 0.0.0.0 --port 5000
+"""
+import asyncio
+import os
+
+from asgiref.sync import sync_to_async
+from asgiref.wsgi import WsgiToAsgiInstance
+
+import app as backend
+from async_upstream import AsyncUpstreamClient
+from metrics import track_upstream
+from upstream import ProcessLocalExecutor
+
+#  Routes qui lisent le snapshot des taux
+RATES_ROUTES = ("/rates", "/convert", "/convert/batch")
+HISTORY_ROUTES = ("/rates/history", "/rates/aggregate")
+
+
+def reads_rates(path):
+    """Route servie depuis le snapshot courant (y compris /rates/<base>)."""
+    return path in RATES_ROUTES or (path.startswith("/rates/") and path not in HISTORY_ROUTES)
+
+async_upstream = AsyncUpstreamClient(
+    backend.EXCHANGE_API_URL,
+    backend.EXCHANGE_API_KEY,
+    quota=backend.upstream_quota,
+    pool_size=int(os.environ.get("UPSTREAM_ASYNC_POOL_SIZE", 100)),
+    **backend.UPSTREAM_OPTIONS,
+)
+
+
+#  Threads qui exécutent les vues Flask : sans pool dédié, asgiref les
+#  exécute toutes sur un seul thread (thread_sensitive), l'une après l'autre
+view_executor = ProcessLocalExecutor(
+    max_workers=int(os.environ.get("ASGI_VIEW_THREADS", 32)),
+    thread_name_prefix="asgi-view",
+)
+
+
+class ThreadPoolWsgiInstance(WsgiToAsgiInstance):
+    """Requête WSGI d'asgiref, exécutée sur un thread de `view_executor`."""
+
+    # Fonction synchrone décorée par asgiref (@sync_to_async, thread_sensitive)
+    _run_wsgi_app = WsgiToAsgiInstance.__dict__["run_wsgi_app"].func
+
+    async def run_wsgi_app(self, body):
+        run = sync_to_async(self._run_wsgi_app, thread_sensitive=False,
+                            executor=view_executor.get())
+        await run(body)
+
+
+async def fetch_rates(base):
+    if len(backend.rate_providers.providers) > 1:
+        # Plusieurs fournisseurs : fan-out du pool de threads, hors boucle
+        return await asyncio.to_thread(backend.fetch_rates, base)
+    with track_upstream():
+        return await backend.upstream_breaker.call_async(async_upstream.fetch_latest, base)
+
+
+class RatesApplication:
+    """
+    Application ASGI devant l'app Flask.
+
+    Pour les routes de taux, le snapshot est d'abord chargé sur la boucle
+    asyncio (`RatesCache.load_async`, single-flight, client httpx) ; la vue
+    Flask, exécutée ensuite sur un thread de `view_executor`, ne lit plus
+    que la mémoire. Un upstream lent ne bloque donc ni worker ni thread :
+    les connexions qui l'attendent ne sont que des coroutines. Les vues
+    s'exécutent en parallèle (jusqu'à ASGI_VIEW_THREADS), une vue lente
+    n'en retarde pas une autre. Le routage, le CORS, le CSRF et les
+    réponses d'erreur restent ceux de Flask.
+    """
+
+    def __init__(self, wsgi_app, fetch):
+        self.wsgi_app = wsgi_app
+        self.fetch = fetch
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "lifespan":
+            await self.lifespan(receive, send)
+            return
+        if (scope["type"] == "http" and reads_rates(scope["path"])
+                and not backend.rates_refresher.running):
+            await backend.rates_cache.load_async("USD", self.fetch)
+        await ThreadPoolWsgiInstance(self.wsgi_app)(scope, receive, send)
+
+    async def lifespan(self, receive, send):
+        while True:
+            message = await receive()
+            if message["type"] == "lifespan.startup":
+                await send({"type": "lifespan.startup.complete"})
+            elif message["type"] == "lifespan.shutdown":
+                await async_upstream.aclose()
+                view_executor.shutdown()
+                await send({"type": "lifespan.shutdown.complete"})
+                return
+
+
+def create_app(fetch=fetch_rates):
+    """Application ASGI ; `fetch` est la coroutine d'appel upstream."""
+    return RatesApplication(backend.app, fetch)
+
+
+application = create_app()
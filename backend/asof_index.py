@@ -0,0 +1,115 @@
+"""Index « as-of » des taux : le taux valide à un instant passé en O(log n)."""
+import bisect
+import threading
+
+import numpy as np
+
+from conversion import UnknownCurrency, finite_results
+from history_store import snapshot_time
+
+
+class RateNotAvailable(LookupError):
+    """Aucun taux connu pour cette devise à (ou avant) l'instant demandé."""
+
+
+class AsOfIndex:
+    """
+    Par devise, un tableau trié des instants de validité et des taux
+    correspondants. Une requête as-of est une bisection : le taux retenu est
+    celui du dernier snapshot dont l'instant est <= à l'instant demandé.
+
+    Les tableaux NumPy d'une devise sont reconstruits paresseusement après
+    un ajout, pour les conversions par lot (`np.searchsorted` vectorisé).
+    """
+
+    def __init__(self):
+        self._times = {}
+        self._rates = {}
+        self._arrays = {}
+        self._last_seen = {}
+        self._lock = threading.Lock()
+
+    def _insert(self, code, timestamp, rate):
+        times = self._times.setdefault(code, [])
+        rates = self._rates.setdefault(code, [])
+        if not times or timestamp > times[-1]:
+            times.append(timestamp)
+            rates.append(rate)
+        else:
+            position = bisect.bisect_left(times, timestamp)
+            if position < len(times) and times[position] == timestamp:
+                rates[position] = rate
+            else:
+                times.insert(position, timestamp)
+                rates.insert(position, rate)
+        self._arrays.pop(code, None)
+
+    def record(self, snapshot):
+        """Ajoute un snapshot (USD) ; ignoré s'il est déjà indexé."""
+        timestamp = snapshot_time(snapshot).timestamp()
+        with self._lock:
+            if self._last_seen.get(snapshot.base) == timestamp:
+                return False
+            self._last_seen[snapshot.base] = timestamp
+            for code, rate in snapshot.rates.items():
+                self._insert(code, timestamp, rate)
+            return True
+
+    def extend(self, code, points):
+        """Charge des points `(datetime, taux)` d'un historique persistant."""
+        with self._lock:
+            for when, rate in points:
+                self._insert(code, when.timestamp(), rate)
+
+    def __len__(self):
+        return sum(len(times) for times in self._times.values())
+
+    def rate_at(self, code, timestamp):
+        with self._lock:
+            times = self._times.get(code)
+            if times is None:
+                raise UnknownCurrency(code)
+            position = bisect.bisect_right(times, timestamp) - 1
+            if position < 0:
+                raise RateNotAvailable(f"No {code} rate at or before {timestamp}")
+            return self._rates[code][position]
+
+    def convert(self, amount, from_currency, to_currency, timestamp):
+        return amount * self.rate_at(to_currency, timestamp) / self.rate_at(from_currency, timestamp)
+
+    def _arrays_for(self, code):
+        arrays = self._arrays.get(code)
+        if arrays is None:
+            times = self._times.get(code)
+            if times is None:
+                raise UnknownCurrency(code)
+            arrays = self._arrays[code] = (np.asarray(times, dtype=np.float64),
+                                           np.asarray(self._rates[code], dtype=np.float64))
+        return arrays
+
+    def rates_at(self, codes, timestamps):
+        """Taux vectorisés : une bisection NumPy par devise distincte."""
+        codes = np.asarray(codes, dtype=str)
+        timestamps = np.broadcast_to(np.asarray(timestamps, dtype=np.float64), codes.shape)
+        unique, inverse = np.unique(codes, return_inverse=True)
+        result = np.empty(codes.shape, dtype=np.float64)
+        with self._lock:
+            for position, code in enumerate(unique):
+                mask = inverse == position
+                times, rates = self._arrays_for(str(code))
+                found = np.searchsorted(times, timestamps[mask], side="right") - 1
+                if (found < 0).any():
+                    raise RateNotAvailable(f"No {code} rate at or before a requested instant")
+                result[mask] = rates[found]
+        return result
+
+    def convert_many(self, amounts, from_codes, to_codes, timestamps):
+        """Conversions as-of par lot ; codes et instants scalaires ou tableaux."""
+        amounts = np.asarray(amounts, dtype=np.float64)
+        if amounts.ndim != 1 or not np.isfinite(amounts).all():
+            raise ValueError("Amounts must be a flat list of finite numbers")
+        from_codes = np.broadcast_to(np.asarray(from_codes, dtype=str), amounts.shape)
+        to_codes = np.broadcast_to(np.asarray(to_codes, dtype=str), amounts.shape)
+        timestamps = np.broadcast_to(np.asarray(timestamps, dtype=np.float64), amounts.shape)
+        return finite_results(
+            amounts, self.rates_at(to_codes, timestamps) / self.rates_at(from_codes, timestamps))
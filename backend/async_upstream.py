@@ -0,0 +1,96 @@
+"""Client asyncio de l'API exchangerate-api, pour le point d'entrée ASGI."""
+import asyncio
+import time
+
+import httpx
+
+from upstream import BaseUpstreamClient, UpstreamError, retry_after_seconds
+
+
+class AsyncUpstreamClient(BaseUpstreamClient):
+    """
+    Équivalent asynchrone d'`UpstreamClient` sur un `httpx.AsyncClient`
+    poolé : mêmes timeouts, retries et budget, mais un appel lent ne
+    suspend que la coroutine qui l'attend, pas un worker ni un thread.
+    """
+
+    def __init__(self, base_url, api_key, pool_size=10, sleep=asyncio.sleep, **options):
+        super().__init__(base_url, api_key, **options)
+        self._sleep = sleep
+        self.client = httpx.AsyncClient(
+            timeout=httpx.Timeout(self.read_timeout, connect=self.connect_timeout),
+            limits=httpx.Limits(max_connections=pool_size,
+                                max_keepalive_connections=pool_size),
+        )
+
+    async def _get(self, url):
+        try:
+            response = await self.client.get(url)
+        except httpx.TimeoutException:
+            raise UpstreamError("Upstream request timed out", reason="timeout") from None
+        except httpx.TransportError:
+            raise UpstreamError("Upstream connection failed", reason="connection") from None
+        if response.is_error:
+            raise UpstreamError(f"Upstream returned HTTP {response.status_code}",
+                                response.status_code,
+                                retry_after=retry_after_seconds(response.headers.get("Retry-After")))
+        return response
+
+    async def _timed_get(self, url):
+        self._count("requests")
+        started = time.perf_counter()
+        try:
+            response = await self._get(url)
+        except UpstreamError as error:
+            self._failed(error)
+            raise
+        self.latencies.record(time.perf_counter() - started)
+        return response
+
+    async def _hedged_get(self, url):
+        self._reserve()
+        delay = self._hedge_delay()
+        if delay is None:
+            return await self._timed_get(url)
+
+        primary = asyncio.ensure_future(self._timed_get(url))
+        pending = {primary}
+        try:
+            done, _ = await asyncio.wait(pending, timeout=delay)
+            if done or not self._may_hedge():
+                return await primary
+
+            hedge = asyncio.ensure_future(self._timed_get(url))
+            pending = {primary, hedge}
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        if task is hedge:
+                            self._hedged("won")
+                        return task.result()
+            raise primary.exception()
+        finally:
+            for task in pending:  # le perdant (ou tout, si annulé) est réellement annulé
+                task.cancel()
+
+    async def get(self, path):
+        """GET `<base_url>/<api_key>/<path>` (sans clé si None) et retourne la réponse."""
+        url = self._url(path)
+        started = self._clock()
+        attempt = 0
+        while True:
+            try:
+                return await self._hedged_get(url)
+            except UpstreamError as error:
+                delay = self._retry_delay(error, attempt, started)
+                if delay is None:
+                    raise
+                attempt += 1
+                await self._sleep(delay)
+
+    async def fetch_latest(self, base):
+        return (await self.get(f"latest/{base}")).json()
+
+    async def aclose(self):
+        await self.client.aclose()
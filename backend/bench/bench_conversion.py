@@ -0,0 +1,57 @@
+"""
+Benchmark des chemins de conversion : float (matrice NumPy) vs Decimal exact.
+
+Usage : python bench/bench_conversion.py [--currencies 160] [--number 200000]
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import timeit
+from decimal import Decimal
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from conversion import CrossRates, DecimalRates  # noqa: E402
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--currencies", type=int, default=160)
+    parser.add_argument("--number", type=int, default=200000)
+    args = parser.parse_args()
+
+    rng = random.Random(42)
+    rates = {f"C{i:03d}": rng.uniform(0.01, 5000) for i in range(args.currencies)}
+    codes = list(rates)
+    pairs = [(rng.choice(codes), rng.choice(codes)) for _ in range(1024)]
+    amounts = [round(rng.uniform(1, 10000), 2) for _ in range(1024)]
+    decimal_amounts = [Decimal(repr(amount)) for amount in amounts]
+
+    build_float = timeit.timeit(lambda: CrossRates(rates), number=20) / 20
+    build_decimal = timeit.timeit(lambda: DecimalRates(rates), number=20) / 20
+    cross, engine = CrossRates(rates), DecimalRates(rates)
+
+    def run_float():
+        for amount, (source, target) in zip(amounts, pairs):
+            cross.convert(amount, source, target)
+
+    def run_decimal():
+        for amount, (source, target) in zip(decimal_amounts, pairs):
+            engine.convert(amount, source, target)
+
+    loops = max(1, args.number // len(pairs))
+    float_ops = loops * len(pairs) / timeit.timeit(run_float, number=loops)
+    decimal_ops = loops * len(pairs) / timeit.timeit(run_decimal, number=loops)
+
+    print(json.dumps({
+        "currencies": args.currencies,
+        "snapshot_build_ms": {"float": build_float * 1000, "decimal": build_decimal * 1000},
+        "conversions_per_sec": {"float": float_ops, "decimal": decimal_ops},
+        "decimal_overhead": float_ops / decimal_ops,
+    }, indent=2))
+
+
+if __name__ == "__main__":
+    main()
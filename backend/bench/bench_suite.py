@@ -0,0 +1,144 @@
+"""
+Suite de performance des endpoints : /rates et conversions, à niveaux de
+concurrence fixes, devant une API upstream factice locale.
+
+Rapport JSON : RPS, latences p50/p95/p99 (ms) par scénario et niveau, et
+mémoire par worker Gunicorn. Avec --baseline, chaque mesure est comparée à
+la référence enregistrée : le script sort en erreur (code 1) si le RPS
+baisse ou si le p99 monte de plus de --tolerance.
+
+Usage : python bench/bench_suite.py [--levels 1,8,32] [--duration 5]
+        [--output report.json] [--baseline base-report.json]
+        [--save-baseline base-report.json] [--backend ../base/backend]
+
+La référence dépend de la machine : elle n'est pas versionnée mais mesurée
+sur la même machine, juste avant, avec --save-baseline et --backend
+pointant sur un checkout de la version de référence (c'est ce que fait la
+CI avec la branche de base).
+"""
+import argparse
+import json
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from harness import BACKEND, gunicorn_server, stub_upstream, worker_memory  # noqa: E402
+from loadgen import run_load  # noqa: E402
+
+BATCH_BODY = json.dumps({
+    "amounts": [round(10 + i * 1.37, 2) for i in range(100)],
+    "from": ["USD", "EUR", "GBP", "JPY"] * 25,
+    "to": "EUR",
+}).encode()
+
+SCENARIOS = {
+    "rates": {"path": "/rates"},
+    "rates_gzip": {"path": "/rates", "headers": {"Accept-Encoding": "gzip"}},
+    "convert_exact": {"path": "/convert?from=EUR&to=GBP&amount=125.50"},
+    "convert_float": {"path": "/convert?from=EUR&to=GBP&amount=125.50&mode=float"},
+    "convert_batch": {
+        "path": "/convert/batch",
+        "method": "POST",
+        "body": BATCH_BODY,
+        "headers": {"X-CSRF-Token": os.environ.get("CSRF_TOKEN", "default_csrf_token")},
+    },
+}
+
+
+def run_suite(base_url, scenarios, levels, duration):
+    results = {}
+    for name in scenarios:
+        scenario = SCENARIOS[name]
+        url = base_url + scenario["path"]
+        options = {key: scenario[key] for key in ("method", "body", "headers") if key in scenario}
+        run_load(url, concurrency=max(levels), duration=min(duration, 1), **options)  # chauffe
+        results[name] = {
+            str(level): run_load(url, concurrency=level, duration=duration, **options)
+            for level in levels
+        }
+    return results
+
+
+def compare(report, baseline, tolerance):
+    """Régressions de `report` par rapport à `baseline` (liste de messages)."""
+    regressions = []
+    for name, levels in report["scenarios"].items():
+        for level, current in levels.items():
+            reference = baseline.get("scenarios", {}).get(name, {}).get(level)
+            if reference is None:
+                continue
+            if current["errors"] > reference.get("errors", 0):
+                regressions.append(f"{name}@{level}: {current['errors']} errors")
+            if current["rps"] < reference["rps"] * (1 - tolerance):
+                regressions.append(f"{name}@{level}: rps {current['rps']:.0f} "
+                                   f"< baseline {reference['rps']:.0f}")
+            p99, reference_p99 = current["latency_ms"]["p99"], reference["latency_ms"]["p99"]
+            if p99 is not None and reference_p99 and p99 > reference_p99 * (1 + tolerance):
+                regressions.append(f"{name}@{level}: p99 {p99:.1f}ms "
+                                   f"> baseline {reference_p99:.1f}ms")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--scenarios", default=",".join(SCENARIOS))
+    parser.add_argument("--levels", default="1,8,32")
+    parser.add_argument("--duration", type=float, default=5)
+    parser.add_argument("--worker-class", default="gthread")
+    parser.add_argument("--workers", type=int, default=2)
+    parser.add_argument("--app", default="app:app")
+    parser.add_argument("--backend", default=BACKEND)
+    parser.add_argument("--upstream-latency", type=float, default=0.05)
+    parser.add_argument("--upstream-error-rate", type=float, default=0.0)
+    parser.add_argument("--output")
+    parser.add_argument("--baseline")
+    parser.add_argument("--save-baseline")
+    parser.add_argument("--tolerance", type=float, default=0.25)
+    args = parser.parse_args()
+
+    scenarios = args.scenarios.split(",")
+    levels = [int(level) for level in args.levels.split(",")]
+    upstream = stub_upstream(args.upstream_latency, error_rate=args.upstream_error_rate)
+    upstream_url = upstream.url
+    try:
+        with gunicorn_server(upstream_url, args.worker_class, args.workers,
+                             app=args.app, backend=args.backend) as (process, base_url):
+            results = run_suite(base_url, scenarios, levels, args.duration)
+            memory = worker_memory(process.pid)
+    finally:
+        upstream.stop()
+
+    report = {
+        "config": {
+            "worker_class": args.worker_class,
+            "workers": args.workers,
+            "app": args.app,
+            "duration_s": args.duration,
+            "upstream_latency_s": args.upstream_latency,
+            "upstream_error_rate": args.upstream_error_rate,
+        },
+        "scenarios": results,
+        "memory": {
+            "workers": memory,
+            "max_rss_mb": max((worker["rss_mb"] for worker in memory), default=None),
+        },
+    }
+    output = json.dumps(report, indent=2)
+    print(output)
+    for path in (args.output, args.save_baseline):
+        if path:
+            with open(path, "w") as target:
+                target.write(output + "\n")
+
+    if args.baseline:
+        with open(args.baseline) as source:
+            regressions = compare(report, json.load(source), args.tolerance)
+        for regression in regressions:
+            print(f"REGRESSION {regression}", file=sys.stderr)
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,63 @@
+"""
+Benchmark des classes de worker Gunicorn (sync, gthread, gevent) sur /rates.
+
+Chaque classe démarre gunicorn avec gunicorn.conf.py devant une API upstream
+factice locale, puis subit la même charge.
+
+Usage : python bench/bench_workers.py [--classes sync,gthread,gevent]
+        [--workers 2] [--concurrency 32] [--duration 10] [--upstream-latency 0.05]
+"""
+import argparse
+import importlib.util
+import json
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from harness import gunicorn_server, stub_upstream  # noqa: E402
+from loadgen import run_load  # noqa: E402
+
+
+def bench_class(worker_class, args, upstream_url):
+    with gunicorn_server(upstream_url, worker_class, args.workers, args.threads,
+                         RATES_SOFT_TTL=args.soft_ttl) as (_, base_url):
+        url = f"{base_url}/rates"
+        run_load(url, concurrency=args.concurrency, duration=1)  # chauffe
+        return run_load(url, concurrency=args.concurrency, duration=args.duration)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--classes", default="sync,gthread,gevent")
+    parser.add_argument("--workers", type=int, default=2)
+    parser.add_argument("--threads", type=int, default=0)
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--duration", type=float, default=10)
+    parser.add_argument("--upstream-latency", type=float, default=0.05)
+    parser.add_argument("--soft-ttl", type=float, default=600,
+                        help="petit TTL pour faire payer l'upstream aux requêtes")
+    args = parser.parse_args()
+
+    upstream = stub_upstream(args.upstream_latency)
+    upstream_url = upstream.url
+    results = {}
+    for worker_class in args.classes.split(","):
+        if worker_class == "gevent" and importlib.util.find_spec("gevent") is None:
+            results[worker_class] = {"skipped": "gevent is not installed"}
+            continue
+        results[worker_class] = bench_class(worker_class, args, upstream_url)
+    upstream.stop()
+
+    print(json.dumps({
+        "endpoint": "/rates",
+        "workers": args.workers,
+        "concurrency": args.concurrency,
+        "duration_s": args.duration,
+        "upstream_latency_s": args.upstream_latency,
+        "results": results,
+    }, indent=2))
+
+
+if __name__ == "__main__":
+    main()
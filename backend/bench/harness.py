@@ -0,0 +1,106 @@
+"""
+Démarrage de l'app sous Gunicorn devant une API upstream factice locale,
+et mesure mémoire de ses workers (Linux, /proc).
+"""
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+from contextlib import contextmanager
+
+from loadgen import wait_until_up
+
+BACKEND = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, BACKEND)
+
+from fake_exchange_api import FakeApiConfig, FakeExchangeApi  # noqa: E402
+
+
+def stub_upstream(latency=0.0, currencies=160, **options):
+    """API upstream factice démarrée en tâche de fond (voir fake_exchange_api)."""
+    return FakeExchangeApi(FakeApiConfig(latency=latency, currencies=currencies,
+                                         **options)).start()
+
+
+def free_port():
+    with socket.socket() as probe:
+        probe.bind(("127.0.0.1", 0))
+        return probe.getsockname()[1]
+
+
+@contextmanager
+def gunicorn_server(upstream_url, worker_class="gthread", workers=2, threads=0,
+                    app="app:app", backend=BACKEND, **env):
+    """
+    Lance `gunicorn --config gunicorn.conf.py <app>` sur un port libre, depuis
+    le répertoire `backend`, et retourne `(process, url de base)` une fois
+    /rates joignable.
+    """
+    port = free_port()
+    environ = dict(os.environ,
+                   GUNICORN_WORKER_CLASS=worker_class,
+                   GUNICORN_BIND=f"127.0.0.1:{port}",
+                   GUNICORN_WORKERS=str(workers),
+                   GUNICORN_MAX_REQUESTS="0",
+                   EXCHANGE_API_URL=upstream_url,
+                   RATES_SHARED_DIR=tempfile.mkdtemp(prefix="bench-"))
+    if threads:
+        environ["GUNICORN_THREADS"] = str(threads)
+    environ.update({key: str(value) for key, value in env.items()})
+    process = subprocess.Popen(
+        [sys.executable, "-m", "gunicorn", "--config", "gunicorn.conf.py",
+         "--access-logfile", "/dev/null", app],
+        cwd=backend, env=environ, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        base_url = f"http://127.0.0.1:{port}"
+        wait_until_up(f"{base_url}/rates")
+        yield process, base_url
+    finally:
+        process.terminate()
+        process.wait(timeout=30)
+
+
+def _children(pid):
+    children = []
+    for entry in os.listdir("/proc"):
+        if not entry.isdigit():
+            continue
+        try:
+            with open(f"/proc/{entry}/stat") as stat:
+                # Le nom du process (entre parenthèses) peut contenir des espaces
+                fields = stat.read().rsplit(")", 1)[1].split()
+        except OSError:
+            continue
+        if int(fields[1]) == pid:
+            children.append(int(entry))
+    return sorted(children)
+
+
+def _memory_kb(pid):
+    """RSS et PSS (pages partagées réparties entre process) en Ko."""
+    values = {}
+    for path in (f"/proc/{pid}/smaps_rollup", f"/proc/{pid}/status"):
+        try:
+            with open(path) as source:
+                for line in source:
+                    key, _, rest = line.partition(":")
+                    if key in ("Rss", "Pss", "VmRSS"):
+                        values.setdefault(key, int(rest.split()[0]))
+        except OSError:
+            continue
+    return values.get("Rss", values.get("VmRSS")), values.get("Pss")
+
+
+def worker_memory(master_pid):
+    """Mémoire par worker (Mo) ; vide hors Linux."""
+    if not os.path.isdir("/proc"):
+        return []
+    workers = []
+    for pid in _children(master_pid):
+        rss, pss = _memory_kb(pid)
+        if rss is None:
+            continue
+        workers.append({"pid": pid, "rss_mb": rss / 1024,
+                        "pss_mb": pss / 1024 if pss is not None else None})
+    return workers
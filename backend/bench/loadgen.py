@@ -0,0 +1,91 @@
+"""
+Générateur de charge minimal : N connexions keep-alive, chacune dans son
+thread, enchaînent des requêtes pendant une durée fixe.
+"""
+import http.client
+import threading
+import time
+from urllib.parse import urlsplit
+
+
+def percentile(sorted_values, fraction):
+    if not sorted_values:
+        return None
+    index = min(len(sorted_values) - 1, int(round(fraction * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+def run_load(url, concurrency=16, duration=5.0, method="GET", body=None, headers=None,
+             timeout=10.0):
+    """
+    Charge `url` et retourne RPS, latences p50/p95/p99 (ms) et erreurs.
+    Une réponse autre que 2xx/304 compte comme erreur.
+    """
+    parts = urlsplit(url)
+    target = parts.path + (f"?{parts.query}" if parts.query else "")
+    headers = dict(headers or {})
+    if body is not None:
+        headers.setdefault("Content-Type", "application/json")
+    latencies = [[] for _ in range(concurrency)]
+    errors = [0] * concurrency
+    start = threading.Barrier(concurrency + 1)
+    deadline = []
+
+    def worker(slot):
+        connection = http.client.HTTPConnection(parts.hostname, parts.port, timeout=timeout)
+        start.wait()
+        while time.perf_counter() < deadline[0]:
+            began = time.perf_counter()
+            try:
+                connection.request(method, target, body=body, headers=headers)
+                response = connection.getresponse()
+                response.read()
+                ok = 200 <= response.status < 300 or response.status == 304
+            except (OSError, http.client.HTTPException):
+                ok = False
+                connection.close()
+                connection = http.client.HTTPConnection(parts.hostname, parts.port,
+                                                        timeout=timeout)
+            latencies[slot].append(time.perf_counter() - began)
+            if not ok:
+                errors[slot] += 1
+        connection.close()
+
+    threads = [threading.Thread(target=worker, args=(slot,), daemon=True)
+               for slot in range(concurrency)]
+    for thread in threads:
+        thread.start()
+    began = time.perf_counter()
+    deadline.append(began + duration)
+    start.wait()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - began
+
+    samples = sorted(latency for slot in latencies for latency in slot)
+    return {
+        "requests": len(samples),
+        "errors": sum(errors),
+        "rps": len(samples) / elapsed,
+        "latency_ms": {
+            name: percentile(samples, fraction) * 1000 if samples else None
+            for name, fraction in (("p50", 0.50), ("p95", 0.95), ("p99", 0.99))
+        },
+    }
+
+
+def wait_until_up(url, timeout=30.0):
+    """Attend que `url` réponde (serveur en cours de démarrage)."""
+    parts = urlsplit(url)
+    deadline = time.monotonic() + timeout
+    while True:
+        try:
+            connection = http.client.HTTPConnection(parts.hostname, parts.port, timeout=2)
+            connection.request("GET", parts.path or "/")
+            connection.getresponse().read()
+            connection.close()
+            return
+        except (OSError, http.client.HTTPException):
+            if time.monotonic() > deadline:
+                raise RuntimeError(f"{url} did not come up within {timeout}s") from None
+            time.sleep(0.1)
@@ -0,0 +1,97 @@
+"""Disjoncteur devant l'upstream : échouer vite pendant un incident."""
+import threading
+import time
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+class CircuitOpen(Exception):
+    """Appel refusé sans contacter l'upstream : le circuit est ouvert."""
+
+
+class CircuitBreaker:
+    """
+    Disjoncteur à trois états.
+
+    - closed : les appels passent ; après `failure_threshold` échecs
+      consécutifs le circuit s'ouvre ;
+    - open : les appels échouent immédiatement avec `CircuitOpen` pendant
+      `reset_timeout` secondes ;
+    - half_open : jusqu'à `half_open_max_calls` appels d'essai passent ; un
+      succès referme le circuit, un échec le rouvre.
+    """
+
+    def __init__(self, failure_threshold=5, reset_timeout=30, half_open_max_calls=1,
+                 clock=time.monotonic):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.half_open_max_calls = half_open_max_calls
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._state = CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._trials = 0
+
+    @property
+    def state(self):
+        with self._lock:
+            return self._current_state()
+
+    def _current_state(self):
+        if self._state == OPEN and self._clock() - self._opened_at >= self.reset_timeout:
+            self._state = HALF_OPEN
+            self._trials = 0
+        return self._state
+
+    def _before_call(self):
+        with self._lock:
+            state = self._current_state()
+            if state == OPEN:
+                raise CircuitOpen("Upstream circuit is open")
+            if state == HALF_OPEN:
+                if self._trials >= self.half_open_max_calls:
+                    raise CircuitOpen("Upstream circuit is half-open, trial in progress")
+                self._trials += 1
+
+    def _on_success(self):
+        with self._lock:
+            self._state = CLOSED
+            self._failures = 0
+
+    def _on_failure(self):
+        with self._lock:
+            self._failures += 1
+            if self._state == HALF_OPEN or self._failures >= self.failure_threshold:
+                self._state = OPEN
+                self._opened_at = self._clock()
+                self._failures = 0
+
+    def reset(self):
+        with self._lock:
+            self._state = CLOSED
+            self._failures = 0
+            self._trials = 0
+
+    def call(self, func, *args, **kwargs):
+        self._before_call()
+        try:
+            result = func(*args, **kwargs)
+        except Exception:
+            self._on_failure()
+            raise
+        self._on_success()
+        return result
+
+    async def call_async(self, func, *args, **kwargs):
+        """`call` pour une coroutine : `func(*args, **kwargs)` est attendue."""
+        self._before_call()
+        try:
+            result = await func(*args, **kwargs)
+        except Exception:
+            self._on_failure()
+            raise
+        self._on_success()
+        return result
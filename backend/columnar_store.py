@@ -0,0 +1,166 @@
+"""Historique journalier des taux en colonnes sur disque, lu par np.memmap."""
+import json
+import os
+from contextlib import contextmanager
+from datetime import date, datetime, timedelta, timezone
+
+import numpy as np
+
+from history_store import snapshot_time, stored_snapshot
+
+try:
+    import fcntl
+except ImportError:  # Windows : un seul écrivain en dev
+    fcntl = None
+
+DAYS_PER_YEAR = 366
+
+
+class ColumnarHistoryStore:
+    """
+    Un fichier `.npy` par (base, année), de forme (capacité devises, 366) :
+    chaque devise occupe une ligne contiguë, indexée par jour de l'année.
+    L'en-tête des devises (ordre des lignes) est un fichier JSON voisin
+    auquel on ne fait qu'ajouter des codes.
+
+    Les lectures passent par `np.load(mmap_mode="r")` : une requête par
+    plage est une tranche de la ligne de la devise, sans parcours ni copie.
+    Les jours sans snapshot valent NaN.
+    """
+
+    def __init__(self, directory, capacity=256):
+        self.directory = directory
+        self.capacity = capacity
+        self._maps = {}
+
+    def _paths(self, base, year):
+        folder = os.path.join(self.directory, base)
+        return (os.path.join(folder, f"{year}.npy"),
+                os.path.join(folder, f"{year}.currencies.json"))
+
+    @contextmanager
+    def _write_lock(self, base):
+        folder = os.path.join(self.directory, base)
+        os.makedirs(folder, exist_ok=True)
+        with open(os.path.join(folder, ".lock"), "w") as lock_file:
+            if fcntl is not None:
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+            yield
+
+    def _read_index(self, path):
+        try:
+            with open(path) as header:
+                codes = json.load(header)
+        except FileNotFoundError:
+            return {}
+        return {code: row for row, code in enumerate(codes)}
+
+    def _write_index(self, path, index):
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "w") as header:
+            json.dump(sorted(index, key=index.get), header)
+        os.replace(tmp_path, path)
+
+    def record(self, snapshot):
+        """Écrit les taux du snapshot dans la colonne de son jour."""
+        when = snapshot_time(snapshot)
+        day = when.timetuple().tm_yday - 1
+        data_path, index_path = self._paths(snapshot.base, when.year)
+        with self._write_lock(snapshot.base):
+            index = self._read_index(index_path)
+            new_codes = [code for code in snapshot.rates if code not in index]
+            if len(index) + len(new_codes) > self.capacity:
+                raise ValueError(f"More than {self.capacity} currencies for {snapshot.base}")
+            for code in new_codes:
+                index[code] = len(index)
+
+            if os.path.exists(data_path):
+                table = np.load(data_path, mmap_mode="r+")
+            else:
+                table = np.lib.format.open_memmap(
+                    data_path, mode="w+", dtype=np.float64,
+                    shape=(self.capacity, DAYS_PER_YEAR))
+                table[:] = np.nan
+            rows = np.fromiter((index[code] for code in snapshot.rates), dtype=np.intp)
+            table[rows, day] = np.fromiter(snapshot.rates.values(), dtype=np.float64)
+            table.flush()
+            del table
+            if new_codes:
+                self._write_index(index_path, index)
+        self._maps.pop((snapshot.base, when.year), None)
+        return len(snapshot.rates)
+
+    def _year(self, base, year):
+        """(index des devises, table memmap en lecture) d'une année, ou None."""
+        cached = self._maps.get((base, year))
+        data_path, index_path = self._paths(base, year)
+        try:
+            stamp = os.stat(index_path).st_mtime_ns
+        except FileNotFoundError:
+            return None
+        if cached is not None and cached[0] == stamp:
+            return cached[1], cached[2]
+        index = self._read_index(index_path)
+        table = np.load(data_path, mmap_mode="r")
+        self._maps[(base, year)] = (stamp, index, table)
+        return index, table
+
+    def currencies(self, base="USD"):
+        """Codes présents dans au moins une année de `base`."""
+        folder = os.path.join(self.directory, base)
+        try:
+            names = os.listdir(folder)
+        except FileNotFoundError:
+            return set()
+        codes = set()
+        for name in names:
+            if name.endswith(".currencies.json"):
+                codes.update(self._read_index(os.path.join(folder, name)))
+        return codes
+
+    def series(self, currency, start, end, base="USD"):
+        """
+        Tranches `(premier jour, valeurs)` de `currency` entre `start` et
+        `end`, une par année ; les valeurs sont des vues sur le fichier.
+        """
+        for year in range(start.year, end.year + 1):
+            loaded = self._year(base, year)
+            if loaded is None:
+                continue
+            index, table = loaded
+            row = index.get(currency)
+            if row is None:
+                continue
+            first = start.timetuple().tm_yday - 1 if year == start.year else 0
+            last = end.timetuple().tm_yday if year == end.year else DAYS_PER_YEAR
+            yield date(year, 1, 1) + timedelta(days=first), table[row, first:last]
+
+    def snapshots(self, start, end, base="USD"):
+        """Un snapshot par jour archivé entre `start` et `end`, dans l'ordre chronologique."""
+        for year in range(start.year, end.year + 1):
+            loaded = self._year(base, year)
+            if loaded is None:
+                continue
+            index, table = loaded
+            codes = sorted(index, key=index.get)
+            first = start.timetuple().tm_yday - 1 if year == start.year else 0
+            last = end.timetuple().tm_yday if year == end.year else DAYS_PER_YEAR
+            for day in range(first, last):
+                column = table[:len(codes), day]
+                present = np.flatnonzero(~np.isnan(column))
+                if len(present):
+                    moment = datetime(year, 1, 1) + timedelta(days=day)
+                    yield stored_snapshot(base, moment, {
+                        codes[row]: float(column[row]) for row in present})
+
+    def history(self, currency, start, end, base="USD", limit=10000):
+        """Points journaliers `(timestamp, rate)` entre `start` et `end` inclus."""
+        points = []
+        for first_day, values in self.series(currency, start, end, base):
+            for offset in np.flatnonzero(~np.isnan(values)):
+                day = first_day + timedelta(days=int(offset))
+                points.append((datetime(day.year, day.month, day.day, tzinfo=timezone.utc),
+                               float(values[offset])))
+                if len(points) >= limit:
+                    return points
+        return points
@@ -0,0 +1,151 @@
+"""Conversion de devises à partir d'un snapshot de taux."""
+from decimal import Context, Decimal, InvalidOperation, ROUND_HALF_EVEN
+
+import numpy as np
+
+# Nombre de décimales des devises qui s'écartent des 2 décimales usuelles
+# (ISO 4217)
+MINOR_UNITS = {
+    "BHD": 3, "BIF": 0, "CLF": 4, "CLP": 0, "DJF": 0, "GNF": 0, "IQD": 3,
+    "ISK": 0, "JOD": 3, "JPY": 0, "KMF": 0, "KRW": 0, "KWD": 3, "LYD": 3,
+    "OMR": 3, "PYG": 0, "RWF": 0, "TND": 3, "UGX": 0, "UYI": 0, "UYW": 4,
+    "VND": 0, "VUV": 0, "XAF": 0, "XOF": 0, "XPF": 0,
+}
+DEFAULT_MINOR_UNITS = 2
+RATE_PLACES = 10
+
+
+class UnknownCurrency(KeyError):
+    """Devise absente du snapshot de taux."""
+
+    def __str__(self):
+        return f"Unknown currency: {self.args[0]}"
+
+
+def finite_results(amounts, rates):
+    """`amounts * rates`, ou ValueError si un résultat déborde des float64."""
+    with np.errstate(over="ignore", invalid="ignore"):
+        results = amounts * rates
+    if not np.isfinite(results).all():
+        raise ValueError("Conversion result out of range")
+    return results
+
+
+class CrossRates:
+    """
+    Matrice N×N des taux croisés, construite une fois par snapshot.
+
+    `matrix[i, j]` est le nombre d'unités de la devise j pour une unité de
+    la devise i ; une conversion est donc une simple lecture de cellule.
+    """
+
+    def __init__(self, rates):
+        self.codes = list(rates)
+        self.index = {code: i for i, code in enumerate(self.codes)}
+        self.vector = np.fromiter(rates.values(), dtype=np.float64, count=len(self.codes))
+        with np.errstate(divide="ignore", invalid="ignore"):
+            self.matrix = self.vector[np.newaxis, :] / self.vector[:, np.newaxis]
+
+    def position(self, code):
+        try:
+            return self.index[code]
+        except KeyError:
+            raise UnknownCurrency(code) from None
+
+    def rate(self, from_currency, to_currency):
+        return float(self.matrix[self.position(from_currency), self.position(to_currency)])
+
+    def convert(self, amount, from_currency, to_currency):
+        return amount * self.rate(from_currency, to_currency)
+
+    def table(self, base, codes=None):
+        """Taux pour une unité de `base`, de toutes les devises ou de `codes`."""
+        if codes is None:
+            codes, vector = self.codes, self.vector
+        else:
+            vector = self.vector[[self.position(code) for code in codes]]
+        rates = vector / self.vector[self.position(base)]
+        return dict(zip(codes, rates.tolist()))
+
+    def positions(self, codes):
+        """Indices d'un tableau de codes, résolus une fois par code distinct."""
+        unique, inverse = np.unique(np.asarray(codes, dtype=str), return_inverse=True)
+        lookup = np.fromiter((self.position(code) for code in unique),
+                             dtype=np.intp, count=len(unique))
+        return lookup[inverse]
+
+    def convert_many(self, amounts, from_codes, to_codes):
+        """
+        Conversion vectorisée : `from_codes` et `to_codes` sont des tableaux
+        de même longueur que `amounts`, ou un code unique diffusé à tous.
+        """
+        amounts = np.asarray(amounts, dtype=np.float64)
+        if amounts.ndim != 1 or not np.isfinite(amounts).all():
+            raise ValueError("Amounts must be a flat list of finite numbers")
+        rows = self._broadcast_positions(from_codes, len(amounts))
+        columns = self._broadcast_positions(to_codes, len(amounts))
+        return finite_results(amounts, self.matrix[rows, columns])
+
+    def _broadcast_positions(self, codes, size):
+        if isinstance(codes, str):
+            return np.full(size, self.position(codes), dtype=np.intp)
+        if len(codes) != size:
+            raise ValueError("Currency arrays must match the amounts length")
+        return self.positions(codes)
+
+
+class DecimalRates:
+    """
+    Moteur de conversion exact en `Decimal`, construit une fois par snapshot.
+
+    Les taux sont quantifiés à `RATE_PLACES` décimales et les quanta des
+    devises (unités mineures) précalculés à la construction ; le contexte
+    `Decimal` est créé une seule fois et ses méthodes appelées directement,
+    sans passer par le contexte local au thread. Le résultat est arrondi
+    aux unités mineures de la devise cible avec l'arrondi bancaire.
+    """
+
+    def __init__(self, rates, rounding=ROUND_HALF_EVEN):
+        self.context = Context(prec=34, rounding=rounding)
+        rate_quantum = Decimal(1).scaleb(-RATE_PLACES)
+        self.rates = {
+            code: Decimal(repr(rate)).quantize(rate_quantum, context=self.context)
+            for code, rate in rates.items()
+        }
+        self.quanta = {
+            code: Decimal(1).scaleb(-MINOR_UNITS.get(code, DEFAULT_MINOR_UNITS))
+            for code in rates
+        }
+        self._rate_quantum = rate_quantum
+
+    def _rate(self, code):
+        try:
+            return self.rates[code]
+        except KeyError:
+            raise UnknownCurrency(code) from None
+
+    def rate(self, from_currency, to_currency):
+        ctx = self.context
+        cross = ctx.divide(self._rate(to_currency), self._rate(from_currency))
+        return cross.quantize(self._rate_quantum, context=ctx)
+
+    def convert(self, amount, from_currency, to_currency):
+        ctx = self.context
+        raw = ctx.divide(ctx.multiply(amount, self._rate(to_currency)),
+                         self._rate(from_currency))
+        try:
+            return raw.quantize(self.quanta[to_currency], context=ctx)
+        except InvalidOperation:
+            # Plus de chiffres que la précision du contexte (34)
+            raise ValueError("Amount too large for an exact conversion") from None
+
+    def convert_many(self, amounts, from_codes, to_codes):
+        size = len(amounts)
+        if isinstance(from_codes, str):
+            from_codes = [from_codes] * size
+        if isinstance(to_codes, str):
+            to_codes = [to_codes] * size
+        if len(from_codes) != size or len(to_codes) != size:
+            raise ValueError("Currency arrays must match the amounts length")
+        return [self.convert(amount, from_code, to_code)
+                for amount, from_code, to_code in zip(amounts, from_codes, to_codes)]
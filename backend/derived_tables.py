@@ -0,0 +1,42 @@
+"""Corps de taux dérivés d'un snapshot (autre base, sous-ensemble de devises)."""
+import threading
+from collections import OrderedDict
+
+DERIVED_TABLES_MAX = 32
+SUBSET_BODIES_MAX = 256
+
+
+class BodyLRU:
+    """
+    LRU borné de corps pré-encodés, propre à un snapshot.
+
+    Un corps est construit à la première demande et servi ensuite depuis le
+    LRU. Le cache appartient au snapshot : une nouvelle version repart d'un
+    cache vide, sans invalidation à gérer.
+    """
+
+    def __init__(self, maxsize):
+        self.maxsize = maxsize
+        self._bodies = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._bodies)
+
+    def get(self, key, build):
+        """Corps de `key`, construit par `build()` s'il est absent."""
+        with self._lock:
+            body = self._bodies.get(key)
+            if body is not None:
+                self._bodies.move_to_end(key)
+                return body
+
+        # Construction hors verrou : deux requêtes simultanées peuvent
+        # construire le même corps, la seconde remplace la première
+        body = build()
+        with self._lock:
+            self._bodies[key] = body
+            self._bodies.move_to_end(key)
+            while len(self._bodies) > self.maxsize:
+                self._bodies.popitem(last=False)
+        return body
@@ -0,0 +1,36 @@
+"""Corps de réponse JSON sérialisés et compressés une seule fois."""
+import gzip
+import json
+
+try:
+    import brotli
+except ImportError:  # dépendance optionnelle : gzip et identity restent servis
+    brotli = None
+
+
+class EncodedBody:
+    """
+    Corps JSON pré-encodé en identity, gzip et (si disponible) brotli.
+
+    Construit une fois par snapshot ; une requête ne fait plus que choisir
+    le tampon correspondant à son `Accept-Encoding`.
+    """
+
+    def __init__(self, payload):
+        identity = json.dumps(payload, separators=(",", ":")).encode("utf-8")
+        self.encodings = {
+            "identity": identity,
+            "gzip": gzip.compress(identity, compresslevel=9, mtime=0),
+        }
+        if brotli is not None:
+            self.encodings["br"] = brotli.compress(identity, quality=11)
+        # Ordre de préférence à qualité égale : le plus compact d'abord
+        self.preference = sorted(self.encodings, key=lambda name: len(self.encodings[name]))
+
+    def negotiate(self, accept_encodings):
+        """
+        Retourne `(encoding, body)` pour un en-tête `Accept-Encoding` déjà
+        parsé par Werkzeug ; identity si rien d'autre n'est acceptable.
+        """
+        encoding = accept_encodings.best_match(self.preference, default="identity")
+        return encoding, self.encodings[encoding]
@@ -0,0 +1,235 @@
+"""
+Fausse API de taux locale, pour les benchmarks et les tests de chaos hors
+ligne. Elle sert les formats des fournisseurs de `providers` :
+
+- exchangerate-api : `/v6/<key>/latest/<base>` ;
+- open.er-api : `/v6/latest/<base>` ;
+- Frankfurter : `/latest?from=<base>`.
+
+    python fake_exchange_api.py --port 8081 --latency 0.05 --error-rate 0.05
+    EXCHANGE_API_URL=http://127.0.0.1:8081/v6 gunicorn --config gunicorn.conf.py app:app
+"""
+import argparse
+import json
+import random
+import threading
+import time
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+REFERENCE_CODES = ("USD", "EUR", "GBP", "JPY", "CHF", "CAD", "AUD", "MAD", "CNY", "INR")
+
+
+@dataclass
+class FakeApiConfig:
+    """
+    Comportement du serveur, modifiable pendant qu'il tourne.
+
+    - latence : `latency` + uniforme(0, `jitter`) ; une fraction `slow_rate`
+      des réponses attend `slow_latency` (queue de distribution) ;
+    - erreurs : une fraction `error_rate` des requêtes reçoit `error_status` ;
+    - taille : `currencies` devises par réponse ;
+    - 429 : au-delà de `rate_limit` requêtes par fenêtre de `window`
+      secondes, ou de `quota` requêtes au total, réponse 429 avec
+      `Retry-After` (fin de fenêtre, ou `retry_after` pour le quota) ;
+    - `api_key` : si défini, toute autre clé reçoit 403 (invalid-key) ;
+    - `skew` : facteur appliqué aux taux hors base (fournisseur divergent).
+    """
+
+    latency: float = 0.0
+    jitter: float = 0.0
+    slow_rate: float = 0.0
+    slow_latency: float = 1.0
+    error_rate: float = 0.0
+    error_status: int = 503
+    currencies: int = 160
+    rate_limit: int = 0
+    window: float = 1.0
+    quota: int = 0
+    retry_after: int = 3600
+    api_key: str = None
+    seed: int = None
+    skew: float = 1.0
+
+
+def reference_rates(currencies):
+    """Table USD déterministe de `currencies` devises (codes réels d'abord)."""
+    rates = {"USD": 1.0}
+    for index in range(1, currencies):
+        if index < len(REFERENCE_CODES):
+            code = REFERENCE_CODES[index]
+        else:
+            code = "Q" + chr(65 + index // 26 % 26) + chr(65 + index % 26)
+        rates[code] = round(0.5 + (index * 7919 % 1000) / 100, 6)
+    return rates
+
+
+class FakeExchangeApi(ThreadingHTTPServer):
+    """Serveur HTTP/1.1 keep-alive ; `stats()` compte les réponses par statut."""
+
+    daemon_threads = True
+
+    def __init__(self, config=None, host="127.0.0.1", port=0):
+        super().__init__((host, port), FakeApiHandler)
+        self.config = config or FakeApiConfig()
+        self._random = random.Random(self.config.seed)
+        self._lock = threading.Lock()
+        self._tables = {}
+        self._window_start = time.monotonic()
+        self._window_count = 0
+        self._served = 0
+        self._statuses = {}
+        self._thread = None
+
+    @property
+    def origin(self):
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+    @property
+    def url(self):
+        return f"{self.origin}/v6"
+
+    def start(self):
+        # Sondage court : stop() rend la main vite (plusieurs stubs par test)
+        self._thread = threading.Thread(target=self.serve_forever, args=(0.05,), daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def stats(self):
+        with self._lock:
+            return {"requests": self._served, "statuses": dict(self._statuses)}
+
+    def table(self, base, style="exchangerate-api"):
+        """Corps JSON de `latest` au format `style`, ou None si la devise est inconnue."""
+        config = self.config
+        key = (style, base, config.currencies, config.skew)
+        body = self._tables.get(key)
+        if body is None:
+            usd = reference_rates(config.currencies)
+            if base not in usd:
+                return None
+            rates = {code: (rate / usd[base]) * (config.skew if code != base else 1)
+                     for code, rate in usd.items()}
+            now = int(time.time())
+            updated = now - now % 86400
+            if style == "frankfurter":
+                del rates[base]
+                payload = {
+                    "amount": 1.0,
+                    "base": base,
+                    "date": datetime.fromtimestamp(updated, timezone.utc).date().isoformat(),
+                    "rates": rates,
+                }
+            else:
+                payload = {"result": "success", "time_last_update_unix": updated, "base_code": base}
+                payload["rates" if style == "open-er-api" else "conversion_rates"] = rates
+            body = self._tables[key] = json.dumps(payload).encode()
+        return body
+
+    def decide(self):
+        """`(status, délai, retry_after)` pour la requête qui arrive."""
+        config = self.config
+        with self._lock:
+            self._served += 1
+            now = time.monotonic()
+            if now - self._window_start >= config.window:
+                self._window_start, self._window_count = now, 0
+            self._window_count += 1
+            delay = config.latency + self._random.uniform(0, config.jitter)
+            if self._random.random() < config.slow_rate:
+                delay = config.slow_latency
+            if config.quota and self._served > config.quota:
+                return 429, 0, config.retry_after
+            if config.rate_limit and self._window_count > config.rate_limit:
+                return 429, 0, max(1, round(config.window - (now - self._window_start)))
+            if self._random.random() < config.error_rate:
+                return config.error_status, delay, None
+            return 200, delay, None
+
+    def count(self, status):
+        with self._lock:
+            self._statuses[status] = self._statuses.get(status, 0) + 1
+
+
+class FakeApiHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self):
+        server = self.server
+        url = urlsplit(self.path)
+        parts = url.path.strip("/").split("/")
+        if len(parts) == 4 and parts[0] == "v6" and parts[2] == "latest":
+            style, base = "exchangerate-api", parts[3]
+            if server.config.api_key is not None and parts[1] != server.config.api_key:
+                return self.reply(403, {"result": "error", "error-type": "invalid-key"})
+        elif len(parts) == 3 and parts[:2] == ["v6", "latest"]:
+            style, base = "open-er-api", parts[2]
+        elif parts == ["latest"]:
+            style, base = "frankfurter", parse_qs(url.query).get("from", ["EUR"])[0]
+        else:
+            return self.reply(404, {"result": "error", "error-type": "unknown-endpoint"})
+
+        status, delay, retry_after = server.decide()
+        time.sleep(delay)
+        if status == 429:
+            return self.reply(429, {"result": "error", "error-type": "quota-reached"},
+                              {"Retry-After": str(retry_after)})
+        if status != 200:
+            return self.reply(status, {"result": "error", "error-type": "server-error"})
+        body = server.table(base.upper(), style)
+        if body is None:
+            return self.reply(404, {"result": "error", "error-type": "unsupported-code"})
+        self.reply(200, body)
+
+    def reply(self, status, body, headers=None):
+        if not isinstance(body, bytes):
+            body = json.dumps(body).encode()
+        self.server.count(status)
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8081)
+    defaults = FakeApiConfig()
+    for name, value in vars(defaults).items():
+        kind = type(value) if value is not None else (str if name == "api_key" else int)
+        parser.add_argument(f"--{name.replace('_', '-')}", type=kind, default=value)
+    args = vars(parser.parse_args())
+    host, port = args.pop("host"), args.pop("port")
+
+    server = FakeExchangeApi(FakeApiConfig(**args), host, port)
+    print(f"Fake exchangerate-api listening on {server.url}", flush=True)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+"""
+Configuration Gunicorn : gunicorn --config gunicorn.conf.py app:app
+
+Variables d'environnement :
+- GUNICORN_WORKER_CLASS : gthread (défaut), gevent ou sync ;
+- GUNICORN_WORKERS / GUNICORN_THREADS : forcent le dimensionnement, sinon
+  calculé d'après les CPU et les limites cgroup (voir worker_sizing) ;
+- GUNICORN_WORKER_MEMORY_MB : budget mémoire d'un worker (150 Mo) ;
+- GUNICORN_MAX_REQUESTS / GUNICORN_MAX_REQUESTS_JITTER : recyclage des
+  workers (0 pour le désactiver) ;
+- PROMETHEUS_MULTIPROC_DIR : fichiers des métriques partagés entre workers
+  (vidé au démarrage du master).
+"""
+import os
+import shutil
+import tempfile
+
+worker_class = os.environ.get("GUNICORN_WORKER_CLASS", "gthread")
+
+if worker_class == "gevent":
+    # Avant le preload de l'app : ssl, socket et threading doivent être
+    # patchés avant que requests ou le rafraîchisseur ne les importent
+    from gevent import monkey
+    monkey.patch_all()
+
+from worker_sizing import cpu_limit, memory_limit, size_workers  # noqa: E402
+
+bind = os.environ.get("GUNICORN_BIND", f"0.0.0.0:{os.environ.get('PORT', '5000')}")
+
+_workers, _threads = size_workers(
+    worker_class,
+    cpu_limit(),
+    memory_limit(),
+    worker_memory=int(os.environ.get("GUNICORN_WORKER_MEMORY_MB", 150)) * 2 ** 20,
+    threads=int(os.environ.get("GUNICORN_THREADS", 0)) or None,
+)
+workers = int(os.environ.get("GUNICORN_WORKERS", 0)) or _workers
+threads = _threads
+worker_connections = int(os.environ.get("GUNICORN_WORKER_CONNECTIONS", 1000))
+
+# App chargée une fois dans le master : les workers forkés partagent ses
+# pages (modules, tables NumPy) en copy-on-write
+preload_app = True
+
+# Recyclage des workers, étalé pour qu'ils ne redémarrent pas tous ensemble
+max_requests = int(os.environ.get("GUNICORN_MAX_REQUESTS", 10000))
+max_requests_jitter = int(os.environ.get("GUNICORN_MAX_REQUESTS_JITTER", max_requests // 10))
+
+timeout = int(os.environ.get("GUNICORN_TIMEOUT", 60))
+graceful_timeout = 30
+keepalive = 5
+# Fichiers de heartbeat en mémoire (le disque overlay des conteneurs peut
+# bloquer les workers)
+worker_tmp_dir = "/dev/shm" if os.path.isdir("/dev/shm") else None
+
+accesslog = "-"
+errorlog = "-"
+
+# Mode multiprocess de prometheus_client : à définir avant l'import de l'app
+os.environ.setdefault("PROMETHEUS_MULTIPROC_DIR", os.path.join(
+    worker_tmp_dir or tempfile.gettempdir(), "prometheus-multiproc"))
+
+# Un thread démarré dans le master ne survit pas au fork : l'app ne lance
+# pas le rafraîchisseur à l'import, chaque worker le démarre après le fork
+os.environ["RATES_REFRESH_DEFERRED"] = "1"
+
+
+def on_starting(server):
+    # Valeurs d'une exécution précédente (compteurs d'anciens pid) effacées
+    directory = os.environ["PROMETHEUS_MULTIPROC_DIR"]
+    shutil.rmtree(directory, ignore_errors=True)
+    os.makedirs(directory)
+
+
+def post_fork(server, worker):
+    import app as backend
+    backend.start_refresher()
+
+
+def child_exit(server, worker):
+    from prometheus_client import multiprocess
+    multiprocess.mark_process_dead(worker.pid)
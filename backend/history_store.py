@@ -0,0 +1,114 @@
+"""Historique des taux dans une collection time-series MongoDB."""
+from datetime import datetime, timezone
+
+from pymongo import ASCENDING, DESCENDING
+from pymongo.errors import CollectionInvalid
+
+from rates_cache import RatesSnapshot
+
+
+def snapshot_time(snapshot):
+    """Instant de validité d'un snapshot : horodatage upstream, sinon fetch."""
+    return datetime.fromtimestamp(snapshot.updated_at or snapshot.fetched_at, timezone.utc)
+
+
+def stored_snapshot(base, timestamp, rates):
+    """Snapshot relu de l'historique (datetimes naïfs : UTC)."""
+    when = timestamp.replace(tzinfo=timezone.utc).timestamp()
+    return RatesSnapshot(base, rates, when, int(when))
+
+
+class MongoHistoryStore:
+    """
+    Un document par (devise, instant) dans une collection time-series
+    (`timeField` = timestamp, `metaField` = currency), avec un index composé
+    (currency, timestamp) pour les requêtes par plage.
+
+    Un snapshot n'est écrit qu'une fois par horodatage upstream, en un seul
+    `insert_many` non ordonné. La déduplication se fait contre la collection
+    (dernier instant stocké pour la base), pas seulement dans le process :
+    plusieurs workers, ou un nouveau leader après un recyclage, ne
+    réécrivent pas le même snapshot.
+    """
+
+    def __init__(self, database, collection="rates_history", granularity="hours",
+                 timeseries=True):
+        self._database = database
+        self._name = collection
+        self.granularity = granularity
+        self.timeseries = timeseries
+        self._collection = None
+        self._last_recorded = {}
+
+    @property
+    def collection(self):
+        """Collection et index créés au premier usage (pas d'I/O à l'import)."""
+        if self._collection is None:
+            if self.timeseries:
+                try:
+                    self._database.create_collection(self._name, timeseries={
+                        "timeField": "timestamp",
+                        "metaField": "currency",
+                        "granularity": self.granularity,
+                    })
+                except CollectionInvalid:
+                    pass  # déjà créée
+            collection = self._database[self._name]
+            collection.create_index([("currency", ASCENDING), ("timestamp", ASCENDING)])
+            self._collection = collection
+        return self._collection
+
+    def latest_timestamp(self, base, currency):
+        """Dernier instant stocké pour `base` (via la série de `currency`), ou None."""
+        document = self.collection.find_one(
+            {"currency": currency, "base": base},
+            projection={"_id": False, "timestamp": True},
+            sort=[("timestamp", DESCENDING)],
+        )
+        if document is None:
+            return None
+        return document["timestamp"].replace(tzinfo=timezone.utc)
+
+    def record(self, snapshot):
+        """Persiste le snapshot ; retourne le nombre de documents écrits."""
+        timestamp = snapshot_time(snapshot)
+        if not snapshot.rates or self._last_recorded.get(snapshot.base) == timestamp:
+            return 0
+        # Le même snapshot a pu être archivé par un autre worker
+        latest = self.latest_timestamp(snapshot.base, next(iter(snapshot.rates)))
+        if latest is not None and latest >= timestamp:
+            self._last_recorded[snapshot.base] = timestamp
+            return 0
+        documents = [
+            {"timestamp": timestamp, "currency": code, "base": snapshot.base, "rate": rate}
+            for code, rate in snapshot.rates.items()
+        ]
+        self.collection.insert_many(documents, ordered=False)
+        self._last_recorded[snapshot.base] = timestamp
+        return len(documents)
+
+    def snapshots(self, start, end, base="USD"):
+        """Snapshots archivés de `base` entre `start` et `end`, dans l'ordre chronologique."""
+        cursor = self.collection.find(
+            {"base": base, "timestamp": {"$gte": start, "$lte": end}},
+            projection={"_id": False, "timestamp": True, "currency": True, "rate": True},
+        ).sort("timestamp", ASCENDING)
+        current, rates = None, {}
+        for document in cursor:
+            if document["timestamp"] != current:
+                if rates:
+                    yield stored_snapshot(base, current, rates)
+                current, rates = document["timestamp"], {}
+            rates[document["currency"]] = document["rate"]
+        if rates:
+            yield stored_snapshot(base, current, rates)
+
+    def history(self, currency, start, end, base="USD", limit=10000):
+        """Points `(timestamp, rate)` de `currency` entre `start` et `end` inclus."""
+        cursor = self.collection.find(
+            {"currency": currency, "base": base, "timestamp": {"$gte": start, "$lte": end}},
+            projection={"_id": False, "timestamp": True, "rate": True},
+        ).sort("timestamp", ASCENDING).limit(limit)
+        # Datetimes naïfs (client sans tz_aware) : ils sont en UTC
+        return [(document["timestamp"].replace(tzinfo=timezone.utc), document["rate"])
+                for document in cursor]
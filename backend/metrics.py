@@ -0,0 +1,157 @@
+"""
+Métriques Prometheus du backend.
+
+En production sous Gunicorn, `PROMETHEUS_MULTIPROC_DIR` (positionné par
+gunicorn.conf.py avant le chargement de l'app) active le mode multiprocess
+de prometheus_client : chaque worker écrit ses valeurs dans des fichiers
+mmap de ce répertoire et `/metrics`, quel que soit le worker qui répond,
+agrège ceux de tous les workers.
+"""
+import os
+import time
+from contextlib import contextmanager
+
+from flask import g, request
+from prometheus_client import (CONTENT_TYPE_LATEST, REGISTRY, CollectorRegistry, Counter,
+                               Histogram, generate_latest)
+from prometheus_client.core import GaugeMetricFamily
+from prometheus_client.multiprocess import MultiProcessCollector
+
+from circuit_breaker import CircuitOpen
+from upstream import UpstreamError
+
+REQUEST_LATENCY = Histogram(
+    "http_request_duration_seconds", "Durée de traitement des requêtes HTTP",
+    ["route", "method"],
+    buckets=(.001, .0025, .005, .01, .025, .05, .1, .25, .5, 1, 2.5, 5, 10))
+REQUESTS = Counter(
+    "http_requests_total", "Requêtes HTTP traitées", ["route", "method", "status"])
+UPSTREAM_LATENCY = Histogram(
+    "upstream_request_duration_seconds", "Durée des appels à l'API de taux",
+    ["outcome"],
+    buckets=(.025, .05, .1, .25, .5, 1, 2.5, 5, 10, 30))
+UPSTREAM_ERRORS = Counter(
+    "upstream_errors_total", "Échecs des appels à l'API de taux", ["reason"])
+UPSTREAM_HEDGES = Counter(
+    "upstream_hedges_total", "Requêtes upstream doublées (hedging)", ["outcome"])
+CACHE_LOOKUPS = Counter(
+    "rates_cache_lookups_total", "Lectures du cache des taux", ["outcome"])
+
+
+def multiprocess_enabled():
+    return bool(os.environ.get("PROMETHEUS_MULTIPROC_DIR"))
+
+
+class SnapshotCollector:
+    """
+    Âge et version des snapshots visibles par le worker qui répond à
+    `/metrics`, calculés au moment de la collecte.
+    """
+
+    def __init__(self, snapshots, clock=time.time):
+        self._snapshots = snapshots
+        self._clock = clock
+
+    def collect(self):
+        age = GaugeMetricFamily(
+            "rates_snapshot_age_seconds", "Âge du snapshot des taux servi", labels=["base"])
+        version = GaugeMetricFamily(
+            "rates_snapshot_version", "Version du snapshot des taux servi", labels=["base"])
+        now = self._clock()
+        for snapshot in self._snapshots():
+            age.add_metric([snapshot.base], snapshot.age(now))
+            version.add_metric([snapshot.base], snapshot.version)
+        yield age
+        yield version
+
+
+class QuotaCollector:
+    """Budget upstream restant du mois, lu dans l'état partagé de l'hôte."""
+
+    def __init__(self, quota):
+        self._quota = quota
+
+    def collect(self):
+        remaining = GaugeMetricFamily(
+            "upstream_quota_remaining", "Appels upstream restants dans le budget du mois")
+        remaining.add_metric([], self._quota.remaining())
+        budget = GaugeMetricFamily(
+            "upstream_quota_budget", "Budget mensuel d'appels upstream")
+        budget.add_metric([], self._quota.monthly_budget)
+        yield remaining
+        yield budget
+
+
+def upstream_error_reason(error):
+    if isinstance(error, CircuitOpen):
+        return "circuit_open"
+    if isinstance(error, UpstreamError):
+        return f"http_{error.status}" if error.reason == "http" else error.reason
+    return "other"
+
+
+@contextmanager
+def track_upstream():
+    """Chronomètre un appel upstream et compte ses échecs par cause."""
+    started = time.perf_counter()
+    try:
+        yield
+    except Exception as error:
+        reason = upstream_error_reason(error)
+        UPSTREAM_ERRORS.labels(reason=reason).inc()
+        if reason not in ("circuit_open", "quota"):  # refusé sans appel : pas de latence
+            UPSTREAM_LATENCY.labels(outcome="error").observe(time.perf_counter() - started)
+        raise
+    UPSTREAM_LATENCY.labels(outcome="success").observe(time.perf_counter() - started)
+
+
+def count_lookup(outcome):
+    CACHE_LOOKUPS.labels(outcome=outcome).inc()
+
+
+def count_hedge(outcome):
+    UPSTREAM_HEDGES.labels(outcome=outcome).inc()
+
+
+class Metrics:
+    """Instrumentation d'une app Flask et vue `/metrics`."""
+
+    def __init__(self, snapshots, quota=None):
+        # Collecteurs calculés à la lecture (hors fichiers multiprocess)
+        self.collectors = [SnapshotCollector(snapshots)]
+        if quota is not None:
+            self.collectors.append(QuotaCollector(quota))
+        if not multiprocess_enabled():
+            for collector in self.collectors:
+                REGISTRY.register(collector)
+
+    def init_app(self, app):
+        # Avant les autres hooks : une requête rejetée par le CSRF est mesurée
+        app.before_request_funcs.setdefault(None, []).insert(0, self._start)
+        app.after_request(self._observe)
+        app.add_url_rule("/metrics", "metrics", self.view, methods=["GET"])
+
+    def _start(self):
+        g.request_started = time.perf_counter()
+
+    def _observe(self, response):
+        started = g.get("request_started")
+        route = request.url_rule.rule if request.url_rule is not None else "unmatched"
+        if started is not None:
+            REQUEST_LATENCY.labels(route=route, method=request.method).observe(
+                time.perf_counter() - started)
+        REQUESTS.labels(route=route, method=request.method,
+                        status=str(response.status_code)).inc()
+        return response
+
+    def registry(self):
+        if not multiprocess_enabled():
+            return REGISTRY
+        registry = CollectorRegistry()
+        MultiProcessCollector(registry)
+        for collector in self.collectors:
+            registry.register(collector)
+        return registry
+
+    def view(self):
+        return generate_latest(self.registry()), 200, {"Content-Type": CONTENT_TYPE_LATEST}
@@ -0,0 +1,194 @@
+"""
+Fournisseurs de taux et agrégation en snapshot de consensus.
+
+Chaque fournisseur traduit la réponse de son API au format interne
+(`time_last_update_unix`, `conversion_rates`). `ProviderAggregator` les
+interroge en parallèle et fusionne leurs tables par médiane pondérée,
+devise par devise : un fournisseur aberrant ou en retard ne fausse pas le
+snapshot publié.
+"""
+import logging
+import math
+import time
+from calendar import timegm
+from concurrent.futures import FIRST_COMPLETED, wait
+from datetime import date
+
+from upstream import ProcessLocalExecutor, UpstreamError
+
+logger = logging.getLogger(__name__)
+
+
+class Provider:
+    """Source de taux : un client `UpstreamClient` et un poids dans la médiane."""
+
+    kind = None
+    default_url = None
+
+    def __init__(self, client, weight=1.0, name=None):
+        self.client = client
+        self.weight = weight
+        self.name = name or self.kind
+
+    def path(self, base):
+        return f"latest/{base}"
+
+    def parse(self, base, payload):
+        return payload
+
+    def fetch(self, base):
+        return self.parse(base, self.client.get(self.path(base)).json())
+
+
+class ExchangeRateApi(Provider):
+    """exchangerate-api.com (clé d'API) : déjà au format interne."""
+
+    kind = "exchangerate-api"
+    default_url = "https://v6.exchangerate-api.com/v6"
+
+
+class OpenErApi(Provider):
+    """open.er-api.com : même API sans clé, taux sous `rates`."""
+
+    kind = "open-er-api"
+    default_url = "https://open.er-api.com/v6"
+
+    def parse(self, base, payload):
+        return {
+            "time_last_update_unix": payload.get("time_last_update_unix"),
+            "conversion_rates": payload.get("rates", {}),
+        }
+
+
+class Frankfurter(Provider):
+    """Frankfurter (taux BCE) : date du jour, devise de base absente des taux."""
+
+    kind = "frankfurter"
+    default_url = "https://api.frankfurter.app"
+
+    def path(self, base):
+        return f"latest?from={base}"
+
+    def parse(self, base, payload):
+        rates = dict(payload.get("rates", {}))
+        rates[base] = 1.0
+        updated = payload.get("date")
+        return {
+            "time_last_update_unix": timegm(date.fromisoformat(updated).timetuple()) if updated else 0,
+            "conversion_rates": rates,
+        }
+
+
+PROVIDERS = {cls.kind: cls for cls in (ExchangeRateApi, OpenErApi, Frankfurter)}
+
+
+def parse_providers(spec):
+    """`"exchangerate-api:2,frankfurter"` -> [("exchangerate-api", 2.0), ("frankfurter", 1.0)]"""
+    providers = []
+    for item in spec.split(","):
+        kind, _, weight = item.strip().partition(":")
+        if not kind:
+            continue
+        if kind not in PROVIDERS:
+            raise ValueError(f"Unknown rate provider: {kind}")
+        providers.append((kind, float(weight or 1)))
+    return providers
+
+
+def weighted_median(values, weights):
+    """Médiane pondérée ; à égalité exacte de poids, moyenne des deux valeurs centrales."""
+    pairs = sorted(zip(values, weights))
+    half = sum(weights) / 2
+    cumulative = 0
+    for i, (value, weight) in enumerate(pairs):
+        cumulative += weight
+        if math.isclose(cumulative, half) and i + 1 < len(pairs):
+            return (value + pairs[i + 1][0]) / 2
+        if cumulative > half:
+            return value
+    return pairs[-1][0]
+
+
+def merge(base, results):
+    """
+    Snapshot de consensus de `results` (liste de `(provider, payload)`) :
+    médiane pondérée par devise, sur les fournisseurs qui la cotent avec un
+    taux fini et positif. Horodatage : le plus récent des fournisseurs.
+    """
+    quotes = {}
+    for provider, payload in results:
+        for code, rate in payload.get("conversion_rates", {}).items():
+            if isinstance(rate, (int, float)) and math.isfinite(rate) and rate > 0:
+                values, weights = quotes.setdefault(code, ([], []))
+                values.append(float(rate))
+                weights.append(provider.weight)
+    rates = {code: weighted_median(values, weights) for code, (values, weights) in quotes.items()}
+    rates[base] = 1.0
+    return {
+        "result": "success",
+        "base_code": base,
+        "time_last_update_unix": max(
+            int(payload.get("time_last_update_unix") or 0) for _, payload in results),
+        "conversion_rates": rates,
+    }
+
+
+class ProviderAggregator:
+    """
+    Interroge les fournisseurs en parallèle (pool de threads) et fusionne
+    leurs réponses.
+
+    `fetch` rend la main dès que `quorum` fournisseurs (tous par défaut)
+    ont répondu, ou au plus tard après `timeout` secondes : la durée d'un
+    rafraîchissement est celle du plus lent des fournisseurs attendus, pas
+    la somme des latences. Les réponses tardives sont ignorées. Sans
+    aucune réponse, la première erreur est levée (disjoncteur, métriques).
+
+    Avec un seul fournisseur, sa réponse est retournée telle quelle, sans
+    passer par le pool.
+    """
+
+    def __init__(self, providers, quorum=None, timeout=10, clock=time.monotonic):
+        if not providers:
+            raise ValueError("At least one rate provider is required")
+        self.providers = list(providers)
+        self.quorum = min(quorum or len(self.providers), len(self.providers))
+        self.timeout = timeout
+        self._clock = clock
+        self._pool = ProcessLocalExecutor(len(self.providers), "rates-provider")
+
+    def fetch(self, base):
+        if len(self.providers) == 1:
+            return self.providers[0].fetch(base)
+
+        pool = self._pool.get()
+        futures = {pool.submit(provider.fetch, base): provider for provider in self.providers}
+        deadline = self._clock() + self.timeout
+        pending = set(futures)
+        results, errors = [], []
+        while pending and len(results) < self.quorum:
+            remaining = deadline - self._clock()
+            if remaining <= 0:
+                break
+            done, pending = wait(pending, timeout=remaining, return_when=FIRST_COMPLETED)
+            for future in done:
+                provider = futures[future]
+                try:
+                    results.append((provider, future.result()))
+                except Exception as error:
+                    logger.warning("Rate provider %s failed: %s", provider.name, error)
+                    errors.append(error)
+        for future in pending:
+            future.cancel()
+
+        if not results:
+            if errors:
+                raise errors[0]
+            raise UpstreamError("No rate provider answered in time", reason="timeout")
+        if len(results) < self.quorum:
+            logger.warning("Rate providers quorum not reached (%d/%d), merging available rates",
+                           len(results), self.quorum)
+        return merge(base, results)
+
+    def close(self):
+        self._pool.shutdown()
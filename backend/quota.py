@@ -0,0 +1,151 @@
+"""Quota mensuel de la clé d'API upstream, partagé entre les processus d'un hôte."""
+import calendar
+import os
+import struct
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime, timezone
+
+try:
+    import fcntl
+except ImportError:  # Windows : pas de flock, un seul process en dev
+    fcntl = None
+
+from upstream import UpstreamError
+
+# magic, mois (AAAAMM), appels du mois, jetons, dernier remplissage,
+# appels suspendus jusqu'à (Retry-After)
+STATE = struct.Struct("<8sIIddd")
+MAGIC = b"QUOTAv1\0"
+
+
+class QuotaExceeded(UpstreamError):
+    """Appel refusé localement, sans requête : budget épuisé ou 429 en cours."""
+
+    def __init__(self, message, retry_after):
+        super().__init__(message, reason="quota", retry_after=retry_after)
+
+
+def month_window(now):
+    """(AAAAMM, secondes restantes) du mois UTC contenant `now`."""
+    moment = datetime.fromtimestamp(now, timezone.utc)
+    days = calendar.monthrange(moment.year, moment.month)[1]
+    start = datetime(moment.year, moment.month, 1, tzinfo=timezone.utc).timestamp()
+    return moment.year * 100 + moment.month, start + days * 86400 - now
+
+
+class QuotaManager:
+    """
+    Budget mensuel d'appels upstream, compté dans un fichier partagé par
+    tous les workers de l'hôte (lecture-modification-écriture sous flock).
+
+    - seau de jetons de capacité `burst`, rempli au rythme qui étale le
+      reste du budget sur le reste du mois : une rafale d'appels consomme
+      d'avance, le rythme autorisé baisse ensuite d'autant ;
+    - `block(retry_after)` : après un 429, plus aucun appel de l'hôte avant
+      l'échéance (`default_retry_after` si l'en-tête est absent) ;
+    - `refresh_interval` : intervalle de rafraîchissement étiré pour tenir
+      le budget jusqu'à la fin du mois.
+    """
+
+    def __init__(self, path, monthly_budget, burst=10, default_retry_after=60,
+                 clock=time.time):
+        self.path = path
+        self.monthly_budget = monthly_budget
+        self.burst = burst
+        self.default_retry_after = default_retry_after
+        self._clock = clock
+        self._fd = None
+        self._pid = None
+        # flock est partagé par les threads d'un process (même descripteur)
+        self._lock = threading.Lock()
+
+    def _open(self):
+        # Un descripteur hérité du master partagerait son verrou flock avec
+        # les autres workers : un descripteur par process
+        if self._pid != os.getpid():
+            self._fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o600)
+            self._pid = os.getpid()
+        return self._fd
+
+    def _read(self, fd, now):
+        month, _ = month_window(now)
+        data = os.pread(fd, STATE.size, 0)
+        if len(data) == STATE.size:
+            magic, stored_month, used, tokens, refilled_at, blocked_until = STATE.unpack(data)
+            if magic == MAGIC:
+                if stored_month == month:
+                    return {"used": used, "tokens": tokens, "refilled_at": refilled_at,
+                            "blocked_until": blocked_until}
+                # Nouveau mois : compteur remis à zéro, suspension conservée
+                return {"used": 0, "tokens": self.burst, "refilled_at": now,
+                        "blocked_until": blocked_until}
+        return {"used": 0, "tokens": self.burst, "refilled_at": now, "blocked_until": 0.0}
+
+    @contextmanager
+    def _state(self):
+        """État courant `(state, now)`, réécrit à la sortie du bloc."""
+        with self._lock:
+            fd = self._open()
+            if fcntl is not None:
+                fcntl.flock(fd, fcntl.LOCK_EX)
+            try:
+                now = self._clock()
+                state = self._read(fd, now)
+                yield state, now
+                month, _ = month_window(now)
+                os.pwrite(fd, STATE.pack(MAGIC, month, state["used"], state["tokens"],
+                                         state["refilled_at"], state["blocked_until"]), 0)
+            finally:
+                if fcntl is not None:
+                    fcntl.flock(fd, fcntl.LOCK_UN)
+
+    def _refill(self, state, now):
+        _, seconds_left = month_window(now)
+        remaining = max(self.monthly_budget - state["used"], 0)
+        rate = remaining / seconds_left
+        state["tokens"] = min(self.burst, state["tokens"] + (now - state["refilled_at"]) * rate)
+        state["refilled_at"] = now
+        return rate
+
+    def acquire(self):
+        """Réserve un appel ; lève `QuotaExceeded` (avec le délai d'attente) sinon."""
+        with self._state() as (state, now):
+            if state["blocked_until"] > now:
+                error = QuotaExceeded("Upstream rate limited, waiting for Retry-After",
+                                      state["blocked_until"] - now)
+            elif state["used"] >= self.monthly_budget:
+                error = QuotaExceeded("Monthly upstream quota exhausted", month_window(now)[1])
+            else:
+                rate = self._refill(state, now)
+                if state["tokens"] >= 1:
+                    state["tokens"] -= 1
+                    state["used"] += 1
+                    return
+                error = QuotaExceeded("Upstream calls ahead of the monthly budget pace",
+                                      (1 - state["tokens"]) / rate)
+        raise error
+
+    def block(self, retry_after=None):
+        """Suspend les appels de l'hôte pendant `retry_after` secondes (429)."""
+        delay = self.default_retry_after if retry_after is None else retry_after
+        with self._state() as (state, now):
+            state["blocked_until"] = max(state["blocked_until"], now + delay)
+
+    def remaining(self):
+        """Appels restants ce mois-ci."""
+        with self._state() as (state, _):
+            return max(self.monthly_budget - state["used"], 0)
+
+    def refresh_interval(self, interval, calls=1):
+        """
+        Intervalle entre deux rafraîchissements de `calls` appels : au moins
+        `interval`, étiré pour que le reste du budget tienne jusqu'à la fin
+        du mois, et jamais avant la fin d'une suspension 429.
+        """
+        with self._state() as (state, now):
+            _, seconds_left = month_window(now)
+            remaining = self.monthly_budget - state["used"]
+            paced = seconds_left if remaining <= 0 else seconds_left * calls / remaining
+            return max(interval, paced, state["blocked_until"] - now)
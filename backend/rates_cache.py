@@ -0,0 +1,360 @@
+"""Cache en mémoire des taux de change (un snapshot par devise de base)."""
+import asyncio
+import logging
+import threading
+import time
+from dataclasses import dataclass
+from functools import cached_property
+
+from conversion import CrossRates, DecimalRates
+from derived_tables import DERIVED_TABLES_MAX, SUBSET_BODIES_MAX, BodyLRU
+from encoded_body import EncodedBody
+
+logger = logging.getLogger(__name__)
+
+
+class RatesUnavailable(Exception):
+    """Aucun snapshot servable en mémoire pour cette devise de base."""
+
+
+def _spawn_daemon(target):
+    threading.Thread(target=target, daemon=True).start()
+
+
+@dataclass(frozen=True)
+class RatesSnapshot:
+    """Taux de conversion figés pour une devise de base."""
+
+    base: str
+    rates: dict
+    fetched_at: float
+    updated_at: int = 0
+    version: int = 0
+
+    @classmethod
+    def from_payload(cls, base, payload, fetched_at, version=0):
+        """Construit un snapshot à partir de la réponse JSON de l'API."""
+        return cls(
+            base=base,
+            rates=payload.get("conversion_rates", {}),
+            fetched_at=fetched_at,
+            updated_at=int(payload.get("time_last_update_unix") or 0),
+            version=version,
+        )
+
+    def age(self, now):
+        return now - self.fetched_at
+
+    @cached_property
+    def cross_rates(self):
+        """Matrice des taux croisés, calculée au premier usage du snapshot."""
+        return CrossRates(self.rates)
+
+    @cached_property
+    def rates_bodies(self):
+        """Corps de `/rates` pré-encodés, indexés par l'indicateur stale."""
+        return {
+            stale: EncodedBody({
+                "status": "success",
+                "stale": stale,
+                "conversion_rates": self.rates
+            })
+            for stale in (False, True)
+        }
+
+    @cached_property
+    def derived_tables(self):
+        """Corps des tables complètes dans une autre base (`/rates/<base>`)."""
+        return BodyLRU(DERIVED_TABLES_MAX)
+
+    @cached_property
+    def subset_bodies(self):
+        """Corps restreints à un ensemble normalisé de devises (`?symbols=`)."""
+        return BodyLRU(SUBSET_BODIES_MAX)
+
+    def table_body(self, stale, base=None, symbols=None):
+        """
+        Corps pré-encodé des taux pour une unité de `base` (None : base du
+        snapshot, au format de `/rates`), restreints à `symbols` (tuple trié
+        et dédoublonné) s'il est fourni. Lève `UnknownCurrency`.
+        """
+        if base is None and symbols is None:
+            return self.rates_bodies[stale]
+
+        def build():
+            payload = {"status": "success", "stale": stale}
+            if base is not None:
+                payload["base_code"] = base
+            payload["conversion_rates"] = self.cross_rates.table(base or self.base, symbols)
+            return EncodedBody(payload)
+
+        cache = self.derived_tables if symbols is None else self.subset_bodies
+        return cache.get((base, symbols, stale), build)
+
+    @cached_property
+    def decimal_rates(self):
+        """Taux quantifiés pour les conversions exactes, une fois par snapshot."""
+        return DecimalRates(self.rates)
+
+
+class RatesCache:
+    """
+    Cache des taux par devise de base, en mode stale-while-revalidate.
+
+    - âge < soft_ttl : le snapshot est servi tel quel ;
+    - soft_ttl <= âge < hard_ttl : le snapshot est servi immédiatement
+      (marqué stale) et un seul rafraîchissement part en arrière-plan ;
+      après un échec, aucun nouveau rafraîchissement n'est lancé avant
+      `revalidate_backoff` secondes ;
+    - âge >= hard_ttl : l'appelant attend un appel upstream.
+
+    Un verrou par base garantit le single-flight : quand le snapshot expire
+    sous charge, un seul thread appelle `fetch`, les autres attendent puis
+    lisent le snapshot qu'il vient de publier. Un échec est partagé de la
+    même façon : les threads en attente et ceux qui arrivent pendant
+    `error_ttl` secondes reçoivent la même exception sans rappeler l'upstream.
+
+    `on_publish(snapshot)` est appelé avant qu'un snapshot ne soit visible,
+    pour y précalculer ce que les requêtes liront ; `on_refresh(snapshot)`
+    seulement pour ceux qui viennent d'être récupérés upstream par ce process.
+    `on_lookup(outcome)` reçoit le résultat de chaque lecture : "hit",
+    "stale" ou "miss" (l'appelant a dû attendre l'upstream, ou rien n'était
+    servable).
+
+    Si l'échec est l'une des exceptions `serve_stale_on` (circuit ouvert par
+    exemple), le dernier snapshot connu est servi, marqué stale, même
+    au-delà du hard TTL.
+
+    `deferral()` (optionnel) donne le retard, en secondes, que le quota
+    upstream impose au rafraîchisseur : `cached` sert encore (stale) un
+    snapshot jusqu'à `hard_ttl + deferral()` au lieu de refuser pendant que
+    le rafraîchissement est volontairement différé.
+
+    Sous asyncio, `load_async` fait le travail upstream de `lookup` avec une
+    coroutine de fetch, sans bloquer la boucle ; le `lookup` qui suit ne lit
+    plus que la mémoire (ou relève l'échec enregistré).
+    """
+
+    def __init__(self, fetch, soft_ttl=600, hard_ttl=None, error_ttl=5,
+                 revalidate_backoff=60, serve_stale_on=(), on_publish=None,
+                 on_refresh=None, on_lookup=None, deferral=None, clock=time.time,
+                 spawn=_spawn_daemon):
+        if hard_ttl is None:
+            hard_ttl = soft_ttl
+        if hard_ttl < soft_ttl:
+            raise ValueError("hard_ttl must be greater than or equal to soft_ttl")
+        self._fetch = fetch
+        self.soft_ttl = soft_ttl
+        self.hard_ttl = hard_ttl
+        self.error_ttl = error_ttl
+        self.revalidate_backoff = revalidate_backoff
+        self.serve_stale_on = tuple(serve_stale_on)
+        self._on_publish = on_publish
+        self._on_refresh = on_refresh
+        self._on_lookup = on_lookup
+        self._deferral = deferral
+        self._clock = clock
+        self._spawn = spawn
+        self._snapshots = {}
+        self._failures = {}
+        self._locks = {}
+        self._locks_guard = threading.Lock()
+        self._flights = {}
+
+    def _lock_for(self, base):
+        lock = self._locks.get(base)
+        if lock is None:
+            with self._locks_guard:
+                lock = self._locks.setdefault(base, threading.Lock())
+        return lock
+
+    def _looked_up(self, outcome):
+        if self._on_lookup is not None:
+            self._on_lookup(outcome)
+
+    def latest(self, base):
+        """Dernier snapshot en mémoire, quel que soit son âge, ou None."""
+        return self._snapshots.get(base)
+
+    def fresh_for(self, snapshot):
+        """Secondes pendant lesquelles le snapshot reste frais."""
+        return max(self.soft_ttl - snapshot.age(self._clock()), 0)
+
+    def cached(self, base):
+        """
+        Retourne `(snapshot, stale)` depuis la mémoire uniquement, sans
+        jamais appeler l'upstream ; lève `RatesUnavailable` si aucun
+        snapshot n'est servable.
+        """
+        snapshot = self._snapshots.get(base)
+        if snapshot is None:
+            self._looked_up("miss")
+            raise RatesUnavailable(f"No rates loaded for {base}")
+        age = snapshot.age(self._clock())
+        # Retard du quota évalué seulement une fois le hard TTL dépassé
+        if age >= self.hard_ttl and (self._deferral is None
+                                     or age >= self.hard_ttl + self._deferral()):
+            self._looked_up("miss")
+            raise RatesUnavailable(f"Rates for {base} are older than the hard TTL")
+        stale = age >= self.soft_ttl
+        self._looked_up("stale" if stale else "hit")
+        return snapshot, stale
+
+    def get(self, base):
+        """Retourne un snapshot servable, en le récupérant au besoin."""
+        return self.lookup(base)[0]
+
+    def lookup(self, base):
+        """
+        Retourne `(snapshot, stale)`, `stale` étant la décision prise pour
+        cette lecture (et non un second calcul fait plus tard).
+        """
+        snapshot = self._snapshots.get(base)
+        if snapshot is not None:
+            age = snapshot.age(self._clock())
+            if age < self.soft_ttl:
+                self._looked_up("hit")
+                return snapshot, False
+            if age < self.hard_ttl:
+                self._revalidate(base)
+                self._looked_up("stale")
+                return snapshot, True
+
+        self._looked_up("miss")
+        waiting_since = self._clock()
+        with self._lock_for(base):
+            # Un autre thread a pu rafraîchir pendant l'attente du verrou
+            snapshot = self._snapshots.get(base)
+            if snapshot is not None:
+                age = snapshot.age(self._clock())
+                if age < self.hard_ttl:
+                    return snapshot, age >= self.soft_ttl
+            try:
+                self._raise_recent_failure(base, waiting_since)
+                return self.refresh(base), False
+            except self.serve_stale_on:
+                if snapshot is None:
+                    raise
+                return snapshot, True
+
+    def _failed_within(self, base, seconds):
+        failure = self._failures.get(base)
+        return failure is not None and self._clock() - failure[0] < seconds
+
+    def _revalidate(self, base):
+        if self._failed_within(base, self.revalidate_backoff):
+            return  # upstream en échec récent : on garde le snapshot stale
+
+        lock = self._lock_for(base)
+        if not lock.acquire(blocking=False):
+            return  # rafraîchissement déjà en cours
+
+        def run():
+            try:
+                self.refresh(base)
+            except Exception:
+                logger.exception("Background refresh failed for %s", base)
+            finally:
+                lock.release()
+
+        try:
+            self._spawn(run)
+        except Exception:
+            lock.release()
+            raise
+
+    def _raise_recent_failure(self, base, waiting_since):
+        failure = self._failures.get(base)
+        if failure is None:
+            return
+        failed_at, error = failure
+        if failed_at >= waiting_since or self._clock() - failed_at < self.error_ttl:
+            raise error
+
+    def refresh(self, base):
+        """Appelle l'upstream et publie le nouveau snapshot."""
+        try:
+            payload = self._fetch(base)
+        except Exception as error:
+            self._failures[base] = (self._clock(), error)
+            raise
+        return self._install(base, payload)
+
+    def _install(self, base, payload):
+        # Le compteur continue celui du snapshot courant, y compris quand il a
+        # été publié par un autre worker
+        previous = self._snapshots.get(base)
+        version = previous.version + 1 if previous is not None else 1
+        snapshot = self.publish(
+            RatesSnapshot.from_payload(base, payload, self._clock(), version))
+        if self._on_refresh is not None:
+            try:
+                self._on_refresh(snapshot)
+            except Exception:
+                logger.exception("on_refresh hook failed for %s", base)
+        return snapshot
+
+    async def load_async(self, base, fetch):
+        """
+        Prépare un `lookup(base)` servi depuis la mémoire, en attendant au
+        besoin la coroutine `fetch(base)`. Les coroutines concurrentes
+        partagent une seule tâche par base ; un échec est enregistré comme
+        dans `refresh` et c'est le `lookup` suivant qui le relève (ou sert
+        le snapshot stale pour `serve_stale_on`).
+        """
+        snapshot = self._snapshots.get(base)
+        if snapshot is not None:
+            age = snapshot.age(self._clock())
+            if age < self.soft_ttl:
+                return
+            if age < self.hard_ttl:
+                if not self._failed_within(base, self.revalidate_backoff):
+                    self._flight(base, fetch)  # revalidation en tâche de fond
+                return
+        if self._failed_within(base, self.error_ttl):
+            return
+        try:
+            await asyncio.shield(self._flight(base, fetch))
+        except Exception:
+            pass  # enregistré dans _failures, relevé par lookup
+
+    def _flight(self, base, fetch):
+        """Tâche asyncio unique de rafraîchissement de `base`."""
+        task = self._flights.get(base)
+        if task is not None:
+            return task
+        # Verrou de la base pris s'il est libre : les threads qui lisent un
+        # snapshot stale ne lancent pas de second rafraîchissement
+        lock = self._lock_for(base)
+        locked = lock.acquire(blocking=False)
+        task = self._flights[base] = asyncio.ensure_future(self._refresh_async(base, fetch))
+
+        def done(task):
+            self._flights.pop(base, None)
+            if locked:
+                lock.release()
+            if not task.cancelled() and task.exception() is not None:
+                logger.warning("Async refresh failed for %s: %s", base, task.exception())
+
+        task.add_done_callback(done)
+        return task
+
+    async def _refresh_async(self, base, fetch):
+        try:
+            payload = await fetch(base)
+        except Exception as error:
+            self._failures[base] = (self._clock(), error)
+            raise
+        return self._install(base, payload)
+
+    def publish(self, snapshot):
+        """Installe un snapshot obtenu ailleurs (rafraîchisseur, autre worker)."""
+        if self._on_publish is not None:
+            self._on_publish(snapshot)
+        self._snapshots[snapshot.base] = snapshot
+        self._failures.pop(snapshot.base, None)
+        return snapshot
+
+    def clear(self):
+        self._snapshots.clear()
+        self._failures.clear()
@@ -0,0 +1,137 @@
+"""Rafraîchissement périodique des taux, découplé du traitement des requêtes."""
+import logging
+import os
+import random
+import threading
+
+try:
+    import fcntl
+except ImportError:  # Windows : pas de flock, un seul process en dev
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+
+class HostLock:
+    """
+    Verrou exclusif non bloquant sur un fichier local.
+
+    Tous les workers Gunicorn d'un même hôte tentent de le prendre ; celui
+    qui l'obtient devient le seul à appeler l'upstream. Le verrou est libéré
+    par le noyau si le process meurt, un autre worker reprend alors la main.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._fd = None
+
+    def acquire(self):
+        if self._fd is not None:
+            return True
+        if fcntl is None:
+            self._fd = -1
+            return True
+        fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o600)
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            os.close(fd)
+            return False
+        self._fd = fd
+        return True
+
+    def release(self):
+        if self._fd is None:
+            return
+        if self._fd >= 0:
+            fcntl.flock(self._fd, fcntl.LOCK_UN)
+            os.close(self._fd)
+        self._fd = None
+
+
+class RatesRefresher:
+    """
+    Thread de fond qui rafraîchit les taux à intervalle fixe.
+
+    - leader (détient `lock`) : appelle `refresh(base)` pour chaque base,
+      toutes les `interval` secondes (± `jitter` en fraction), avec un
+      backoff exponentiel plafonné à `max_backoff` après un échec (ou le
+      `retry_after` de l'erreur s'il est plus long). `pace(interval, calls)`,
+      s'il est fourni, peut étirer l'intervalle (quota upstream) ;
+    - follower : appelle `follow()` toutes les `follow_interval` secondes
+      pour charger ce que le leader a publié, et retente de devenir leader.
+    """
+
+    def __init__(self, refresh, follow=None, bases=("USD",), interval=300,
+                 jitter=0.1, retry_base=5, max_backoff=300, follow_interval=5,
+                 lock=None, pace=None, rand=random.random):
+        self._refresh = refresh
+        self._follow = follow
+        self.bases = tuple(bases)
+        self.interval = interval
+        self.jitter = jitter
+        self.retry_base = retry_base
+        self.max_backoff = max_backoff
+        self.follow_interval = follow_interval
+        self.lock = lock
+        self._pace = pace
+        self._rand = rand
+        self.failures = 0
+        self._stop = threading.Event()
+        self._thread = None
+
+    def _jittered(self, delay):
+        return delay * (1 + self.jitter * (2 * self._rand() - 1))
+
+    def _backoff(self):
+        return min(self.retry_base * 2 ** (self.failures - 1), self.max_backoff)
+
+    def is_leader(self):
+        return self.lock is None or self.lock.acquire()
+
+    def run_once(self):
+        """Exécute un cycle et retourne le délai avant le suivant."""
+        if not self.is_leader():
+            if self._follow is not None:
+                try:
+                    self._follow()
+                except Exception:
+                    logger.exception("Failed to load published rates")
+            return self._jittered(self.follow_interval)
+
+        try:
+            for base in self.bases:
+                self._refresh(base)
+        except Exception as error:
+            self.failures += 1
+            logger.exception("Rates refresh failed (attempt %d)", self.failures)
+            return self._jittered(max(self._backoff(), getattr(error, "retry_after", None) or 0))
+
+        self.failures = 0
+        if self._pace is not None:
+            return self._jittered(self._pace(self.interval, len(self.bases)))
+        return self._jittered(self.interval)
+
+    def _loop(self):
+        delay = 0
+        while not self._stop.wait(delay):
+            delay = self.run_once()
+
+    def start(self):
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(
+            target=self._loop, name="rates-refresher", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout=None):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+        if self.lock is not None:
+            self.lock.release()
+
+    @property
+    def running(self):
+        return self._thread is not None and self._thread.is_alive()
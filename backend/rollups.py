@@ -0,0 +1,131 @@
+"""Agrégats OHLC et moyennes par période, maintenus à chaque snapshot."""
+import bisect
+import threading
+from datetime import datetime, timedelta, timezone
+
+from history_store import snapshot_time
+
+PERIODS = ("day", "week", "month")
+
+
+def bucket_start(when, period):
+    """Début (UTC) du bucket de `period` contenant `when`."""
+    day = datetime(when.year, when.month, when.day, tzinfo=timezone.utc)
+    if period == "day":
+        return day
+    if period == "week":
+        return day - timedelta(days=day.weekday())
+    if period == "month":
+        return day.replace(day=1)
+    raise ValueError(f"Unknown period: {period}")
+
+
+class Rollup:
+    """Agrégat d'une paire sur un bucket."""
+
+    __slots__ = ("open", "close", "min", "max", "total", "count")
+
+    def __init__(self, rate):
+        self.open = self.close = self.min = self.max = self.total = rate
+        self.count = 1
+
+    def add(self, rate):
+        self.close = rate
+        if rate < self.min:
+            self.min = rate
+        if rate > self.max:
+            self.max = rate
+        self.total += rate
+        self.count += 1
+
+    def to_dict(self):
+        return {
+            "open": self.open,
+            "close": self.close,
+            "min": self.min,
+            "max": self.max,
+            "mean": self.total / self.count,
+            "count": self.count,
+        }
+
+
+class RollupStore:
+    """
+    Agrégats journaliers, hebdomadaires et mensuels par paire de devises.
+
+    Chaque nouveau snapshot met à jour le bucket courant de chaque période
+    (O(paires suivies)) ; une requête ne lit que les buckets de la plage,
+    trouvés par bisection dans la liste triée de leurs débuts. Les paires
+    suivies sont `base -> devise` pour toutes les devises du snapshot, plus
+    les paires croisées de `cross_pairs`. Un snapshot est compté une seule
+    fois par horodatage upstream.
+    """
+
+    def __init__(self, cross_pairs=()):
+        self.cross_pairs = tuple(cross_pairs)
+        self._starts = {period: [] for period in PERIODS}
+        self._buckets = {period: {} for period in PERIODS}
+        self._last_seen = {}
+        self._lock = threading.Lock()
+
+    def _pair_rates(self, snapshot):
+        rates = snapshot.rates
+        for code, rate in rates.items():
+            yield (snapshot.base, code), rate
+        for from_currency, to_currency in self.cross_pairs:
+            if from_currency in rates and to_currency in rates and rates[from_currency]:
+                yield (from_currency, to_currency), rates[to_currency] / rates[from_currency]
+
+    def record(self, snapshot):
+        """Intègre le snapshot ; retourne False s'il a déjà été compté."""
+        when = snapshot_time(snapshot)
+        with self._lock:
+            last = self._last_seen.get(snapshot.base)
+            if last is not None and when <= last:
+                return False
+            self._last_seen[snapshot.base] = when
+            pair_rates = list(self._pair_rates(snapshot))
+            for period in PERIODS:
+                start = bucket_start(when, period)
+                bucket = self._buckets[period].get(start)
+                if bucket is None:
+                    bucket = self._buckets[period][start] = {}
+                    bisect.insort(self._starts[period], start)
+                for pair, rate in pair_rates:
+                    rollup = bucket.get(pair)
+                    if rollup is None:
+                        bucket[pair] = Rollup(rate)
+                    else:
+                        rollup.add(rate)
+            return True
+
+    def rebuild(self, snapshots):
+        """
+        Remplace les agrégats par ceux de `snapshots` (ordre chronologique),
+        relus de l'historique ; retourne le nombre de snapshots intégrés.
+        """
+        fresh = RollupStore(self.cross_pairs)
+        count = sum(fresh.record(snapshot) for snapshot in snapshots)
+        with self._lock:
+            self._starts, self._buckets, self._last_seen = \
+                fresh._starts, fresh._buckets, fresh._last_seen
+        return count
+
+    def tracks(self, from_currency, to_currency):
+        return (from_currency, to_currency) in self.cross_pairs or from_currency in self._last_seen
+
+    def aggregate(self, from_currency, to_currency, period, start, end):
+        """Buckets de `period` dont le début est dans [bucket(start), end]."""
+        if period not in PERIODS:
+            raise ValueError(f"Unknown period: {period}")
+        pair = (from_currency, to_currency)
+        with self._lock:
+            starts = self._starts[period]
+            first = bisect.bisect_left(starts, bucket_start(start, period))
+            last = bisect.bisect_right(starts, end)
+            result = []
+            for bucket_time in starts[first:last]:
+                rollup = self._buckets[period][bucket_time].get(pair)
+                if rollup is not None:
+                    result.append((bucket_time, rollup.to_dict()))
+            return result
@@ -0,0 +1,159 @@
+"""Publication des snapshots de taux entre les workers d'un même hôte."""
+import mmap
+import os
+import struct
+import threading
+import time
+
+from rates_cache import RatesSnapshot
+
+# magic, séquence (impaire pendant une écriture), version du snapshot,
+# nombre de devises, réservé, fetched_at, updated_at
+HEADER = struct.Struct("<8sQQIIdq")
+SEQUENCE = struct.Struct("<Q")
+MAGIC = b"RATESv1\0"
+CODE_SIZE = 8
+# Tentatives de lecture d'un segment en cours d'écriture avant d'abandonner
+READ_ATTEMPTS = 100
+
+
+class SharedSnapshot:
+    """
+    Snapshot d'une devise de base dans un fichier mappé en mémoire.
+
+    Le leader écrit en place sous un seqlock : le compteur de séquence est
+    impair pendant l'écriture et pair une fois le snapshot complet. Les
+    lecteurs comparent ce compteur (8 octets lus directement dans la page
+    partagée) à la dernière valeur vue et ne décodent le snapshot que s'il a
+    changé ; les taux sont lus via une vue `memoryview` sur le mapping, sans
+    copie intermédiaire.
+    """
+
+    def __init__(self, path, capacity=512):
+        self.path = path
+        self.capacity = capacity
+        self._codes_offset = HEADER.size
+        self._values_offset = HEADER.size + capacity * CODE_SIZE
+        self.size = self._values_offset + capacity * 8
+        self._map = None
+        self._writable = False
+        self._seen = None
+        self._open_lock = threading.Lock()
+
+    def _open(self, writable):
+        with self._open_lock:
+            return self._open_locked(writable)
+
+    def _open_locked(self, writable):
+        if self._map is not None and (self._writable or not writable):
+            return self._map
+        if writable:
+            fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o600)
+            try:
+                if os.fstat(fd).st_size != self.size:
+                    os.ftruncate(fd, self.size)
+                self._map = mmap.mmap(fd, self.size)
+            finally:
+                os.close(fd)
+            self._writable = True
+        else:
+            try:
+                fd = os.open(self.path, os.O_RDONLY)
+            except FileNotFoundError:
+                return None
+            try:
+                if os.fstat(fd).st_size != self.size:
+                    return None
+                self._map = mmap.mmap(fd, self.size, access=mmap.ACCESS_READ)
+            finally:
+                os.close(fd)
+        return self._map
+
+    def sequence(self):
+        """Compteur de publication courant (0 si rien n'a été publié)."""
+        segment = self._open(writable=False)
+        if segment is None:
+            return 0
+        return SEQUENCE.unpack_from(segment, 8)[0]
+
+    def publish(self, snapshot):
+        if len(snapshot.rates) > self.capacity:
+            raise ValueError(f"{len(snapshot.rates)} rates exceed capacity {self.capacity}")
+        segment = self._open(writable=True)
+        sequence = SEQUENCE.unpack_from(segment, 8)[0]
+        if sequence % 2:
+            sequence += 1  # écriture précédente interrompue
+        SEQUENCE.pack_into(segment, 8, sequence + 1)
+
+        codes = [code.encode("ascii") for code in snapshot.rates]
+        struct.pack_into("<" + f"{CODE_SIZE}s" * len(codes), segment, self._codes_offset,
+                         *codes)
+        struct.pack_into(f"<{len(codes)}d", segment, self._values_offset,
+                         *snapshot.rates.values())
+        HEADER.pack_into(segment, 0, MAGIC, sequence + 1, snapshot.version, len(codes),
+                         0, snapshot.fetched_at, snapshot.updated_at)
+        SEQUENCE.pack_into(segment, 8, sequence + 2)
+        # Le process qui publie a déjà ce snapshot en mémoire : ne pas le
+        # recharger (ni le préparer une seconde fois) depuis le segment
+        self._seen = sequence + 2
+
+    def load(self, base):
+        """
+        Retourne le snapshot publié s'il a changé depuis la dernière lecture.
+
+        Un segment resté en cours d'écriture (leader tué au milieu d'une
+        publication, séquence impaire) n'est relu que `READ_ATTEMPTS` fois :
+        le lecteur garde alors son snapshot (None) au lieu de boucler, et
+        le rafraîchisseur peut reprendre la main pour republier.
+        """
+        segment = self._open(writable=False)
+        if segment is None:
+            return None
+        view = memoryview(segment)
+        try:
+            for _ in range(READ_ATTEMPTS):
+                before = SEQUENCE.unpack_from(segment, 8)[0]
+                if before == self._seen or before == 0:
+                    return None
+                if before % 2:
+                    time.sleep(0)  # écriture en cours : laisse la main au writer
+                    continue
+                magic, _, version, count, _, fetched_at, updated_at = \
+                    HEADER.unpack_from(segment, 0)
+                codes = view[self._codes_offset:self._codes_offset + count * CODE_SIZE]
+                values = view[self._values_offset:self._values_offset + count * 8].cast("d")
+                rates = {
+                    bytes(codes[i * CODE_SIZE:(i + 1) * CODE_SIZE]).rstrip(b"\0").decode("ascii"):
+                        values[i]
+                    for i in range(count)
+                }
+                values.release()
+                codes.release()
+                if SEQUENCE.unpack_from(segment, 8)[0] == before and magic == MAGIC:
+                    self._seen = before
+                    return RatesSnapshot(base, rates, fetched_at, updated_at, version)
+            return None
+        finally:
+            view.release()
+
+
+class SharedSnapshotStore:
+    """Un segment `SharedSnapshot` par devise de base dans `directory`."""
+
+    def __init__(self, directory, capacity=512):
+        self.directory = directory
+        self.capacity = capacity
+        self._segments = {}
+
+    def segment(self, base):
+        segment = self._segments.get(base)
+        if segment is None:
+            path = os.path.join(self.directory, f"rates-{base}.shm")
+            segment = self._segments.setdefault(base, SharedSnapshot(path, self.capacity))
+        return segment
+
+    def publish(self, snapshot):
+        self.segment(snapshot.base).publish(snapshot)
+
+    def load(self, base):
+        return self.segment(base).load(base)
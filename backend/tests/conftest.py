@@ -1,13 +1,40 @@
 """Configuration pytest pour les tests backend"""
+import asyncio
+import json
 import pytest
 import sys
 import os
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from flask import Response
+from werkzeug.test import EnvironBuilder
 
 # Ajouter le dossier parent au path pour importer app
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 
+# Segments partagés des tests isolés de ceux d'un éventuel serveur local
+os.environ.setdefault("RATES_SHARED_DIR", tempfile.mkdtemp(prefix="rates-tests-"))
+
 # Importer l'app Flask (votre app.py actuel)
-from app import app as flask_app
+import app as backend
+from app import app as flask_app, rates_cache, upstream_breaker
+import asgi
+
+
+@pytest.fixture(autouse=True)
+def reset_rates_cache():
+    """
+    Vide le cache des taux et referme le disjoncteur pour que chaque test
+    reparte d'un appel upstream
+    """
+    rates_cache.clear()
+    upstream_breaker.reset()
+    yield
+    rates_cache.clear()
+    upstream_breaker.reset()
 
 
 @pytest.fixture
@@ -22,12 +49,76 @@ def app():
     yield flask_app
 
 
-@pytest.fixture
-def client(app):
+class AsgiTestClient:
+    """
+    Client de test pour le point d'entrée ASGI, avec l'interface du client
+    Flask (`get`, `post`, réponses `get_json()`, `headers`, `data`) : la
+    requête est construite par Werkzeug puis traduite en scope ASGI.
+    """
+
+    def __init__(self, application):
+        self.application = application
+
+    def open(self, path, method="GET", **kwargs):
+        return asyncio.run(self.open_async(path, method, **kwargs))
+
+    async def open_async(self, path, method="GET", **kwargs):
+        environ = EnvironBuilder(path, method=method, **kwargs).get_environ()
+        body = environ["wsgi.input"].read()
+        headers = [(key[5:].replace("_", "-").lower().encode("latin-1"), value.encode("latin-1"))
+                   for key, value in environ.items() if key.startswith("HTTP_")]
+        for key in ("CONTENT_TYPE", "CONTENT_LENGTH"):
+            if environ.get(key):
+                headers.append((key.replace("_", "-").lower().encode(), environ[key].encode()))
+        scope = {
+            "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1",
+            "method": method, "scheme": "http", "path": environ["PATH_INFO"],
+            "raw_path": environ["PATH_INFO"].encode(), "root_path": "",
+            "query_string": environ["QUERY_STRING"].encode("latin-1"),
+            "headers": headers, "server": ("localhost", 80), "client": ("127.0.0.1", 12345),
+        }
+        messages = [{"type": "http.request", "body": body, "more_body": False}]
+        sent = []
+
+        async def receive():
+            return messages.pop(0) if messages else {"type": "http.disconnect"}
+
+        async def send(message):
+            sent.append(message)
+
+        await self.application(scope, receive, send)
+        start = next(message for message in sent if message["type"] == "http.response.start")
+        content = b"".join(message.get("body", b"") for message in sent
+                           if message["type"] == "http.response.body")
+        return Response(content, status=start["status"],
+                        headers=[(key.decode("latin-1"), value.decode("latin-1"))
+                                 for key, value in start["headers"]])
+
+    def get(self, path, **kwargs):
+        return self.open(path, "GET", **kwargs)
+
+    def post(self, path, **kwargs):
+        return self.open(path, "POST", **kwargs)
+
+
+async def fetch_rates_in_thread(base):
+    """
+    Fetch upstream de l'app ASGI dans les tests : le client synchrone, dans
+    un thread, pour que les mocks de `requests.Session.get` s'appliquent
+    aux deux points d'entrée.
+    """
+    return await asyncio.to_thread(backend.fetch_rates, base)
+
+
+@pytest.fixture(params=["wsgi", "asgi"])
+def client(app, request):
     """
     Fixture qui fournit un client de test Flask
     Permet de faire des requêtes HTTP simulées
+    Chaque test est joué contre app:app (WSGI) et asgi:application
     """
+    if request.param == "asgi":
+        return AsgiTestClient(asgi.create_app(fetch=fetch_rates_in_thread))
     return app.test_client()
 
 
@@ -36,4 +127,34 @@ def runner(app):
     """
     Fixture pour tester les commandes CLI (optionnel)
     """
-    return app.test_cli_runner()
\ No newline at end of file
+    return app.test_cli_runner()
+
+
+class FakeApiHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self):
+        self.server.paths.append(self.path)
+        status, delay = self.server.script.pop(0) if self.server.script else (200, 0)
+        time.sleep(delay)
+        body = json.dumps({'result': 'success', 'conversion_rates': {'EUR': 0.85}}).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def fake_api():
+    """Fausse API exchangerate-api sur un vrai socket local"""
+    server = ThreadingHTTPServer(('127.0.0.1', 0), FakeApiHandler)
+    server.daemon_threads = True
+    server.paths, server.script = [], []
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield server
+    server.shutdown()
+    server.server_close()
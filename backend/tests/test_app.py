@@ -22,7 +22,7 @@ def test_get_rates_endpoint_exists(client):
     }
     mock_response.raise_for_status = Mock()
     
-    with patch('requests.get', return_value=mock_response):
+    with patch('requests.Session.get', return_value=mock_response):
         response = client.get('/rates')
         assert response.status_code == 200
 
@@ -36,7 +36,7 @@ def test_rates_returns_json(client):
     }
     mock_response.raise_for_status = Mock()
     
-    with patch('requests.get', return_value=mock_response):
+    with patch('requests.Session.get', return_value=mock_response):
         response = client.get('/rates')
         assert response.content_type == 'application/json'
 
@@ -50,7 +50,7 @@ def test_rates_contains_conversion_rates(client):
     }
     mock_response.raise_for_status = Mock()
     
-    with patch('requests.get', return_value=mock_response):
+    with patch('requests.Session.get', return_value=mock_response):
         response = client.get('/rates')
         data = response.get_json()
         
@@ -67,6 +67,6 @@ def test_cors_headers_present(client):
     }
     mock_response.raise_for_status = Mock()
     
-    with patch('requests.get', return_value=mock_response):
+    with patch('requests.Session.get', return_value=mock_response):
         response = client.get('/rates')
         assert 'Access-Control-Allow-Origin' in response.headers
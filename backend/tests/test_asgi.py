@@ -0,0 +1,183 @@
+import asyncio
+import threading
+import time
+
+import pytest
+from flask import Flask
+
+import app as backend
+from asgi import RatesApplication, create_app
+from async_upstream import AsyncUpstreamClient
+from tests.conftest import AsgiTestClient
+from upstream import UpstreamError
+
+
+def payload(eur=0.85):
+    return {'result': 'success', 'conversion_rates': {'USD': 1, 'EUR': eur, 'GBP': 0.75}}
+
+
+class SlowUpstream:
+    def __init__(self, delay=0.2, error=None):
+        self.delay = delay
+        self.error = error
+        self.calls = 0
+
+    async def __call__(self, base):
+        self.calls += 1
+        await asyncio.sleep(self.delay)
+        if self.error is not None:
+            raise self.error
+        return payload()
+
+
+def test_concurrent_requests_share_one_non_blocking_fetch():
+    upstream = SlowUpstream(delay=0.3)
+    client = AsgiTestClient(create_app(fetch=upstream))
+
+    async def burst():
+        return await asyncio.gather(*(client.open_async('/rates') for _ in range(500)))
+
+    started = time.perf_counter()
+    responses = asyncio.run(burst())
+
+    assert upstream.calls == 1
+    assert {response.status_code for response in responses} == {200}
+    assert responses[0].get_json()['conversion_rates']['EUR'] == 0.85
+    # 500 connexions en attente sur une seule boucle : environ un seul délai upstream
+    assert time.perf_counter() - started < 3
+
+
+def test_concurrent_failure_is_shared():
+    upstream = SlowUpstream(delay=0.1, error=UpstreamError('Upstream returned HTTP 502', 502))
+    client = AsgiTestClient(create_app(fetch=upstream))
+
+    async def burst():
+        return await asyncio.gather(*(client.open_async('/convert?from=USD&to=EUR')
+                                      for _ in range(50)))
+
+    responses = asyncio.run(burst())
+    assert upstream.calls == 1
+    assert {response.status_code for response in responses} == {500}
+
+
+def test_stale_snapshot_revalidated_in_background():
+    upstream = SlowUpstream(delay=0)
+    client = AsgiTestClient(create_app(fetch=upstream))
+    client.get('/rates')
+    snapshot = backend.rates_cache.get('USD')
+    backend.rates_cache.publish(type(snapshot)('USD', snapshot.rates,
+                                               time.time() - backend.rates_cache.soft_ttl - 1))
+
+    async def stale_read():
+        response = await client.open_async('/rates')
+        await asyncio.sleep(0.05)  # laisse la tâche de revalidation finir
+        return response
+
+    response = asyncio.run(stale_read())
+    assert response.get_json()['stale'] is True
+    assert upstream.calls == 2
+    assert backend.rates_cache.lookup('USD')[1] is False
+
+
+def test_slow_views_run_concurrently():
+    slow_app = Flask(__name__)
+    threads = set()
+
+    @slow_app.route('/slow')
+    def slow_view():
+        threads.add(threading.get_ident())
+        time.sleep(0.5)
+        return 'done'
+
+    client = AsgiTestClient(RatesApplication(slow_app, SlowUpstream()))
+
+    async def pair():
+        return await asyncio.gather(*(client.open_async('/slow') for _ in range(2)))
+
+    started = time.perf_counter()
+    responses = asyncio.run(pair())
+
+    assert {response.status_code for response in responses} == {200}
+    assert len(threads) == 2
+    assert time.perf_counter() - started < 0.9
+
+
+def test_lifespan_startup_and_shutdown():
+    events = [{'type': 'lifespan.startup'}, {'type': 'lifespan.shutdown'}]
+    sent = []
+
+    async def receive():
+        return events.pop(0)
+
+    async def send(message):
+        sent.append(message['type'])
+
+    async def run():
+        await create_app(fetch=SlowUpstream())({'type': 'lifespan'}, receive, send)
+
+    asyncio.run(run())
+    assert sent == ['lifespan.startup.complete', 'lifespan.shutdown.complete']
+
+
+def make_async_client(server, **kwargs):
+    async def no_sleep(delay):
+        pass
+
+    kwargs.setdefault('sleep', no_sleep)
+    return AsyncUpstreamClient(f'http://127.0.0.1:{server.server_port}/v6', 'secret-key', **kwargs)
+
+
+def test_async_client_retries_server_errors(fake_api):
+    fake_api.script = [(503, 0), (200, 0)]
+
+    async def run():
+        client = make_async_client(fake_api, retries=2)
+        try:
+            return await client.fetch_latest('USD'), client.stats()
+        finally:
+            await client.aclose()
+
+    rates, stats = asyncio.run(run())
+    assert rates['conversion_rates'] == {'EUR': 0.85}
+    assert stats['retries'] == 1
+    assert fake_api.paths == ['/v6/secret-key/latest/USD'] * 2
+
+
+@pytest.mark.parametrize('script, message', [
+    ([(404, 0)], 'HTTP 404'),
+    ([(200, 0.5)], 'timed out'),
+])
+def test_async_client_errors_hide_the_key(fake_api, script, message):
+    fake_api.script = script
+
+    async def run():
+        client = make_async_client(fake_api, read_timeout=0.1, retries=0)
+        try:
+            await client.fetch_latest('USD')
+        finally:
+            await client.aclose()
+
+    with pytest.raises(UpstreamError, match=message) as error:
+        asyncio.run(run())
+    assert 'secret-key' not in str(error.value)
+
+
+def test_async_hedge_wins_and_cancels_the_slow_request(fake_api):
+    fake_api.script = [(200, 1.0), (200, 0)]
+    outcomes = []
+
+    async def run():
+        client = make_async_client(fake_api, hedge_percentile=95, on_hedge=outcomes.append)
+        for _ in range(client.latencies.min_samples):
+            client.latencies.record(0.01)
+        try:
+            started = asyncio.get_running_loop().time()
+            rates = await client.fetch_latest('USD')
+            return rates, asyncio.get_running_loop().time() - started
+        finally:
+            await client.aclose()
+
+    rates, elapsed = asyncio.run(run())
+    assert rates['conversion_rates'] == {'EUR': 0.85}
+    assert elapsed < 0.5
+    assert outcomes == ['sent', 'won']
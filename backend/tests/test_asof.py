@@ -0,0 +1,98 @@
+import time
+from unittest.mock import patch
+
+import numpy as np
+import pytest
+
+import app as backend
+from asof_index import AsOfIndex, RateNotAvailable
+from conversion import UnknownCurrency
+from rates_cache import RatesSnapshot
+
+DAY = 86400
+T0 = 1704067200  # 2024-01-01T00:00:00Z
+BATCH_HEADERS = {'X-CSRF-Token': 'default_csrf_token'}
+
+
+def snapshot(day, eur, gbp=0.8):
+    when = T0 + day * DAY
+    return RatesSnapshot('USD', {'USD': 1.0, 'EUR': eur, 'GBP': gbp}, when, when)
+
+
+@pytest.fixture
+def index():
+    index = AsOfIndex()
+    for day, eur in enumerate([0.90, 0.91, 0.92]):
+        index.record(snapshot(day, eur))
+    return index
+
+
+def test_rate_at_uses_last_snapshot_before_instant(index):
+    assert index.rate_at('EUR', T0) == 0.90
+    assert index.rate_at('EUR', T0 + DAY - 1) == 0.90
+    assert index.rate_at('EUR', T0 + DAY) == 0.91
+    assert index.rate_at('EUR', T0 + 100 * DAY) == 0.92
+
+    with pytest.raises(RateNotAvailable):
+        index.rate_at('EUR', T0 - 1)
+    with pytest.raises(UnknownCurrency):
+        index.rate_at('XXX', T0)
+
+
+def test_out_of_order_points_are_inserted_sorted():
+    index = AsOfIndex()
+    index.record(snapshot(2, 0.92))
+    index.record(snapshot(0, 0.90))
+    assert index.rate_at('EUR', T0 + DAY) == 0.90
+    assert len(index) == 6
+
+
+def test_convert_many_as_of(index):
+    results = index.convert_many([100, 100, 100], ['USD', 'EUR', 'USD'], 'GBP',
+                                 [T0, T0 + DAY, T0 + 2 * DAY + 5])
+    assert results.tolist() == pytest.approx([80.0, 100 * 0.8 / 0.91, 80.0])
+
+
+def test_convert_many_rejects_overflowing_results(index):
+    with pytest.raises(ValueError, match='out of range'):
+        index.convert_many([1.5e308], 'GBP', 'USD', T0)
+
+
+def test_convert_many_scales_to_large_backfills(index):
+    size = 1_000_000
+    rng = np.random.default_rng(0)
+    started = time.perf_counter()
+    results = index.convert_many(np.ones(size), 'USD', 'EUR',
+                                 T0 + rng.uniform(0, 3 * DAY, size))
+    assert time.perf_counter() - started < 5
+    assert set(np.unique(results)) <= {0.90, 0.91, 0.92}
+
+
+def test_convert_endpoint_at_timestamp(client, index):
+    with patch.object(backend, 'asof_index', index):
+        response = client.get(f'/convert?from=USD&to=EUR&amount=100&at={T0 + DAY + 60}')
+        missing = client.get('/convert?from=USD&to=EUR&amount=1&at=2023-06-01')
+
+    data = response.get_json()
+    assert data['result'] == '91.00'
+    assert data['at'] == '2024-01-02T00:01:00+00:00'
+    assert missing.status_code == 404
+
+
+def test_convert_batch_as_of(client, index):
+    body = {'amounts': [100, 100], 'from': 'USD', 'to': 'EUR',
+            'at': ['2024-01-01T12:00:00Z', T0 + 2 * DAY]}
+    with patch.object(backend, 'asof_index', index):
+        response = client.post('/convert/batch', json=body, headers=BATCH_HEADERS)
+        exact = client.post('/convert/batch', json=dict(body, mode='exact'),
+                            headers=BATCH_HEADERS)
+
+    assert response.get_json()['results'] == pytest.approx([90.0, 92.0])
+    assert exact.status_code == 400
+
+
+def test_published_snapshots_are_indexed():
+    index = AsOfIndex()
+    with patch.object(backend, 'asof_index', index):
+        backend.rates_cache.publish(snapshot(0, 0.9))
+    assert index.rate_at('EUR', T0) == 0.9
@@ -0,0 +1,104 @@
+from unittest.mock import patch, Mock
+
+import pytest
+
+from app import rates_cache, upstream_breaker
+from circuit_breaker import CircuitBreaker, CircuitOpen, CLOSED, OPEN, HALF_OPEN
+from upstream import UpstreamError
+
+
+class FakeClock:
+    def __init__(self, now=1000.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+def failing():
+    raise UpstreamError("upstream down")
+
+
+def trip(breaker, times):
+    for _ in range(times):
+        with pytest.raises(UpstreamError):
+            breaker.call(failing)
+
+
+def test_opens_after_threshold_and_fails_fast():
+    breaker = CircuitBreaker(failure_threshold=3, reset_timeout=30, clock=FakeClock())
+    trip(breaker, 3)
+    assert breaker.state == OPEN
+
+    func = Mock()
+    with pytest.raises(CircuitOpen):
+        breaker.call(func)
+    assert func.call_count == 0
+
+
+def test_success_resets_failure_count():
+    breaker = CircuitBreaker(failure_threshold=3, clock=FakeClock())
+    trip(breaker, 2)
+    breaker.call(lambda: 'ok')
+    trip(breaker, 2)
+    assert breaker.state == CLOSED
+
+
+def test_half_open_trial_closes_or_reopens():
+    clock = FakeClock()
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=30, clock=clock)
+    trip(breaker, 1)
+
+    clock.now += 31
+    assert breaker.state == HALF_OPEN
+    trip(breaker, 1)
+    assert breaker.state == OPEN
+
+    clock.now += 31
+    assert breaker.call(lambda: 'ok') == 'ok'
+    assert breaker.state == CLOSED
+
+
+def test_half_open_allows_limited_trials():
+    clock = FakeClock()
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=30, clock=clock)
+    trip(breaker, 1)
+    clock.now += 31
+
+    def nested():
+        # Un second appel pendant l'essai est refusé
+        with pytest.raises(CircuitOpen):
+            breaker.call(lambda: 'ok')
+        return 'trial'
+
+    assert breaker.call(nested) == 'trial'
+
+
+def test_open_circuit_serves_last_snapshot(client):
+    mock_response = Mock()
+    mock_response.json.return_value = {'result': 'success', 'conversion_rates': {'EUR': 0.85}}
+    mock_response.raise_for_status = Mock()
+
+    with patch('requests.Session.get', return_value=mock_response) as mock_get:
+        client.get('/rates')
+        # Snapshot au-delà du hard TTL, circuit ouvert
+        with patch.object(rates_cache, 'hard_ttl', -1), \
+                patch.object(rates_cache, 'soft_ttl', -1), \
+                patch.object(upstream_breaker, '_state', OPEN), \
+                patch.object(upstream_breaker, '_opened_at', float('inf')):
+            response = client.get('/rates')
+
+        assert mock_get.call_count == 1
+    assert response.status_code == 200
+    assert response.get_json()['stale'] is True
+    assert response.get_json()['conversion_rates']['EUR'] == 0.85
+
+
+def test_open_circuit_without_snapshot_fails_fast(client):
+    with patch('requests.Session.get') as mock_get, \
+            patch.object(upstream_breaker, '_state', OPEN), \
+            patch.object(upstream_breaker, '_opened_at', float('inf')):
+        response = client.get('/rates')
+
+    assert response.status_code == 503
+    assert mock_get.call_count == 0
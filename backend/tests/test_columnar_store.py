@@ -0,0 +1,88 @@
+from datetime import datetime, timezone
+from unittest.mock import patch
+
+import numpy as np
+import pytest
+
+import app as backend
+from columnar_store import ColumnarHistoryStore
+from rates_cache import RatesSnapshot
+
+DAY = 86400
+NEW_YEAR_2024 = 1704067200
+
+
+def snapshot(day, rates):
+    when = NEW_YEAR_2024 + day * DAY
+    return RatesSnapshot('USD', rates, when + 60, when)
+
+
+def utc(*args):
+    return datetime(*args, tzinfo=timezone.utc)
+
+
+@pytest.fixture
+def store(tmp_path):
+    return ColumnarHistoryStore(str(tmp_path), capacity=8)
+
+
+def test_range_query_is_a_memmap_slice(store):
+    for day in range(5):
+        store.record(snapshot(day, {'USD': 1.0, 'EUR': 0.80 + day / 100}))
+
+    (first_day, values), = store.series('EUR', utc(2024, 1, 2), utc(2024, 1, 4))
+    assert str(first_day) == '2024-01-02'
+    assert values.tolist() == pytest.approx([0.81, 0.82, 0.83])
+    # Vue sur le fichier mappé, pas une copie
+    assert isinstance(values.base, np.memmap) or isinstance(values, np.memmap)
+
+
+def test_history_skips_missing_days_and_spans_years(store):
+    store.record(RatesSnapshot('USD', {'EUR': 0.90}, 0, 1703980800))  # 2023-12-31
+    store.record(snapshot(0, {'EUR': 0.91}))
+    store.record(snapshot(2, {'EUR': 0.93}))
+
+    points = store.history('EUR', utc(2023, 12, 30), utc(2024, 1, 31))
+    assert points == [(utc(2023, 12, 31), 0.90), (utc(2024, 1, 1), 0.91),
+                      (utc(2024, 1, 3), 0.93)]
+
+
+def test_snapshots_one_per_archived_day(store):
+    store.record(RatesSnapshot('USD', {'EUR': 0.90}, 0, 1703980800))  # 2023-12-31
+    store.record(snapshot(1, {'EUR': 0.92, 'GBP': 0.79}))
+
+    snapshots = list(store.snapshots(utc(2023, 12, 1), utc(2024, 1, 31)))
+    assert [s.updated_at for s in snapshots] == [1703980800, NEW_YEAR_2024 + DAY]
+    assert [s.rates for s in snapshots] == [{'EUR': 0.90}, {'EUR': 0.92, 'GBP': 0.79}]
+
+
+def test_currency_header_is_append_only(store):
+    store.record(snapshot(0, {'EUR': 0.9, 'GBP': 0.8}))
+    store.record(snapshot(1, {'MAD': 10.0, 'EUR': 0.91}))
+
+    assert store.history('GBP', utc(2024, 1, 1), utc(2024, 1, 2)) == [(utc(2024, 1, 1), 0.8)]
+    assert store.history('MAD', utc(2024, 1, 1), utc(2024, 1, 2)) == [(utc(2024, 1, 2), 10.0)]
+    assert store.history('XXX', utc(2024, 1, 1), utc(2024, 1, 2)) == []
+
+
+def test_reader_sees_later_writes(store, tmp_path):
+    reader = ColumnarHistoryStore(str(tmp_path), capacity=8)
+    store.record(snapshot(0, {'EUR': 0.9}))
+    assert len(reader.history('EUR', utc(2024, 1, 1), utc(2024, 1, 5))) == 1
+
+    store.record(snapshot(1, {'EUR': 0.91}))
+    assert len(reader.history('EUR', utc(2024, 1, 1), utc(2024, 1, 5))) == 2
+
+
+def test_capacity_is_enforced(store):
+    with pytest.raises(ValueError):
+        store.record(snapshot(0, {f'C{i}': 1.0 for i in range(9)}))
+
+
+def test_history_endpoint_prefers_columnar_store(client, store):
+    store.record(snapshot(0, {'EUR': 0.9}))
+    with patch.object(backend, 'columnar_store', store):
+        response = client.get('/rates/history?currency=EUR&from=2024-01-01&to=2024-01-10')
+
+    assert response.get_json()['points'] == [
+        {'timestamp': '2024-01-01T00:00:00+00:00', 'rate': 0.9}]
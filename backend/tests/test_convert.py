@@ -0,0 +1,139 @@
+from decimal import Decimal
+from unittest.mock import patch, Mock
+
+import pytest
+
+from conversion import CrossRates, DecimalRates, UnknownCurrency
+
+
+RATES = {'USD': 1, 'EUR': 0.85, 'GBP': 0.73, 'MAD': 10.0}
+
+
+def mock_upstream():
+    mock_response = Mock()
+    mock_response.json.return_value = {'result': 'success', 'conversion_rates': RATES}
+    mock_response.raise_for_status = Mock()
+    return patch('requests.Session.get', return_value=mock_response)
+
+
+def test_cross_rate_matrix():
+    cross = CrossRates(RATES)
+    assert cross.matrix.shape == (4, 4)
+    assert cross.rate('USD', 'EUR') == pytest.approx(0.85)
+    assert cross.rate('EUR', 'MAD') == pytest.approx(10.0 / 0.85)
+    assert cross.rate('GBP', 'GBP') == 1.0
+
+
+def test_unknown_currency():
+    with pytest.raises(UnknownCurrency):
+        CrossRates(RATES).rate('USD', 'XXX')
+
+
+def test_convert_endpoint(client):
+    with mock_upstream():
+        response = client.get('/convert?from=eur&to=MAD&amount=100&mode=float')
+
+    assert response.status_code == 200
+    data = response.get_json()
+    assert data['from'] == 'EUR'
+    assert data['result'] == pytest.approx(100 * 10.0 / 0.85)
+
+
+def test_convert_matrix_built_once_per_snapshot(client):
+    with mock_upstream(), patch('rates_cache.CrossRates', wraps=CrossRates) as build:
+        client.get('/convert?from=USD&to=EUR&amount=1&mode=float')
+        client.get('/convert?from=GBP&to=MAD&amount=2&mode=float')
+        assert build.call_count == 1
+
+
+@pytest.mark.parametrize('query', [
+    'to=EUR&amount=1',
+    'from=USD&to=EUR&amount=abc',
+    'from=USD&to=EUR&amount=nan',
+    'from=USD&to=XXX&amount=1',
+    'from=USD&to=EUR&amount=1&mode=approx',
+    'from=USD&to=EUR&amount=1e40',
+    'from=USD&to=MAD&amount=1e308&mode=float',
+])
+def test_convert_rejects_invalid_requests(client, query):
+    with mock_upstream():
+        response = client.get(f'/convert?{query}')
+    assert response.status_code == 400
+    assert response.get_json()['status'] == 'error'
+
+
+BATCH_HEADERS = {'X-CSRF-Token': 'default_csrf_token'}
+
+
+def test_convert_many_is_vectorized():
+    cross = CrossRates(RATES)
+    results = cross.convert_many([100, 10, 1], ['USD', 'EUR', 'MAD'], 'GBP')
+    assert results.tolist() == pytest.approx([73.0, 10 * 0.73 / 0.85, 0.073])
+
+
+def test_convert_batch_endpoint(client):
+    body = {'amounts': [100, 200, 50], 'from': ['USD', 'eur', 'USD'], 'to': 'MAD'}
+    with mock_upstream():
+        response = client.post('/convert/batch', json=body, headers=BATCH_HEADERS)
+
+    assert response.status_code == 200
+    data = response.get_json()
+    assert data['count'] == 3
+    assert data['results'] == pytest.approx([1000.0, 200 * 10.0 / 0.85, 500.0])
+
+
+def test_convert_batch_requires_csrf_token(client):
+    body = {'amounts': [1], 'from': 'USD', 'to': 'EUR'}
+    with mock_upstream():
+        assert client.post('/convert/batch', json=body).status_code == 403
+        response = client.post('/convert/batch', json=body,
+                               headers={'X-CSRF-Token': 'wrong'})
+        assert response.status_code == 403
+
+
+@pytest.mark.parametrize('body', [
+    {'amounts': [1, 2], 'from': ['USD'], 'to': 'EUR'},
+    {'amounts': [1], 'from': 'USD', 'to': 'XXX'},
+    {'amounts': ['a'], 'from': 'USD', 'to': 'EUR'},
+    {'amounts': 1, 'from': 'USD', 'to': 'EUR'},
+    {'amounts': [1], 'from': 3, 'to': 'EUR'},
+    {'amounts': ['1e40'], 'from': 'USD', 'to': 'EUR', 'mode': 'exact'},
+    {'amounts': [1e308], 'from': 'USD', 'to': 'MAD'},
+])
+def test_convert_batch_rejects_invalid_requests(client, body):
+    with mock_upstream():
+        response = client.post('/convert/batch', json=body, headers=BATCH_HEADERS)
+    assert response.status_code == 400
+
+
+def test_decimal_engine_uses_minor_units_and_bankers_rounding():
+    engine = DecimalRates({'USD': 1, 'EUR': 0.5, 'JPY': 100, 'KWD': 0.25})
+
+    assert engine.convert(Decimal('0.125'), 'USD', 'USD') == Decimal('0.12')
+    assert engine.convert(Decimal('0.135'), 'USD', 'USD') == Decimal('0.14')
+    assert engine.convert(Decimal('1.005'), 'USD', 'JPY') == Decimal('100')
+    assert engine.convert(Decimal('1'), 'EUR', 'KWD') == Decimal('0.500')
+    assert str(engine.rate('EUR', 'JPY')) == '200.0000000000'
+
+
+def test_convert_endpoint_is_exact_by_default(client):
+    with mock_upstream():
+        response = client.get('/convert?from=USD&to=EUR&amount=10.10')
+
+    data = response.get_json()
+    assert data['mode'] == 'exact'
+    assert data['amount'] == '10.10'
+    assert data['result'] == '8.58'  # 8.585 arrondi au pair
+
+
+def test_convert_batch_exact_mode(client):
+    body = {'amounts': ['10.10', 3], 'from': 'USD', 'to': ['EUR', 'MAD'], 'mode': 'exact'}
+    with mock_upstream():
+        response = client.post('/convert/batch', json=body, headers=BATCH_HEADERS)
+
+    assert response.get_json()['results'] == ['8.58', '30.00']
+
+
+def test_decimal_engine_rejects_amounts_beyond_its_precision():
+    with pytest.raises(ValueError, match='too large'):
+        DecimalRates(RATES).convert(Decimal('1e40'), 'USD', 'EUR')
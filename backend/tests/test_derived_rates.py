@@ -0,0 +1,122 @@
+import gzip
+from unittest.mock import patch, Mock
+
+import pytest
+
+import app
+from derived_tables import BodyLRU
+from rates_cache import RatesSnapshot
+
+
+def mock_upstream():
+    response = Mock(status_code=200)
+    response.json.return_value = {
+        'result': 'success',
+        'time_last_update_unix': 1704067200,
+        'conversion_rates': {'USD': 1, 'EUR': 0.8, 'GBP': 0.5, 'MAD': 10},
+    }
+    return patch('requests.Session.get', return_value=response)
+
+
+def test_eur_table_derived_from_one_usd_fetch(client):
+    with mock_upstream() as upstream:
+        eur = client.get('/rates/eur')
+        gbp = client.get('/rates/GBP')
+
+    assert upstream.call_count == 1
+    data = eur.get_json()
+    assert data['base_code'] == 'EUR'
+    assert data['conversion_rates'] == pytest.approx(
+        {'USD': 1.25, 'EUR': 1.0, 'GBP': 0.625, 'MAD': 12.5})
+    assert gbp.get_json()['conversion_rates']['USD'] == 2.0
+
+
+def test_unknown_base_is_404(client):
+    with mock_upstream():
+        response = client.get('/rates/XXX')
+    assert response.status_code == 404
+    assert response.get_json()['status'] == 'error'
+
+
+def test_derived_table_etag_and_gzip(client):
+    with mock_upstream():
+        usd_etag = client.get('/rates').headers['ETag']
+        response = client.get('/rates/EUR', headers={'Accept-Encoding': 'gzip'})
+        etag = response.headers['ETag']
+        cached = client.get('/rates/EUR', headers={'Accept-Encoding': 'gzip',
+                                                    'If-None-Match': etag})
+
+    assert response.headers['Content-Encoding'] == 'gzip'
+    assert b'"base_code":"EUR"' in gzip.decompress(response.data)
+    assert etag != usd_etag and 'EUR' in etag
+    assert cached.status_code == 304
+
+
+def test_routes_still_win_over_base_converter(client):
+    with mock_upstream():
+        response = client.get('/rates/history?currency=EUR')
+    assert response.get_json()['message'] != 'Unknown base currency'
+
+
+def test_lru_is_bounded_and_built_once():
+    lru = BodyLRU(maxsize=2)
+    build = Mock(side_effect=lambda: object())
+
+    first = lru.get('EUR', build)
+    assert lru.get('EUR', build) is first
+    lru.get('GBP', build)
+    lru.get('MAD', build)  # évince EUR, le moins récemment utilisé
+    assert len(lru) == 2
+    assert lru.get('EUR', build) is not first
+    assert build.call_count == 4
+
+
+def test_new_snapshot_version_starts_empty():
+    rates = {'USD': 1, 'EUR': 0.8}
+    old = RatesSnapshot('USD', rates, 0, version=1)
+    old.table_body(False, 'EUR')
+    old.table_body(False, symbols=('EUR',))
+    new = RatesSnapshot('USD', rates, 0, version=2)
+    assert len(new.derived_tables) == 0 and len(new.subset_bodies) == 0
+
+
+def test_symbols_filter_rates(client):
+    with mock_upstream():
+        response = client.get('/rates?symbols=gbp, EUR,EUR')
+    assert response.status_code == 200
+    data = response.get_json()
+    assert data['conversion_rates'] == {'EUR': 0.8, 'GBP': 0.5}
+    assert 'base_code' not in data
+
+
+def test_symbols_filter_derived_base(client):
+    with mock_upstream():
+        data = client.get('/rates/eur?symbols=GBP,USD').get_json()
+    assert data['base_code'] == 'EUR'
+    assert data['conversion_rates'] == pytest.approx({'GBP': 0.625, 'USD': 1.25})
+
+
+def test_symbols_normalized_share_one_cached_body(client):
+    with mock_upstream():
+        first = client.get('/rates?symbols=EUR,GBP')
+        second = client.get('/rates?symbols=gbp,eur,GBP')
+        full = client.get('/rates')
+    assert first.headers['ETag'] == second.headers['ETag'] != full.headers['ETag']
+    snapshot = app.rates_cache.latest('USD')
+    assert len(snapshot.subset_bodies) == 1
+
+
+def test_symbols_filter_rejects_bad_input(client):
+    with mock_upstream():
+        unknown = client.get('/rates?symbols=EUR,XYZ')
+        malformed = client.get('/rates?symbols=EURO')
+        unknown_base = client.get('/rates/XYZ?symbols=EUR')
+    assert unknown.status_code == 400 and 'XYZ' in unknown.get_json()['error']
+    assert malformed.status_code == 400
+    assert unknown_base.status_code == 404
+
+
+def test_empty_symbols_serves_full_table(client):
+    with mock_upstream():
+        data = client.get('/rates?symbols=').get_json()
+    assert len(data['conversion_rates']) > 2
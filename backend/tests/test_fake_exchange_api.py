@@ -0,0 +1,106 @@
+import time
+
+import pytest
+import requests
+
+import app as backend
+from fake_exchange_api import FakeApiConfig, FakeExchangeApi
+
+
+@pytest.fixture
+def fake_exchange():
+    with FakeExchangeApi(FakeApiConfig(seed=1)) as server:
+        yield server
+
+
+@pytest.fixture
+def backend_on_fake(fake_exchange, monkeypatch):
+    """L'app réelle (session poolée, timeouts, retries) branchée sur le faux serveur"""
+    monkeypatch.setattr(backend.upstream, 'base_url', fake_exchange.url)
+    monkeypatch.setattr(backend.upstream, '_sleep', lambda delay: None)
+    return fake_exchange
+
+
+def test_payload_size_and_base(fake_exchange):
+    fake_exchange.config.currencies = 40
+    data = requests.get(f'{fake_exchange.url}/key/latest/EUR', timeout=2).json()
+
+    assert data['base_code'] == 'EUR'
+    assert len(data['conversion_rates']) == 40
+    assert data['conversion_rates']['EUR'] == 1.0
+    assert requests.get(f'{fake_exchange.url}/key/latest/ZZZ', timeout=2).status_code == 404
+
+
+def test_rate_limit_returns_retry_after(fake_exchange):
+    fake_exchange.config.rate_limit, fake_exchange.config.window = 2, 30
+    statuses = [requests.get(f'{fake_exchange.url}/key/latest/USD', timeout=2)
+                for _ in range(3)]
+
+    assert [response.status_code for response in statuses] == [200, 200, 429]
+    assert 1 <= int(statuses[2].headers['Retry-After']) <= 30
+    assert statuses[2].json()['error-type'] == 'quota-reached'
+
+
+def test_error_rate_is_reproducible_with_a_seed():
+    def run():
+        with FakeExchangeApi(FakeApiConfig(error_rate=0.5, seed=7)) as server:
+            session = requests.Session()
+            return [session.get(f'{server.url}/key/latest/USD', timeout=2).status_code
+                    for _ in range(20)]
+
+    first = run()
+    assert first == run()
+    assert {200, 503} == set(first)
+
+
+def test_latency_and_tail(fake_exchange):
+    fake_exchange.config.latency = 0.05
+    started = time.perf_counter()
+    requests.get(f'{fake_exchange.url}/key/latest/USD', timeout=2)
+    assert time.perf_counter() - started >= 0.05
+
+
+def test_rates_served_over_real_socket(client, backend_on_fake):
+    response = client.get('/rates')
+
+    assert response.status_code == 200
+    assert len(response.get_json()['conversion_rates']) == 160
+    assert backend_on_fake.stats()['requests'] == 1
+
+
+def test_rate_limited_upstream_honours_retry_after(client, backend_on_fake):
+    backend_on_fake.config.rate_limit, backend_on_fake.config.window = 1, 60
+    assert client.get('/rates').status_code == 200
+    backend.rates_cache.clear()
+
+    # Retry-After (~60s) au-delà du budget de retries : aucun nouvel essai
+    assert client.get('/rates').status_code == 500
+    assert backend_on_fake.stats()['statuses'][429] == 1
+
+
+def test_short_retry_after_is_retried(client, backend_on_fake, monkeypatch):
+    backend_on_fake.config.rate_limit, backend_on_fake.config.window = 1, 1
+    delays = []
+    monkeypatch.setattr(backend.upstream, '_sleep', delays.append)
+    assert client.get('/rates').status_code == 200
+    backend.rates_cache.clear()
+
+    # Chaque 429 est retenté après son Retry-After (sleep patché)
+    assert client.get('/rates').status_code == 500
+    assert backend_on_fake.stats()['statuses'][429] == backend.upstream.retries + 1
+    assert delays == [1.0] * backend.upstream.retries
+
+
+def test_failing_upstream_opens_the_circuit(client, backend_on_fake):
+    backend_on_fake.config.error_rate = 1.0
+    threshold = backend.upstream_breaker.failure_threshold
+    for _ in range(threshold):
+        backend.rates_cache.clear()
+        assert client.get('/rates').status_code == 500
+    calls = backend_on_fake.stats()['requests']
+
+    backend.rates_cache.clear()
+    response = client.get('/rates')
+    assert response.status_code == 503
+    # Circuit ouvert : plus aucun appel upstream
+    assert backend_on_fake.stats()['requests'] == calls
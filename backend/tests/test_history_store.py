@@ -0,0 +1,110 @@
+from datetime import datetime, timezone
+from unittest.mock import patch, Mock
+
+import pytest
+
+mongomock = pytest.importorskip('mongomock')
+
+import app as backend  # noqa: E402
+from history_store import MongoHistoryStore  # noqa: E402
+from rates_cache import RatesSnapshot  # noqa: E402
+
+DAY = 86400
+START = 1700000000
+
+
+@pytest.fixture
+def store():
+    database = mongomock.MongoClient().currency_converter
+    return MongoHistoryStore(database, timeseries=False)
+
+
+def snapshot(day, eur):
+    return RatesSnapshot('USD', {'USD': 1.0, 'EUR': eur, 'GBP': 0.73}, START + day * DAY + 60,
+                         START + day * DAY)
+
+
+def test_record_is_bulk_and_deduplicated(store):
+    with patch.object(store.collection, 'insert_many',
+                      wraps=store.collection.insert_many) as insert_many:
+        assert store.record(snapshot(0, 0.85)) == 3
+        # Même horodatage upstream : rien de nouveau à écrire
+        assert store.record(snapshot(0, 0.85)) == 0
+        assert insert_many.call_count == 1
+
+
+def test_record_is_deduplicated_across_processes(store):
+    # Deux workers (ou un nouveau leader) sur la même collection
+    other = MongoHistoryStore(store._database, timeseries=False)
+    assert store.record(snapshot(0, 0.85)) == 3
+    assert other.record(snapshot(0, 0.85)) == 0
+    assert other.record(snapshot(1, 0.86)) == 3
+
+    points = store.history('EUR', datetime.fromtimestamp(START - DAY, timezone.utc),
+                           datetime.fromtimestamp(START + 2 * DAY, timezone.utc))
+    assert [rate for _, rate in points] == [0.85, 0.86]
+
+
+def test_snapshots_regroup_currencies_by_timestamp(store):
+    for day, eur in enumerate([0.85, 0.86, 0.87]):
+        store.record(snapshot(day, eur))
+
+    snapshots = list(store.snapshots(datetime.fromtimestamp(START + DAY, timezone.utc),
+                                     datetime.fromtimestamp(START + 3 * DAY, timezone.utc)))
+    assert [s.updated_at for s in snapshots] == [START + DAY, START + 2 * DAY]
+    assert snapshots[0].rates == {'USD': 1.0, 'EUR': 0.86, 'GBP': 0.73}
+
+
+def test_compound_index(store):
+    keys = [index['key'] for index in store.collection.index_information().values()]
+    assert [('currency', 1), ('timestamp', 1)] in keys
+
+
+def test_history_range_query(store):
+    for day, eur in enumerate([0.85, 0.86, 0.87, 0.88]):
+        store.record(snapshot(day, eur))
+
+    points = store.history('EUR', datetime.fromtimestamp(START + DAY, timezone.utc),
+                           datetime.fromtimestamp(START + 2 * DAY, timezone.utc))
+    assert [rate for _, rate in points] == [0.86, 0.87]
+    assert points[0][0] == datetime.fromtimestamp(START + DAY, timezone.utc)
+
+
+def test_history_endpoint(client, store):
+    for day, eur in enumerate([0.85, 0.86, 0.87]):
+        store.record(snapshot(day, eur))
+
+    with patch.object(backend, 'history_store', store):
+        response = client.get(f'/rates/history?currency=eur&from={START}&to=2023-11-16')
+
+    assert response.status_code == 200
+    data = response.get_json()
+    assert [point['rate'] for point in data['points']] == [0.85, 0.86]
+    assert data['points'][0]['timestamp'] == '2023-11-14T22:13:20+00:00'
+
+
+def test_history_endpoint_validation(client, store):
+    with patch.object(backend, 'history_store', store):
+        assert client.get('/rates/history').status_code == 400
+        assert client.get('/rates/history?currency=EUR&from=yesterday').status_code == 400
+        assert client.get('/rates/history?currency=EUR&from=2024-02-01&to=2024-01-01'
+                          ).status_code == 400
+
+
+def test_history_endpoint_without_store(client):
+    assert client.get('/rates/history?currency=EUR').status_code == 503
+
+
+def test_fetched_snapshots_are_archived(client):
+    mock_response = Mock()
+    mock_response.json.return_value = {'result': 'success', 'conversion_rates': {'EUR': 0.85}}
+    mock_response.raise_for_status = Mock()
+    recorded = []
+
+    with patch('requests.Session.get', return_value=mock_response), \
+            patch.object(backend, 'history_store', Mock(record=recorded.append)):
+        client.get('/rates')
+        client.get('/rates')
+        backend.archive_executor.submit(lambda: None).result()
+
+    assert len(recorded) == 1
@@ -0,0 +1,88 @@
+import gzip
+import json
+from unittest.mock import patch, Mock
+
+import pytest
+
+from encoded_body import brotli
+
+
+@pytest.fixture
+def upstream():
+    mock_response = Mock()
+    mock_response.json.return_value = {
+        'result': 'success',
+        'time_last_update_unix': 1700000000,
+        'conversion_rates': {'USD': 1, 'EUR': 0.85}
+    }
+    mock_response.raise_for_status = Mock()
+    with patch('requests.Session.get', return_value=mock_response) as mock_get:
+        yield mock_get
+
+
+def test_rates_emits_validators(client, upstream):
+    response = client.get('/rates')
+
+    assert response.headers['ETag'] == '"USD-1-1700000000"'
+    assert response.headers['Last-Modified'] == 'Tue, 14 Nov 2023 22:13:20 GMT'
+    assert response.headers['Cache-Control'].startswith('public, max-age=')
+
+
+def test_if_none_match_returns_304(client, upstream):
+    etag = client.get('/rates').headers['ETag']
+
+    with patch('rates_cache.EncodedBody') as encode:
+        response = client.get('/rates', headers={'If-None-Match': etag})
+        assert encode.call_count == 0
+
+    assert response.status_code == 304
+    assert response.data == b''
+    assert response.headers['ETag'] == etag
+
+
+def test_changed_etag_returns_full_body(client, upstream):
+    response = client.get('/rates', headers={'If-None-Match': '"USD-0-0"'})
+    assert response.status_code == 200
+    assert response.get_json()['conversion_rates']['EUR'] == 0.85
+
+
+def test_if_modified_since(client, upstream):
+    response = client.get('/rates', headers={
+        'If-Modified-Since': 'Tue, 14 Nov 2023 22:13:20 GMT'})
+    assert response.status_code == 304
+
+    response = client.get('/rates', headers={
+        'If-Modified-Since': 'Mon, 13 Nov 2023 00:00:00 GMT'})
+    assert response.status_code == 200
+
+
+def test_bodies_encoded_once_per_snapshot(client, upstream):
+    client.get('/rates')
+    with patch('rates_cache.EncodedBody') as encode:
+        for _ in range(3):
+            client.get('/rates', headers={'Accept-Encoding': 'gzip'})
+        assert encode.call_count == 0
+
+
+def test_gzip_negotiated(client, upstream):
+    response = client.get('/rates', headers={'Accept-Encoding': 'gzip'})
+
+    assert response.headers['Content-Encoding'] == 'gzip'
+    assert response.headers['Vary'] == 'Accept-Encoding'
+    assert response.headers['ETag'] == '"USD-1-1700000000-gzip"'
+    data = json.loads(gzip.decompress(response.data))
+    assert data['conversion_rates']['EUR'] == 0.85
+
+
+@pytest.mark.skipif(brotli is None, reason="brotli non installé")
+def test_brotli_preferred_when_accepted(client, upstream):
+    response = client.get('/rates', headers={'Accept-Encoding': 'gzip, br'})
+
+    assert response.headers['Content-Encoding'] == 'br'
+    assert json.loads(brotli.decompress(response.data))['status'] == 'success'
+
+
+def test_identity_without_accept_encoding(client, upstream):
+    response = client.get('/rates')
+    assert 'Content-Encoding' not in response.headers
+    assert response.get_json()['stale'] is False
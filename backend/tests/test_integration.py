@@ -18,7 +18,7 @@ def test_fetch_conversion_rates(client):
     }
     mock_response.raise_for_status = Mock()
 
-    with patch('requests.get', return_value=mock_response):
+    with patch('requests.Session.get', return_value=mock_response):
         response = client.get('/rates')
         assert response.status_code == 200
         data = response.get_json()
@@ -35,7 +35,7 @@ def test_integration_currency_conversion(client):
     }
     mock_response.raise_for_status = Mock()
 
-    with patch('requests.get', return_value=mock_response):
+    with patch('requests.Session.get', return_value=mock_response):
         response = client.get('/rates')
         data = response.get_json()
 
@@ -50,6 +50,6 @@ def test_integration_currency_conversion(client):
 
 
 def test_backend_handles_api_failure(client):
-    with patch('requests.get', side_effect=Exception("API Failure")):
+    with patch('requests.Session.get', side_effect=Exception("API Failure")):
         response = client.get('/rates')
         assert response.status_code == 500 or b"error" in response.data
@@ -0,0 +1,117 @@
+import os
+import subprocess
+import sys
+from unittest.mock import patch, Mock
+
+import requests
+from prometheus_client import REGISTRY
+
+import app as backend
+from metrics import QuotaCollector, count_hedge
+from quota import QuotaManager
+from upstream import UpstreamClient
+
+BACKEND = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+
+
+def upstream_ok():
+    response = Mock(status_code=200)
+    response.json.return_value = {'result': 'success', 'conversion_rates': {'USD': 1, 'EUR': 0.9}}
+    return patch('requests.Session.get', return_value=response)
+
+
+def sample(name, **labels):
+    return REGISTRY.get_sample_value(name, labels) or 0
+
+
+def test_metrics_endpoint_exposes_route_latency(client):
+    before = sample('http_requests_total', route='/rates', method='GET', status='200')
+    with upstream_ok():
+        client.get('/rates')
+
+    response = client.get('/metrics')
+    assert response.status_code == 200
+    assert response.headers['Content-Type'].startswith('text/plain')
+    text = response.data.decode()
+    assert 'http_request_duration_seconds_bucket{le="0.001",method="GET",route="/rates"}' in text
+    assert 'rates_snapshot_age_seconds{base="USD"}' in text
+    assert sample('http_requests_total', route='/rates', method='GET', status='200') == before + 1
+
+
+def test_cache_hits_and_misses_are_counted(client):
+    miss, hit = sample('rates_cache_lookups_total', outcome='miss'), \
+        sample('rates_cache_lookups_total', outcome='hit')
+    with upstream_ok():
+        client.get('/convert?from=USD&to=EUR')
+        client.get('/convert?from=USD&to=EUR')
+
+    hits = sample('rates_cache_lookups_total', outcome='hit') - hit
+    misses = sample('rates_cache_lookups_total', outcome='miss') - miss
+    # Sous ASGI le fetch a lieu avant la vue : ses deux lectures sont des hits
+    assert (hits, misses) in ((1, 1), (2, 0))
+
+
+def test_upstream_latency_and_errors(client):
+    errors = sample('upstream_errors_total', reason='timeout')
+    successes = sample('upstream_request_duration_seconds_count', outcome='success')
+    with patch('requests.Session.get', side_effect=requests.Timeout), \
+            patch.object(backend.upstream, '_sleep', lambda delay: None):
+        assert client.get('/rates').status_code == 500
+    assert sample('upstream_errors_total', reason='timeout') == errors + 1
+
+    backend.rates_cache.clear()
+    with upstream_ok():
+        client.get('/rates')
+    assert sample('upstream_request_duration_seconds_count', outcome='success') == successes + 1
+
+
+def test_health_never_calls_upstream(client):
+    with patch('requests.Session.get') as upstream:
+        response = client.get('/health')
+    assert response.status_code == 200
+    assert response.get_json() == {'status': 'ok', 'rates': {}}
+    upstream.assert_not_called()
+
+    with upstream_ok():
+        client.get('/rates')
+    rates = client.get('/health').get_json()['rates']['USD']
+    assert rates['servable'] is True
+    assert rates['version'] == 1
+
+
+WORKER = """
+from metrics import REQUESTS
+for _ in range({count}):
+    REQUESTS.labels(route='/rates', method='GET', status='200').inc()
+"""
+
+
+def test_multiprocess_values_are_aggregated(tmp_path, monkeypatch):
+    env = dict(os.environ, PROMETHEUS_MULTIPROC_DIR=str(tmp_path))
+    for count in (3, 4):
+        subprocess.run([sys.executable, '-c', WORKER.format(count=count)],
+                       cwd=BACKEND, env=env, check=True)
+
+    monkeypatch.setenv('PROMETHEUS_MULTIPROC_DIR', str(tmp_path))
+    registry = backend.metrics.registry()
+    assert registry.get_sample_value(
+        'http_requests_total', {'route': '/rates', 'method': 'GET', 'status': '200'}) == 7
+
+
+def test_hedges_are_counted(fake_api):
+    fake_api.script = [(200, 1.0), (200, 0)]
+    before = sample('upstream_hedges_total', outcome='won')
+    client = UpstreamClient(f'http://127.0.0.1:{fake_api.server_port}/v6', 'key',
+                            hedge_percentile=95, on_hedge=count_hedge)
+    for _ in range(client.latencies.min_samples):
+        client.latencies.record(0.01)
+
+    client.fetch_latest('USD')
+    assert sample('upstream_hedges_total', outcome='won') == before + 1
+
+
+def test_quota_remaining_is_exposed(tmp_path):
+    quota = QuotaManager(str(tmp_path / 'quota.bin'), 1500)
+    quota.acquire()
+    metrics = {metric.name: metric.samples[0].value for metric in QuotaCollector(quota).collect()}
+    assert metrics == {'upstream_quota_remaining': 1499, 'upstream_quota_budget': 1500}
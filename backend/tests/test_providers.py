@@ -0,0 +1,107 @@
+import time
+
+import pytest
+
+import app as backend
+from fake_exchange_api import FakeApiConfig, FakeExchangeApi
+from providers import (ExchangeRateApi, Frankfurter, OpenErApi, ProviderAggregator,
+                       parse_providers, weighted_median)
+from upstream import UpstreamClient, UpstreamError
+
+
+def stub_provider(cls, server, weight=1.0):
+    """Fournisseur réel branché sur le faux serveur, au format de son API"""
+    url = server.url if cls is not Frankfurter else server.origin
+    key = 'key' if cls is ExchangeRateApi else None
+    return cls(UpstreamClient(url, key, retries=0), weight)
+
+
+@pytest.fixture
+def servers():
+    configs = [FakeApiConfig(currencies=20), FakeApiConfig(currencies=20),
+               FakeApiConfig(currencies=20)]
+    with FakeExchangeApi(configs[0]) as a, FakeExchangeApi(configs[1]) as b, \
+            FakeExchangeApi(configs[2]) as c:
+        yield a, b, c
+
+
+@pytest.mark.parametrize('cls', [ExchangeRateApi, OpenErApi, Frankfurter])
+def test_each_provider_parses_its_stub(cls, servers):
+    payload = stub_provider(cls, servers[0]).fetch('EUR')
+
+    assert payload['conversion_rates']['EUR'] == 1.0
+    assert len(payload['conversion_rates']) == 20
+    assert payload['time_last_update_unix'] > 0
+
+
+def test_weighted_median():
+    assert weighted_median([1.0, 2.0, 100.0], [1, 1, 1]) == 2.0
+    assert weighted_median([1.0, 2.0], [1, 1]) == 1.5
+    assert weighted_median([1.0, 2.0, 3.0], [1, 1, 3]) == 3.0
+
+
+def test_parse_providers():
+    assert parse_providers('exchangerate-api:2, frankfurter') == [
+        ('exchangerate-api', 2.0), ('frankfurter', 1.0)]
+    with pytest.raises(ValueError):
+        parse_providers('nope')
+
+
+def test_consensus_ignores_an_outlier(servers):
+    servers[2].config.skew = 10
+    aggregator = ProviderAggregator([stub_provider(ExchangeRateApi, servers[0]),
+                                     stub_provider(OpenErApi, servers[1]),
+                                     stub_provider(Frankfurter, servers[2])])
+    honest = stub_provider(ExchangeRateApi, servers[0]).fetch('USD')['conversion_rates']
+
+    payload = aggregator.fetch('USD')
+
+    assert payload['base_code'] == 'USD'
+    assert payload['conversion_rates'] == pytest.approx(honest)
+
+
+def test_refresh_waits_only_for_the_quorum(servers):
+    servers[2].config.latency = 2
+    aggregator = ProviderAggregator(
+        [stub_provider(cls, server) for cls, server in
+         zip((ExchangeRateApi, OpenErApi, Frankfurter), servers)], quorum=2)
+
+    started = time.monotonic()
+    payload = aggregator.fetch('USD')
+
+    assert time.monotonic() - started < 1
+    assert payload['conversion_rates']['EUR'] > 0
+
+
+def test_deadline_bounds_a_slow_quorum(servers):
+    servers[1].config.latency = 2
+    aggregator = ProviderAggregator([stub_provider(ExchangeRateApi, servers[0]),
+                                     stub_provider(OpenErApi, servers[1])], timeout=0.3)
+
+    started = time.monotonic()
+    payload = aggregator.fetch('USD')
+
+    assert time.monotonic() - started < 1
+    assert payload['conversion_rates']['USD'] == 1.0
+
+
+def test_all_providers_failing_raises_upstream_error(servers):
+    for server in servers[:2]:
+        server.config.error_rate = 1
+    aggregator = ProviderAggregator([stub_provider(ExchangeRateApi, servers[0]),
+                                     stub_provider(OpenErApi, servers[1])])
+
+    with pytest.raises(UpstreamError) as raised:
+        aggregator.fetch('USD')
+    assert raised.value.status == 503
+
+
+def test_app_serves_the_consensus(client, servers, monkeypatch):
+    monkeypatch.setattr(backend, 'rate_providers', ProviderAggregator(
+        [stub_provider(cls, server) for cls, server in
+         zip((ExchangeRateApi, OpenErApi, Frankfurter), servers)]))
+
+    response = client.get('/rates')
+
+    assert response.status_code == 200
+    assert len(response.get_json()['conversion_rates']) == 20
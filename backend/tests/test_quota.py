@@ -0,0 +1,145 @@
+import os
+import subprocess
+import sys
+
+import pytest
+
+import app as backend
+from quota import QuotaExceeded, QuotaManager, month_window
+from refresher import RatesRefresher
+from upstream import UpstreamClient, UpstreamError, retry_after_seconds
+
+BACKEND = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+# 1er juin 2024, 00:00 UTC : 30 jours restants
+JUNE = 1717200000.0
+
+
+class Clock:
+    def __init__(self, now=JUNE):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+def make_quota(tmp_path, budget=30, burst=2, clock=None):
+    return QuotaManager(str(tmp_path / 'quota.bin'), budget, burst=burst, clock=clock or Clock())
+
+
+def test_month_window():
+    assert month_window(JUNE) == (202406, 30 * 86400)
+
+
+def test_bucket_paces_calls_over_the_month(tmp_path):
+    clock = Clock()
+    quota = make_quota(tmp_path, budget=30, burst=2, clock=clock)
+
+    quota.acquire()
+    quota.acquire()
+    with pytest.raises(QuotaExceeded) as refused:
+        quota.acquire()
+    # 28 appels restants sur 30 jours : un jeton toutes les ~25 heures
+    assert refused.value.retry_after == pytest.approx(30 * 86400 / 28)
+
+    clock.now += refused.value.retry_after
+    quota.acquire()
+    assert quota.remaining() == 27
+
+
+def test_budget_exhausted_until_next_month(tmp_path):
+    clock = Clock()
+    quota = make_quota(tmp_path, budget=1, burst=5, clock=clock)
+    quota.acquire()
+    with pytest.raises(QuotaExceeded, match='exhausted'):
+        quota.acquire()
+
+    clock.now += 30 * 86400
+    quota.acquire()
+
+
+def test_state_is_shared_across_processes(tmp_path):
+    quota = make_quota(tmp_path, budget=100, burst=10)
+    script = ('import sys; from quota import QuotaManager; '
+              f'q = QuotaManager(sys.argv[1], 100, burst=10, clock=lambda: {JUNE}); '
+              '[q.acquire() for _ in range(3)]')
+    for _ in range(2):
+        subprocess.run([sys.executable, '-c', script, quota.path], cwd=BACKEND, check=True)
+
+    assert quota.remaining() == 94
+
+
+def test_429_blocks_calls_until_retry_after(tmp_path):
+    clock = Clock()
+    quota = make_quota(tmp_path, budget=10 ** 6, clock=clock)
+    quota.block(120)
+
+    with pytest.raises(QuotaExceeded) as refused:
+        quota.acquire()
+    assert refused.value.retry_after == 120
+    assert quota.refresh_interval(60) == 120
+    clock.now += 121
+    quota.acquire()
+
+
+def test_refresh_interval_stretches_to_the_budget(tmp_path):
+    quota = make_quota(tmp_path, budget=30 * 24)  # une fois par heure sur juin
+    assert quota.refresh_interval(600) == pytest.approx(3600)
+    assert quota.refresh_interval(7200) == 7200
+    assert quota.refresh_interval(600, calls=2) == pytest.approx(7200)
+
+
+def test_refresher_uses_the_pace():
+    refresher = RatesRefresher(lambda base: None, interval=60, jitter=0,
+                               pace=lambda interval, calls: interval * 10)
+    assert refresher.run_once() == 600
+
+
+def test_client_reserves_quota_and_honours_429(fake_api, tmp_path):
+    clock = Clock()
+    quota = make_quota(tmp_path, budget=10, burst=10, clock=clock)
+    client = UpstreamClient(f'http://127.0.0.1:{fake_api.server_port}/v6', 'key',
+                            quota=quota, sleep=lambda delay: None)
+
+    client.fetch_latest('USD')
+    assert quota.remaining() == 9
+
+    fake_api.script = [(429, 0)]
+    with pytest.raises(UpstreamError):
+        client.fetch_latest('USD')
+    # 429 sans Retry-After : suspension par défaut, plus aucune requête
+    with pytest.raises(QuotaExceeded):
+        client.fetch_latest('USD')
+    assert len(fake_api.paths) == 2
+
+
+def test_retry_after_header_formats():
+    assert retry_after_seconds('30') == 30
+    assert retry_after_seconds('Sat, 01 Jun 2024 00:01:00 GMT', now=JUNE) == 60
+    assert retry_after_seconds('soon') is None
+
+
+@pytest.fixture
+def exhausted_quota(tmp_path, monkeypatch):
+    quota = make_quota(tmp_path, budget=1, clock=Clock())
+    quota.acquire()
+    monkeypatch.setattr(backend.upstream, 'quota', quota)
+    return quota
+
+
+def test_quota_refusals_do_not_open_the_circuit(client, exhausted_quota):
+    for _ in range(backend.upstream_breaker.failure_threshold + 1):
+        response = client.get('/rates')
+        assert response.status_code == 503
+        assert 'quota' in response.get_json()['error']
+    assert backend.upstream_breaker.state == 'closed'
+
+
+@pytest.mark.parametrize('method, path, body', [
+    ('get', '/convert?from=USD&to=EUR&amount=1', None),
+    ('post', '/convert/batch', {'amounts': [1], 'from': 'USD', 'to': 'EUR'}),
+])
+def test_conversions_answer_503_when_the_quota_refuses(client, exhausted_quota,
+                                                       method, path, body):
+    headers = {'X-CSRF-Token': 'default_csrf_token'}
+    response = getattr(client, method)(path, json=body, headers=headers)
+    assert response.status_code == 503
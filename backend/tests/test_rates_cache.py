@@ -0,0 +1,218 @@
+import threading
+import time
+from unittest.mock import patch, Mock
+
+import pytest
+
+from app import rates_cache
+from rates_cache import RatesCache, RatesUnavailable
+
+
+class FakeClock:
+    def __init__(self, now=1000.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+def payload(eur=0.85):
+    return {'result': 'success', 'conversion_rates': {'USD': 1, 'EUR': eur}}
+
+
+def test_cache_hit_does_not_refetch():
+    """Un snapshot frais est servi sans rappeler l'upstream"""
+    fetch = Mock(return_value=payload())
+    cache = RatesCache(fetch, soft_ttl=60, clock=FakeClock())
+
+    assert cache.get('USD').rates['EUR'] == 0.85
+    assert cache.get('USD').rates['EUR'] == 0.85
+    assert fetch.call_count == 1
+
+
+def test_cache_refetches_after_ttl():
+    clock = FakeClock()
+    fetch = Mock(side_effect=[payload(0.85), payload(0.90)])
+    cache = RatesCache(fetch, soft_ttl=60, clock=clock)
+
+    cache.get('USD')
+    clock.now += 61
+    assert cache.get('USD').rates['EUR'] == 0.90
+    assert fetch.call_count == 2
+
+
+def test_cache_keeps_one_snapshot_per_base():
+    fetch = Mock(side_effect=lambda base: payload(0.85 if base == 'USD' else 1.0))
+    cache = RatesCache(fetch, soft_ttl=60, clock=FakeClock())
+
+    assert cache.get('USD').rates['EUR'] == 0.85
+    assert cache.get('EUR').rates['EUR'] == 1.0
+    assert cache.get('USD').base == 'USD'
+    assert fetch.call_count == 2
+
+
+def test_single_flight_under_concurrency():
+    """Un seul appel upstream quand plusieurs threads trouvent le cache vide"""
+    calls = []
+
+    def slow_fetch(base):
+        calls.append(base)
+        time.sleep(0.05)
+        return payload()
+
+    cache = RatesCache(slow_fetch, soft_ttl=60)
+    threads = [threading.Thread(target=cache.get, args=('USD',)) for _ in range(16)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert calls == ['USD']
+
+
+def test_rates_endpoint_served_from_cache(client):
+    mock_response = Mock()
+    mock_response.json.return_value = payload()
+    mock_response.raise_for_status = Mock()
+
+    with patch('requests.Session.get', return_value=mock_response) as mock_get:
+        client.get('/rates')
+        response = client.get('/rates')
+
+        assert response.get_json()['conversion_rates']['EUR'] == 0.85
+        assert mock_get.call_count == 1
+
+
+def test_single_flight_shares_upstream_failure():
+    """Un échec upstream est partagé avec les threads en attente"""
+    calls = []
+    errors = []
+
+    def failing_fetch(base):
+        calls.append(base)
+        time.sleep(0.05)
+        raise Exception("upstream down")
+
+    def read():
+        try:
+            cache.get('USD')
+        except Exception as error:
+            errors.append(error)
+
+    cache = RatesCache(failing_fetch, soft_ttl=60)
+    threads = [threading.Thread(target=read) for _ in range(16)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert calls == ['USD']
+    assert len(errors) == 16
+
+
+def test_failure_is_retried_after_error_ttl():
+    clock = FakeClock()
+    fetch = Mock(side_effect=[Exception("upstream down"), payload()])
+    cache = RatesCache(fetch, soft_ttl=60, error_ttl=5, clock=clock)
+
+    for _ in range(3):
+        try:
+            cache.get('USD')
+        except Exception:
+            pass
+    assert fetch.call_count == 1
+
+    clock.now += 6
+    assert cache.get('USD').rates['EUR'] == 0.85
+
+
+def test_stale_snapshot_served_while_revalidating():
+    """Entre soft et hard TTL, l'ancien snapshot est servi et rafraîchi en fond"""
+    clock = FakeClock()
+    background = []
+    fetch = Mock(side_effect=[payload(0.85), payload(0.90)])
+    cache = RatesCache(fetch, soft_ttl=60, hard_ttl=600, clock=clock,
+                       spawn=background.append)
+
+    cache.get('USD')
+    clock.now += 120
+    snapshot, stale = cache.lookup('USD')
+    assert snapshot.rates['EUR'] == 0.85
+    assert stale is True
+
+    # Un seul rafraîchissement en vol malgré plusieurs lectures stale
+    cache.get('USD')
+    assert len(background) == 1
+
+    background[0]()
+    fresh, stale = cache.lookup('USD')
+    assert fresh.rates['EUR'] == 0.90
+    assert stale is False
+
+
+def test_failing_revalidation_is_backed_off():
+    """Pendant une panne, les lectures stale ne relancent pas l'upstream à chaque fois"""
+    clock = FakeClock()
+    fetch = Mock(side_effect=[payload(0.85)] + [Exception("upstream down")] * 10)
+    cache = RatesCache(fetch, soft_ttl=60, hard_ttl=600, revalidate_backoff=30,
+                       clock=clock, spawn=lambda run: run())
+
+    cache.get('USD')
+    clock.now += 120
+    for _ in range(20):
+        assert cache.get('USD').rates['EUR'] == 0.85
+    assert fetch.call_count == 2
+
+    clock.now += 31
+    for _ in range(20):
+        cache.get('USD')
+    assert fetch.call_count == 3
+
+
+def test_hard_ttl_blocks_on_upstream():
+    clock = FakeClock()
+    fetch = Mock(side_effect=[payload(0.85), payload(0.90)])
+    cache = RatesCache(fetch, soft_ttl=60, hard_ttl=600, clock=clock,
+                       spawn=lambda run: run())
+
+    cache.get('USD')
+    clock.now += 601
+    assert cache.lookup('USD') == (cache.get('USD'), False)
+    assert cache.get('USD').rates['EUR'] == 0.90
+
+
+def test_hard_ttl_below_soft_ttl_is_rejected():
+    with pytest.raises(ValueError):
+        RatesCache(Mock(), soft_ttl=600, hard_ttl=60)
+
+
+def test_rates_endpoint_marks_stale_snapshot(client):
+    mock_response = Mock()
+    mock_response.json.return_value = payload()
+    mock_response.raise_for_status = Mock()
+
+    with patch('requests.Session.get', return_value=mock_response):
+        assert client.get('/rates').get_json()['stale'] is False
+
+        with patch.object(rates_cache, 'soft_ttl', 0), \
+                patch.object(rates_cache, '_spawn', lambda run: run()):
+            assert client.get('/rates').get_json()['stale'] is True
+
+
+def test_cached_serves_past_hard_ttl_while_the_quota_defers_refreshes():
+    clock = FakeClock()
+    deferral = [0]
+    cache = RatesCache(Mock(return_value=payload()), soft_ttl=60, hard_ttl=120,
+                       deferral=lambda: deferral[0], clock=clock)
+    cache.refresh('USD')
+
+    clock.now += 200
+    with pytest.raises(RatesUnavailable, match='hard TTL'):
+        cache.cached('USD')
+
+    deferral[0] = 100
+    snapshot, stale = cache.cached('USD')
+    assert stale and snapshot.rates['EUR'] == 0.85
+    clock.now += 30
+    with pytest.raises(RatesUnavailable, match='hard TTL'):
+        cache.cached('USD')
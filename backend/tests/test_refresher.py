@@ -0,0 +1,67 @@
+from unittest.mock import patch, Mock, PropertyMock
+
+import pytest
+
+from app import rates_cache, rates_refresher
+from rates_cache import RatesSnapshot
+from refresher import HostLock, RatesRefresher
+
+
+def test_leader_refreshes_every_base():
+    refresh = Mock()
+    refresher = RatesRefresher(refresh, bases=('USD', 'EUR'), interval=300, jitter=0)
+
+    assert refresher.run_once() == 300
+    assert [call.args[0] for call in refresh.call_args_list] == ['USD', 'EUR']
+
+
+def test_interval_is_jittered():
+    refresher = RatesRefresher(Mock(), interval=100, jitter=0.1, rand=lambda: 1.0)
+    assert refresher.run_once() == pytest.approx(110)
+
+
+def test_failures_back_off_exponentially_up_to_cap():
+    refresh = Mock(side_effect=Exception("upstream down"))
+    refresher = RatesRefresher(refresh, interval=300, jitter=0, retry_base=5,
+                               max_backoff=30)
+
+    assert [refresher.run_once() for _ in range(5)] == [5, 10, 20, 30, 30]
+
+    refresh.side_effect = None
+    assert refresher.run_once() == 300
+    assert refresher.failures == 0
+
+
+def test_only_one_refresher_per_host(tmp_path):
+    """Seul le détenteur du verrou appelle l'upstream, l'autre suit"""
+    path = str(tmp_path / 'refresher.lock')
+    leader_refresh, follower_refresh, follow = Mock(), Mock(), Mock()
+    leader = RatesRefresher(leader_refresh, lock=HostLock(path), jitter=0)
+    follower = RatesRefresher(follower_refresh, follow=follow,
+                              lock=HostLock(path), jitter=0)
+
+    leader.run_once()
+    follower.run_once()
+    assert leader_refresh.call_count == 1
+    assert follower_refresh.call_count == 0
+    assert follow.call_count == 1
+
+    # Le follower reprend la main quand le leader s'arrête
+    leader.stop()
+    follower.run_once()
+    assert follower_refresh.call_count == 1
+    follower.stop()
+
+
+def test_rates_endpoint_reads_memory_only_when_refresher_runs(client):
+    with patch.object(type(rates_refresher), 'running',
+                      new_callable=PropertyMock, return_value=True), \
+            patch('requests.Session.get') as mock_get:
+        response = client.get('/rates')
+        assert response.status_code == 503
+
+        rates_cache.publish(RatesSnapshot('USD', {'EUR': 0.85}, rates_cache._clock()))
+        response = client.get('/rates')
+        assert response.status_code == 200
+        assert response.get_json()['conversion_rates']['EUR'] == 0.85
+        assert mock_get.call_count == 0
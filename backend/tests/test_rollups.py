@@ -0,0 +1,121 @@
+from datetime import datetime, timezone
+from unittest.mock import Mock, patch
+
+import pytest
+
+import app as backend
+from rates_cache import RatesSnapshot
+from rollups import RollupStore, bucket_start
+
+HOUR = 3600
+MONDAY_2024_01_01 = 1704067200
+
+
+def snapshot(hours, eur, gbp=0.8):
+    when = MONDAY_2024_01_01 + hours * HOUR
+    return RatesSnapshot('USD', {'USD': 1.0, 'EUR': eur, 'GBP': gbp}, when, when)
+
+
+def utc(*args):
+    return datetime(*args, tzinfo=timezone.utc)
+
+
+def test_bucket_start():
+    when = utc(2024, 3, 14, 15, 30)
+    assert bucket_start(when, 'day') == utc(2024, 3, 14)
+    assert bucket_start(when, 'week') == utc(2024, 3, 11)
+    assert bucket_start(when, 'month') == utc(2024, 3, 1)
+
+
+def test_daily_ohlc_and_mean():
+    store = RollupStore()
+    for hours, eur in [(1, 0.90), (2, 0.95), (3, 0.85), (4, 0.92), (25, 0.80)]:
+        store.record(snapshot(hours, eur))
+
+    buckets = store.aggregate('USD', 'EUR', 'day', utc(2024, 1, 1), utc(2024, 1, 31))
+    assert [start for start, _ in buckets] == [utc(2024, 1, 1), utc(2024, 1, 2)]
+    first = buckets[0][1]
+    assert (first['open'], first['close'], first['min'], first['max']) == (0.90, 0.92, 0.85, 0.95)
+    assert first['mean'] == pytest.approx(0.905)
+    assert first['count'] == 4
+
+    weekly = store.aggregate('USD', 'EUR', 'week', utc(2024, 1, 1), utc(2024, 1, 31))
+    assert len(weekly) == 1 and weekly[0][1]['count'] == 5
+
+
+def test_same_upstream_snapshot_counted_once():
+    store = RollupStore()
+    assert store.record(snapshot(1, 0.9)) is True
+    assert store.record(snapshot(1, 0.9)) is False
+    assert store.aggregate('USD', 'EUR', 'month', utc(2024, 1, 1), utc(2024, 2, 1))[0][1]['count'] == 1
+
+
+def test_cross_pairs():
+    store = RollupStore(cross_pairs=[('EUR', 'GBP')])
+    store.record(snapshot(1, 0.8, 0.4))
+    store.record(snapshot(2, 0.8, 0.6))
+
+    (_, values), = store.aggregate('EUR', 'GBP', 'day', utc(2024, 1, 1), utc(2024, 1, 2))
+    assert (values['open'], values['close']) == pytest.approx((0.5, 0.75))
+    assert store.tracks('EUR', 'GBP') and not store.tracks('GBP', 'EUR')
+
+
+def test_range_query_only_reads_buckets_in_range():
+    store = RollupStore()
+    for day in range(60):
+        store.record(snapshot(day * 24 + 1, 0.9))
+
+    buckets = store.aggregate('USD', 'EUR', 'day', utc(2024, 1, 10, 12), utc(2024, 1, 12))
+    assert [start.day for start, _ in buckets] == [10, 11, 12]
+
+
+def test_aggregate_endpoint(client):
+    store = RollupStore()
+    store.record(snapshot(1, 0.9))
+    store.record(snapshot(2, 0.8))
+
+    with patch.object(backend, 'rollups', store):
+        response = client.get('/rates/aggregate?to=eur&period=day'
+                              '&start=2024-01-01&end=2024-01-02')
+        assert client.get('/rates/aggregate?to=EUR&period=year').status_code == 400
+        assert client.get('/rates/aggregate?from=EUR&to=GBP').status_code == 400
+
+    data = response.get_json()
+    assert data['buckets'] == [{'start': '2024-01-01T00:00:00+00:00', 'open': 0.9,
+                                'close': 0.8, 'min': 0.8, 'max': 0.9,
+                                'mean': pytest.approx(0.85), 'count': 2}]
+
+
+def test_published_snapshots_feed_rollups():
+    store = RollupStore()
+    with patch.object(backend, 'rollups', store):
+        backend.rates_cache.publish(snapshot(1, 0.9))
+    assert store.tracks('USD', 'EUR')
+
+
+def test_rebuild_replaces_aggregates():
+    store = RollupStore()
+    store.record(snapshot(50, 0.70))
+    assert store.rebuild([snapshot(1, 0.90), snapshot(2, 0.95), snapshot(2, 0.95)]) == 2
+
+    buckets = store.aggregate('USD', 'EUR', 'day', utc(2024, 1, 1), utc(2024, 1, 31))
+    assert [(start, rollup['count']) for start, rollup in buckets] == [(utc(2024, 1, 1), 2)]
+
+
+def test_workers_rebuild_rollups_from_history(client):
+    # Nouveau worker (ou worker recyclé) : agrégats relus de l'historique,
+    # plus le snapshot servi pas encore archivé
+    history = Mock()
+    history.snapshots.return_value = [snapshot(1, 0.90), snapshot(2, 0.95)]
+    store = RollupStore()
+    with patch.object(backend, 'rollups', store), \
+            patch.object(backend, 'history_store', history), \
+            patch.object(backend, '_rollups_backfilled', False), \
+            patch.object(backend.rates_cache, 'latest', return_value=snapshot(3, 0.85)):
+        response = client.get('/rates/aggregate?to=EUR&period=day'
+                              '&start=2024-01-01&end=2024-01-02')
+        client.get('/rates/aggregate?to=EUR&period=day')
+
+    history.snapshots.assert_called_once()
+    rollup, = response.get_json()['buckets']
+    assert (rollup['open'], rollup['close'], rollup['count']) == (0.90, 0.85, 3)
@@ -12,7 +12,7 @@ def test_api_key_not_exposed_in_response(client):
     }
     mock_response.raise_for_status = Mock()
     
-    with patch('requests.get', return_value=mock_response):
+    with patch('requests.Session.get', return_value=mock_response):
         response = client.get('/rates')
         data_str = str(response.get_data())
         
@@ -28,11 +28,22 @@ def test_cors_configured_properly(client):
     mock_response.json.return_value = {'result': 'success', 'conversion_rates': {}}
     mock_response.raise_for_status = Mock()
     
-    with patch('requests.get', return_value=mock_response):
+    with patch('requests.Session.get', return_value=mock_response):
         response = client.get('/rates', headers={'Origin': 'http://localhost:5173'})
         assert 'Access-Control-Allow-Origin' in response.headers
 
 
+def test_cors_covers_derived_rate_tables(client):
+    mock_response = Mock()
+    mock_response.json.return_value = {'result': 'success',
+                                       'conversion_rates': {'USD': 1, 'EUR': 0.85}}
+    mock_response.raise_for_status = Mock()
+
+    with patch('requests.Session.get', return_value=mock_response):
+        response = client.get('/rates/EUR', headers={'Origin': 'http://localhost:5173'})
+    assert response.headers['Access-Control-Allow-Origin'] == 'http://localhost:5173'
+
+
 def test_no_debug_mode_in_production(app):
     """Test que le mode debug n'est pas activé en production"""
     assert app.debug is False
@@ -0,0 +1,70 @@
+from app import rates_cache
+from rates_cache import RatesSnapshot
+from snapshot_store import SharedSnapshot, SharedSnapshotStore, SEQUENCE
+
+
+def test_shared_snapshot_round_trip(tmp_path):
+    path = str(tmp_path / 'rates-USD.shm')
+    writer, reader = SharedSnapshot(path), SharedSnapshot(path)
+    assert reader.load('USD') is None
+
+    snapshot = RatesSnapshot('USD', {'USD': 1.0, 'EUR': 0.85, 'MAD': 10.0}, 1000.5, 999, 7)
+    writer.publish(snapshot)
+    assert reader.load('USD') == snapshot
+    # Version inchangée : rien à recharger
+    assert reader.load('USD') is None
+
+
+def test_reader_reloads_when_sequence_changes(tmp_path):
+    path = str(tmp_path / 'rates-USD.shm')
+    writer, reader = SharedSnapshot(path), SharedSnapshot(path)
+
+    writer.publish(RatesSnapshot('USD', {'EUR': 0.85}, 1000.0, 0, 1))
+    first = reader.sequence()
+    reader.load('USD')
+    writer.publish(RatesSnapshot('USD', {'EUR': 0.90}, 1060.0, 0, 2))
+
+    assert reader.sequence() > first
+    assert reader.load('USD').rates == {'EUR': 0.90}
+
+
+def test_write_in_progress_is_not_read(tmp_path):
+    path = str(tmp_path / 'rates-USD.shm')
+    writer, reader = SharedSnapshot(path), SharedSnapshot(path)
+    writer.publish(RatesSnapshot('USD', {'EUR': 0.85}, 1000.0, 0, 1))
+
+    # Simule un writer interrompu au milieu d'une écriture (séquence impaire)
+    segment = writer._open(writable=True)
+    SEQUENCE.pack_into(segment, 8, SEQUENCE.unpack_from(segment, 8)[0] + 1)
+    assert reader._seen is None
+    assert reader.load('USD') is None  # abandon borné, pas de boucle infinie
+
+    writer.publish(RatesSnapshot('USD', {'EUR': 0.90}, 1060.0, 0, 2))
+    assert reader.load('USD').rates == {'EUR': 0.90}
+
+
+def test_store_keeps_one_segment_per_base(tmp_path):
+    store = SharedSnapshotStore(str(tmp_path))
+    store.publish(RatesSnapshot('USD', {'EUR': 0.85}, 1000.0, 0, 1))
+    store.publish(RatesSnapshot('EUR', {'USD': 1.17}, 1000.0, 0, 1))
+
+    follower = SharedSnapshotStore(str(tmp_path))
+    assert follower.load('USD').rates == {'EUR': 0.85}
+    assert follower.load('EUR').rates == {'USD': 1.17}
+
+
+def test_cache_version_continues_published_version():
+    rates_cache.publish(RatesSnapshot('USD', {'EUR': 0.85}, 1000.0, 0, 41))
+    rates_cache._fetch, fetch = (lambda base: {'conversion_rates': {'EUR': 0.9}}), rates_cache._fetch
+    try:
+        assert rates_cache.refresh('USD').version == 42
+    finally:
+        rates_cache._fetch = fetch
+
+
+def test_publisher_does_not_reload_its_own_snapshot(tmp_path):
+    store = SharedSnapshotStore(str(tmp_path))
+    store.publish(RatesSnapshot('USD', {'EUR': 0.85}, 1000.0, 0, 1))
+
+    assert store.load('USD') is None
+    assert SharedSnapshotStore(str(tmp_path)).load('USD').rates == {'EUR': 0.85}
@@ -0,0 +1,107 @@
+import time
+
+import pytest
+
+from upstream import UpstreamClient, UpstreamError
+
+
+def make_client(server, **kwargs):
+    kwargs.setdefault('sleep', lambda delay: None)
+    return UpstreamClient(f'http://127.0.0.1:{server.server_port}/v6', 'secret-key', **kwargs)
+
+
+def test_fetch_latest_reuses_connection(fake_api):
+    client = make_client(fake_api)
+    assert client.fetch_latest('USD')['conversion_rates'] == {'EUR': 0.85}
+    client.fetch_latest('USD')
+
+    assert fake_api.paths == ['/v6/secret-key/latest/USD'] * 2
+    stats = client.stats()
+    assert stats['connections_created'] == 1
+    assert stats['connections_reused'] == 1
+
+
+def test_retries_server_errors(fake_api):
+    fake_api.script = [(503, 0), (502, 0)]
+    client = make_client(fake_api, retries=2)
+
+    assert client.fetch_latest('USD')['conversion_rates'] == {'EUR': 0.85}
+    assert client.stats()['retries'] == 2
+
+
+def test_client_errors_are_not_retried(fake_api):
+    fake_api.script = [(404, 0)]
+    client = make_client(fake_api, retries=2)
+
+    with pytest.raises(UpstreamError) as error:
+        client.fetch_latest('USD')
+    assert error.value.status == 404
+    assert len(fake_api.paths) == 1
+    # L'URL (et donc la clé) n'apparaît pas dans le message
+    assert 'secret-key' not in str(error.value)
+
+
+def test_read_timeout(fake_api):
+    fake_api.script = [(200, 0.5)]
+    client = make_client(fake_api, read_timeout=0.1, retries=0)
+
+    with pytest.raises(UpstreamError, match='timed out'):
+        client.fetch_latest('USD')
+
+
+def test_retry_budget_stops_backoff(fake_api):
+    fake_api.script = [(503, 0)] * 5
+    now = [0.0]
+
+    def sleep(delay):
+        now[0] += delay
+
+    client = make_client(fake_api, retries=5, backoff=1, retry_budget=2.5,
+                         sleep=sleep, clock=lambda: now[0])
+
+    with pytest.raises(UpstreamError):
+        client.fetch_latest('USD')
+    # Après 1s d'attente, le délai suivant (2s) dépasserait le budget de 2.5s
+    assert len(fake_api.paths) == 2
+
+
+def warmed(client, latency=0.01):
+    """Client dont la fenêtre de latences permet déjà le hedging"""
+    for _ in range(client.latencies.min_samples):
+        client.latencies.record(latency)
+    return client
+
+
+def test_slow_request_is_hedged_and_hedge_wins(fake_api):
+    fake_api.script = [(200, 1.0), (200, 0)]
+    outcomes = []
+    client = warmed(make_client(fake_api, hedge_percentile=95, on_hedge=outcomes.append))
+
+    started = time.monotonic()
+    assert client.fetch_latest('USD')['conversion_rates'] == {'EUR': 0.85}
+
+    assert time.monotonic() - started < 0.5
+    assert outcomes == ['sent', 'won']
+    assert client.stats()['hedges'] == 1
+
+
+def test_fast_request_is_not_hedged(fake_api):
+    outcomes = []
+    client = warmed(make_client(fake_api, hedge_percentile=95, hedge_min_delay=0.5,
+                                on_hedge=outcomes.append))
+
+    client.fetch_latest('USD')
+    assert outcomes == [] and len(fake_api.paths) == 1
+
+
+def test_hedges_are_capped_by_the_budget(fake_api):
+    fake_api.script = [(200, 0.3), (200, 0), (200, 0.3)]
+    outcomes = []
+    client = warmed(make_client(fake_api, hedge_percentile=95, hedge_ratio=0,
+                                on_hedge=outcomes.append))
+
+    client.fetch_latest('USD')
+    client.fetch_latest('USD')
+
+    assert outcomes == ['sent', 'won', 'budget_exhausted']
+    assert len(fake_api.paths) == 3
@@ -0,0 +1,45 @@
+import pytest
+
+from worker_sizing import cpu_limit, memory_limit, size_workers
+
+
+def write(root, relative, content):
+    path = root / relative
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(content)
+
+
+def test_cgroup_v2_quota_caps_cpus(tmp_path, monkeypatch):
+    monkeypatch.setattr('os.sched_getaffinity', lambda pid: set(range(16)))
+    write(tmp_path, 'cpu.max', '150000 100000\n')
+    assert cpu_limit(str(tmp_path)) == 2
+
+    write(tmp_path, 'cpu.max', 'max 100000\n')
+    assert cpu_limit(str(tmp_path)) == 16
+
+
+def test_cgroup_v1_quota_and_memory(tmp_path, monkeypatch):
+    monkeypatch.setattr('os.sched_getaffinity', lambda pid: set(range(8)))
+    write(tmp_path, 'cpu/cpu.cfs_quota_us', '300000')
+    write(tmp_path, 'cpu/cpu.cfs_period_us', '100000')
+    write(tmp_path, 'memory/memory.limit_in_bytes', str(512 * 2 ** 20))
+    assert cpu_limit(str(tmp_path)) == 3
+    assert memory_limit(str(tmp_path)) == 512 * 2 ** 20
+
+    write(tmp_path, 'memory/memory.limit_in_bytes', str(2 ** 63 - 4096))
+    assert memory_limit(str(tmp_path)) is None
+
+
+@pytest.mark.parametrize('worker_class, expected', [
+    ('sync', (9, 1)),
+    ('gthread', (5, 4)),
+    ('gevent', (5, 1)),
+])
+def test_size_workers_per_class(worker_class, expected):
+    assert size_workers(worker_class, cpus=4) == expected
+
+
+def test_memory_limit_caps_workers():
+    assert size_workers('sync', cpus=8, memory=600 * 2 ** 20) == (4, 1)
+    with pytest.raises(ValueError):
+        size_workers('eventlet', cpus=1)
@@ -0,0 +1,346 @@
+"""Client HTTP de l'API exchangerate-api (session poolée, timeouts, retries, hedging)."""
+import logging
+import math
+import os
+import threading
+import time
+from collections import deque
+from email.utils import parsedate_to_datetime
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeout
+from concurrent.futures import wait
+
+import requests
+from requests.adapters import HTTPAdapter
+
+logger = logging.getLogger(__name__)
+
+RETRYABLE_STATUS = {429, 500, 502, 503, 504}
+
+
+class UpstreamError(Exception):
+    """
+    Échec d'un appel upstream. Le message ne contient jamais l'URL, qui
+    embarque la clé d'API. `reason` : "timeout", "connection", "http" ou
+    "quota" ; `retry_after` : délai demandé (en-tête Retry-After), en secondes.
+    """
+
+    def __init__(self, message, status=None, reason="http", retry_after=None):
+        super().__init__(message)
+        self.status = status
+        self.reason = reason
+        self.retry_after = retry_after
+
+
+def retry_after_seconds(value, now=None):
+    """En-tête Retry-After (secondes ou date HTTP) en secondes, ou None."""
+    if not value:
+        return None
+    try:
+        return max(float(value), 0.0)
+    except ValueError:
+        pass
+    try:
+        moment = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    return max(moment.timestamp() - (time.time() if now is None else now), 0.0)
+
+
+class ProcessLocalExecutor:
+    """
+    `ThreadPoolExecutor` recréé dans chaque processus : les threads d'un pool
+    créé avant un fork (preload Gunicorn) n'existent pas dans le worker.
+    """
+
+    def __init__(self, max_workers, thread_name_prefix):
+        self.max_workers = max_workers
+        self.thread_name_prefix = thread_name_prefix
+        self._executor = None
+        self._pid = None
+        self._lock = threading.Lock()
+
+    def get(self):
+        with self._lock:
+            if self._pid != os.getpid():
+                self._executor = ThreadPoolExecutor(
+                    max_workers=self.max_workers, thread_name_prefix=self.thread_name_prefix)
+                self._pid = os.getpid()
+            return self._executor
+
+    def shutdown(self):
+        """Arrête le pool ; le prochain `get()` en recrée un."""
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = self._pid = None
+
+
+class LatencyWindow:
+    """Latences des dernières réponses réussies, pour estimer un percentile."""
+
+    def __init__(self, size=200, min_samples=20):
+        self.min_samples = min_samples
+        self._samples = deque(maxlen=size)
+        self._lock = threading.Lock()
+
+    def record(self, seconds):
+        with self._lock:
+            self._samples.append(seconds)
+
+    def percentile(self, q):
+        """Percentile `q` (0-100), ou None tant que l'échantillon est trop petit."""
+        with self._lock:
+            if len(self._samples) < self.min_samples:
+                return None
+            samples = sorted(self._samples)
+        return samples[max(math.ceil(q / 100 * len(samples)) - 1, 0)]
+
+
+class HedgeBudget:
+    """
+    Seau de jetons des requêtes doublées : chaque requête principale crédite
+    `ratio` jeton (plafond `burst`), chaque doublon en consomme un. Sur la
+    durée, au plus `ratio` doublon par requête (10 % de quota en plus).
+    """
+
+    def __init__(self, ratio=0.1, burst=1):
+        self.ratio = ratio
+        self.burst = burst
+        self._tokens = burst
+        self._lock = threading.Lock()
+
+    def deposit(self):
+        with self._lock:
+            self._tokens = min(self._tokens + self.ratio, self.burst)
+
+    def take(self):
+        with self._lock:
+            if self._tokens < 1:
+                return False
+            self._tokens -= 1
+            return True
+
+
+class BaseUpstreamClient:
+    """
+    Politique commune aux clients synchrone et asynchrone : URL, timeouts,
+    retries avec backoff exponentiel dans un budget total, hedging,
+    compteurs.
+
+    Hedging (`hedge_percentile`, None pour le désactiver) : si une requête
+    n'a pas répondu après le percentile `hedge_percentile` des latences
+    observées (au moins `hedge_min_delay`), une seconde requête identique
+    part ; la première réponse réussie gagne, l'autre est annulée ou
+    ignorée. Les doublons sont plafonnés par un `HedgeBudget` ; `on_hedge`
+    reçoit "sent", "won" (le doublon a gagné), "budget_exhausted" ou
+    "quota".
+
+    `quota` (optionnel, voir `quota.QuotaManager`) est consulté avant chaque
+    requête, retries et doublons compris, et suspendu après un 429.
+    """
+
+    def __init__(self, base_url, api_key, connect_timeout=3.05, read_timeout=10,
+                 retries=2, backoff=0.5, max_backoff=4, retry_budget=15,
+                 hedge_percentile=None, hedge_min_delay=0.05, hedge_ratio=0.1, hedge_burst=1,
+                 on_hedge=None, quota=None, clock=time.monotonic):
+        self.base_url = base_url.rstrip("/")
+        self._api_key = api_key
+        self.connect_timeout = connect_timeout
+        self.read_timeout = read_timeout
+        self.retries = retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.retry_budget = retry_budget
+        self.hedge_percentile = hedge_percentile
+        self.hedge_min_delay = hedge_min_delay
+        self.latencies = LatencyWindow()
+        self.hedge_budget = HedgeBudget(hedge_ratio, hedge_burst)
+        self._on_hedge = on_hedge
+        self.quota = quota
+        self._clock = clock
+        self._counters = {"requests": 0, "retries": 0, "failures": 0, "hedges": 0}
+        self._counters_lock = threading.Lock()
+
+    def _count(self, name):
+        with self._counters_lock:
+            self._counters[name] += 1
+
+    def _url(self, path):
+        if self._api_key is None:  # fournisseurs publics, sans clé
+            return f"{self.base_url}/{path}"
+        return f"{self.base_url}/{self._api_key}/{path}"
+
+    def _hedge_delay(self):
+        """Attente avant de doubler la requête, ou None (hedging inactif ou pas assez de mesures)."""
+        if not self.hedge_percentile:
+            return None
+        self.hedge_budget.deposit()
+        latency = self.latencies.percentile(self.hedge_percentile)
+        return None if latency is None else max(latency, self.hedge_min_delay)
+
+    def _hedged(self, outcome):
+        if outcome == "sent":
+            self._count("hedges")
+        if self._on_hedge is not None:
+            self._on_hedge(outcome)
+
+    def _may_hedge(self):
+        if not self.hedge_budget.take():
+            self._hedged("budget_exhausted")
+            return False
+        try:
+            self._reserve()
+        except UpstreamError:
+            self._hedged("quota")
+            return False
+        self._hedged("sent")
+        return True
+
+    def _reserve(self):
+        """Réserve un appel sur le quota ; lève `QuotaExceeded` sinon."""
+        if self.quota is not None:
+            self.quota.acquire()
+
+    def _failed(self, error):
+        if error.status == 429 and self.quota is not None:
+            self.quota.block(error.retry_after)
+
+    def _retryable(self, error):
+        if error.reason == "quota":
+            return False
+        return error.status is None or error.status in RETRYABLE_STATUS
+
+    def _retry_delay(self, error, attempt, started):
+        """
+        Délai avant le prochain essai, ou None si l'erreur est définitive.
+        Un Retry-After remplace le backoff (et compte dans le budget).
+        """
+        if error.retry_after is not None:
+            delay = error.retry_after
+        else:
+            delay = min(self.backoff * 2 ** attempt, self.max_backoff)
+        elapsed = self._clock() - started
+        if (attempt >= self.retries or not self._retryable(error)
+                or elapsed + delay > self.retry_budget):
+            self._count("failures")
+            return None
+        logger.warning("Upstream call failed (%s), retrying in %.2fs", error, delay)
+        self._count("retries")
+        return delay
+
+    def stats(self):
+        with self._counters_lock:
+            return dict(self._counters)
+
+
+class UpstreamClient(BaseUpstreamClient):
+    """
+    Client de l'endpoint `/latest/<base>`.
+
+    Une `requests.Session` unique, montée sur un `HTTPAdapter` poolé, garde
+    les connexions keep-alive (DNS, TCP et TLS payés une fois). Chaque appel
+    a un timeout de connexion et de lecture. Les erreurs réseau, 429 et 5xx
+    sont retentées avec un backoff exponentiel, tant que le budget total
+    `retry_budget` (en secondes) n'est pas dépassé.
+    """
+
+    def __init__(self, base_url, api_key, pool_size=10, sleep=time.sleep, **options):
+        super().__init__(base_url, api_key, **options)
+        self.timeout = (self.connect_timeout, self.read_timeout)
+        self._sleep = sleep
+        self.adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+        self.session = requests.Session()
+        self.session.mount("https://", self.adapter)
+        self.session.mount("http://", self.adapter)
+        self._hedge_pool = ProcessLocalExecutor(2 * pool_size, "upstream-hedge")
+
+    def _get(self, url):
+        try:
+            response = self.session.get(url, timeout=self.timeout)
+        except requests.Timeout:
+            raise UpstreamError("Upstream request timed out", reason="timeout") from None
+        except requests.ConnectionError:
+            raise UpstreamError("Upstream connection failed", reason="connection") from None
+        try:
+            response.raise_for_status()
+        except requests.HTTPError as error:
+            status = error.response.status_code if error.response is not None else None
+            retry_after = (retry_after_seconds(error.response.headers.get("Retry-After"))
+                           if error.response is not None else None)
+            raise UpstreamError(f"Upstream returned HTTP {status}", status,
+                                retry_after=retry_after) from None
+        return response
+
+    def _timed_get(self, url):
+        self._count("requests")
+        started = time.perf_counter()
+        try:
+            response = self._get(url)
+        except UpstreamError as error:
+            self._failed(error)
+            raise
+        self.latencies.record(time.perf_counter() - started)
+        return response
+
+    def _hedged_get(self, url):
+        self._reserve()
+        delay = self._hedge_delay()
+        if delay is None:
+            return self._timed_get(url)
+
+        pool = self._hedge_pool.get()
+        primary = pool.submit(self._timed_get, url)
+        try:
+            return primary.result(timeout=delay)
+        except FutureTimeout:
+            pass
+        if not self._may_hedge():
+            return primary.result()
+
+        # Un appel requests ne s'interrompt pas : le perdant se termine dans
+        # le pool et sa réponse est ignorée
+        hedge = pool.submit(self._timed_get, url)
+        pending = {primary, hedge}
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                if future.exception() is None:
+                    for loser in pending:
+                        loser.cancel()
+                    if future is hedge:
+                        self._hedged("won")
+                    return future.result()
+        raise primary.exception()
+
+    def get(self, path):
+        """GET `<base_url>/<api_key>/<path>` (sans clé si None) et retourne la réponse."""
+        url = self._url(path)
+        started = self._clock()
+        attempt = 0
+        while True:
+            try:
+                return self._hedged_get(url)
+            except UpstreamError as error:
+                delay = self._retry_delay(error, attempt, started)
+                if delay is None:
+                    raise
+                attempt += 1
+                self._sleep(delay)
+
+    def fetch_latest(self, base):
+        return self.get(f"latest/{base}").json()
+
+    def stats(self):
+        """Compteurs d'appels et réutilisation des connexions du pool."""
+        pools = self.adapter.poolmanager.pools
+        created = sum(pools[key].num_connections for key in pools.keys())
+        served = sum(pools[key].num_requests for key in pools.keys())
+        stats = super().stats()
+        stats["connections_created"] = created
+        stats["connections_reused"] = max(served - created, 0)
+        return stats
+
+    def close(self):
+        self._hedge_pool.shutdown()
+        self.session.close()
@@ -0,0 +1,76 @@
+"""Dimensionnement des workers Gunicorn d'après les CPU et les limites cgroup."""
+import math
+import os
+
+WORKER_CLASSES = ("sync", "gthread", "gevent")
+
+
+def _read(path):
+    try:
+        with open(path) as source:
+            return source.read().strip()
+    except OSError:
+        return None
+
+
+def cpu_limit(cgroup_root="/sys/fs/cgroup"):
+    """
+    CPU utilisables : affinité du process, bornée par le quota CFS du
+    cgroup (v2 `cpu.max`, sinon v1 `cpu.cfs_quota_us`), arrondi au-dessus.
+    """
+    try:
+        cpus = len(os.sched_getaffinity(0))
+    except AttributeError:  # macOS, Windows
+        cpus = os.cpu_count() or 1
+
+    quota = period = None
+    cpu_max = _read(os.path.join(cgroup_root, "cpu.max"))
+    if cpu_max:
+        value, _, raw_period = cpu_max.partition(" ")
+        if value != "max":
+            quota, period = int(value), int(raw_period or 100000)
+    else:
+        raw_quota = _read(os.path.join(cgroup_root, "cpu", "cpu.cfs_quota_us"))
+        raw_period = _read(os.path.join(cgroup_root, "cpu", "cpu.cfs_period_us"))
+        if raw_quota and raw_period and int(raw_quota) > 0:
+            quota, period = int(raw_quota), int(raw_period)
+    if quota is not None and period > 0:
+        cpus = min(cpus, max(1, math.ceil(quota / period)))
+    return cpus
+
+
+def memory_limit(cgroup_root="/sys/fs/cgroup"):
+    """Limite mémoire du cgroup en octets (v2 puis v1), ou None."""
+    for path in (os.path.join(cgroup_root, "memory.max"),
+                 os.path.join(cgroup_root, "memory", "memory.limit_in_bytes")):
+        value = _read(path)
+        if value and value != "max":
+            limit = int(value)
+            # cgroup v1 sans limite : une valeur proche de 2**63
+            return limit if limit < 2 ** 60 else None
+    return None
+
+
+def size_workers(worker_class, cpus, memory=None, worker_memory=150 * 2 ** 20,
+                 threads=None):
+    """
+    Retourne `(workers, threads)` pour une classe de worker.
+
+    - sync : 2 × CPU + 1 process mono-thread (formule Gunicorn) ;
+    - gthread : CPU + 1 process de `threads` threads (4 par défaut), les
+      vues ne faisant que lire la mémoire entre deux appels upstream ;
+    - gevent : CPU + 1 process, la concurrence venant des greenlets.
+
+    Le nombre de process est plafonné pour que `workers × worker_memory`
+    tienne dans la limite mémoire du cgroup.
+    """
+    if worker_class not in WORKER_CLASSES:
+        raise ValueError(f"Unknown worker class: {worker_class}")
+    workers = 2 * cpus + 1 if worker_class == "sync" else cpus + 1
+    if memory is not None:
+        workers = min(workers, max(1, memory // worker_memory))
+    if worker_class == "gthread":
+        threads = threads or 4
+    else:
+        threads = 1
+    return workers, threads